@@ -1,9 +1,29 @@
-from afolu.assets import bbox, class_masks, large, load, small
+from afolu.assets import (
+    bbox,
+    class_masks,
+    cube,
+    ensemble,
+    large,
+    load,
+    local,
+    plan,
+    projection,
+    sisepuede,
+    small,
+    zonal,
+)
 
 __all__ = [
     "bbox",
     "class_masks",
+    "cube",
+    "ensemble",
     "large",
     "load",
+    "local",
+    "plan",
+    "projection",
+    "sisepuede",
     "small",
+    "zonal",
 ]
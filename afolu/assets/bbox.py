@@ -1,13 +1,22 @@
+import math
 from pathlib import Path
 
 import ee
 import geopandas as gpd
+import pandas as pd
 import rasterio as rio
 import rasterio.features as rio_features
 import shapely
 
 import dagster as dg
-from afolu.resources import PathResource
+from afolu.assets.constants import ZONAL_REGIONS
+from afolu.instrumentation import instrumented
+from afolu.pools import CPU_POOL
+from afolu.resources import GeometryResource, PathResource
+
+# Smallest closed ring, a triangle
+MIN_POLYGON_VERTICES = 4
+CAP_ITERATIONS = 20
 
 
 # Amazonas
@@ -16,7 +25,9 @@ from afolu.resources import PathResource
     key_prefix=["amazon", "bbox"],
     io_manager_key="geodataframe_manager",
     group_name="amazon_bbox",
+    pool=CPU_POOL,
 )
+@instrumented
 def bbox_amazon(path_resource: PathResource) -> gpd.GeoDataFrame:
     fpath = (
         Path(path_resource.data_path) / "initial" / "sdat_671_1_20250409_130228387.tif"
@@ -61,7 +72,9 @@ def bbox_amazon(path_resource: PathResource) -> gpd.GeoDataFrame:
     key_prefix=["mexico", "bbox"],
     io_manager_key="geodataframe_manager",
     group_name="mexico_bbox",
+    pool=CPU_POOL,
 )
+@instrumented
 def bbox_mexico(path_resource: PathResource) -> gpd.GeoDataFrame:
     fpath = Path(path_resource.data_path) / "initial" / "gadm41_MEX.gpkg"
     geom: shapely.MultiPolygon = (
@@ -90,6 +103,7 @@ def bbox_mexico(path_resource: PathResource) -> gpd.GeoDataFrame:
     io_manager_key="geodataframe_manager",
     group_name="small_bbox",
 )
+@instrumented
 def bbox_small(path_resource: PathResource) -> gpd.GeoDataFrame:
     merged_path = (
         Path(path_resource.population_grids_path)
@@ -102,26 +116,219 @@ def bbox_small(path_resource: PathResource) -> gpd.GeoDataFrame:
     return gpd.GeoDataFrame(geometry=[shapely.box(*bounds)], crs="EPSG:4326")
 
 
-def bbox_ee_factory(top_prefix: str) -> dg.AssetsDefinition:
+@dg.asset(
+    name="shapely",
+    key_prefix=["zonal", "bbox"],
+    ins={
+        f"{region}_bbox": dg.AssetIn([region, "bbox", "shapely"])
+        for region in ZONAL_REGIONS
+    },
+    io_manager_key="geodataframe_manager",
+    group_name="zonal_bbox",
+)
+@instrumented
+def bbox_zonal(**region_bboxes: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    # The source imagery is scanned once over the union of the region outlines,
+    # the envelope of distant regions would mostly cover the space between them
+    regions = pd.concat([df.to_crs("EPSG:4326") for df in region_bboxes.values()])
+    return gpd.GeoDataFrame(geometry=[regions.union_all()], crs="EPSG:4326")
+
+
+@dg.asset(
+    name="zones",
+    key_prefix="mexico",
+    io_manager_key="geodataframe_manager",
+    group_name="mexico_bbox",
+    pool=CPU_POOL,
+)
+@instrumented
+def zones_mexico(path_resource: PathResource) -> gpd.GeoDataFrame:
+    fpath = Path(path_resource.data_path) / "initial" / "gadm41_MEX.gpkg"
+    states = gpd.read_file(fpath, layer="ADM_ADM_1").to_crs("EPSG:6372")
+    states["geometry"] = shapely.simplify(states["geometry"].values, tolerance=100)
+    return (
+        states.rename(columns={"NAME_1": "zone"})[["zone", "geometry"]]
+        .to_crs("EPSG:4326")
+        .reset_index(drop=True)
+    )
+
+
+def zones_factory(top_prefix: str) -> dg.AssetsDefinition:
     @dg.asset(
-        name="ee",
+        name="zones",
+        key_prefix=top_prefix,
+        ins={"df_bbox": dg.AssetIn([top_prefix, "bbox", "shapely"])},
+        io_manager_key="geodataframe_manager",
+        group_name=f"{top_prefix}_bbox",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(df_bbox: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+        # Regions without a finer zone layer are reduced as a single zone
+        return df_bbox[["geometry"]].assign(zone=top_prefix)
+
+    return _asset
+
+
+def get_equal_area_crs(geom: shapely.Geometry) -> str:
+    centroid = geom.centroid
+    return f"+proj=laea +lat_0={centroid.y} +lon_0={centroid.x} +datum=WGS84 +units=m"
+
+
+def cap_vertices(
+    polygon: shapely.Polygon | shapely.MultiPolygon,
+    max_vertices: int | None,
+) -> tuple[shapely.Polygon | shapely.MultiPolygon, float]:
+    if max_vertices is None or shapely.get_num_coordinates(polygon) <= max_vertices:
+        return polygon, 0.0
+
+    if max_vertices < MIN_POLYGON_VERTICES:
+        err = f"Polygons need at least {MIN_POLYGON_VERTICES} vertices."
+        raise ValueError(err)
+
+    def count(tolerance: float) -> int:
+        return shapely.get_num_coordinates(shapely.simplify(polygon, tolerance))
+
+    # The smallest tolerance within the budget is bracketed by doubling and
+    # then bisected, the upper end always satisfies the budget
+    low, high = 0.0, 1.0
+    while count(high) > max_vertices:
+        low, high = high, high * 2
+    for _ in range(CAP_ITERATIONS):
+        mid = (low + high) / 2
+        if count(mid) > max_vertices:
+            low = mid
+        else:
+            high = mid
+
+    capped = shapely.simplify(polygon, high)
+
+    if not isinstance(capped, (shapely.Polygon, shapely.MultiPolygon)):
+        err = f"Expected Polygon or MultiPolygon, got {type(capped)}"
+        raise TypeError(err)
+
+    return capped, high
+
+
+def polygon_to_ee(polygon: shapely.Polygon) -> ee.geometry.Geometry:
+    return ee.geometry.Geometry.Polygon(
+        list(zip(*polygon.exterior.coords.xy, strict=False)),
+    )
+
+
+def region_to_ee(
+    region: shapely.Polygon | shapely.MultiPolygon,
+) -> ee.geometry.Geometry:
+    # Outlines of several regions are passed as GeoJSON, as zones are
+    if isinstance(region, shapely.Polygon):
+        return polygon_to_ee(region)
+    return ee.geometry.Geometry(shapely.geometry.mapping(region))
+
+
+def bbox_region_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="region",
         key_prefix=[top_prefix, "bbox"],
         ins={"df_bbox": dg.AssetIn([top_prefix, "bbox", "shapely"])},
-        io_manager_key="ee_manager",
+        io_manager_key="geodataframe_manager",
         group_name=f"{top_prefix}_bbox",
+        pool=CPU_POOL,
     )
-    def _asset(df_bbox: gpd.GeoDataFrame) -> ee.geometry.Geometry:
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        geometry_resource: GeometryResource,
+        df_bbox: gpd.GeoDataFrame,
+    ) -> gpd.GeoDataFrame:
         bbox_shapely = df_bbox["geometry"].item()
 
-        if not isinstance(bbox_shapely, shapely.Polygon):
-            err = f"Expected Polygon, got {type(bbox_shapely)}"
+        if not isinstance(bbox_shapely, (shapely.Polygon, shapely.MultiPolygon)):
+            err = f"Expected Polygon or MultiPolygon, got {type(bbox_shapely)}"
             raise TypeError(err)
 
-        return ee.geometry.Geometry.Polygon(
-            list(zip(*bbox_shapely.exterior.coords.xy, strict=False)),
+        # Tolerances and areas are measured in an equal area projection
+        crs = get_equal_area_crs(df_bbox.to_crs("EPSG:4326")["geometry"].item())
+        projected = df_bbox.to_crs(crs)["geometry"].item()
+        capped, tolerance = cap_vertices(projected, geometry_resource.max_vertices)
+
+        # Simplified boundaries stay within the tolerance of the original
+        # one, so they differ by less than a buffer of that width around it
+        area_error_bound = 2 * tolerance * projected.length + math.pi * tolerance**2
+        context.add_output_metadata(
+            {
+                "vertices": int(shapely.get_num_coordinates(projected)),
+                "capped_vertices": int(shapely.get_num_coordinates(capped)),
+                "tolerance_m": tolerance,
+                "area_error_ha": capped.symmetric_difference(projected).area / 10_000,
+                "area_error_bound_ha": area_error_bound / 10_000,
+                "area_error_bound_pct": 100 * area_error_bound / projected.area,
+            },
         )
 
+        if tolerance == 0:
+            return df_bbox
+        return gpd.GeoDataFrame(geometry=[capped], crs=crs).to_crs(df_bbox.crs)
+
+    return _asset
+
+
+def bbox_ee_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="ee",
+        key_prefix=[top_prefix, "bbox"],
+        ins={"df_region": dg.AssetIn([top_prefix, "bbox", "region"])},
+        io_manager_key="ee_manager",
+        group_name=f"{top_prefix}_bbox",
+    )
+    @instrumented
+    def _asset(
+        geometry_resource: GeometryResource,
+        df_region: gpd.GeoDataFrame,
+    ) -> ee.geometry.Geometry:
+        region = df_region["geometry"].item()
+
+        if not isinstance(region, (shapely.Polygon, shapely.MultiPolygon)):
+            err = f"Expected Polygon or MultiPolygon, got {type(region)}"
+            raise TypeError(err)
+
+        # The mosaic masks out the pixels outside the region. Outlines of
+        # several regions are kept, their rectangle would cover the space
+        # between them
+        if geometry_resource.rectangle and isinstance(region, shapely.Polygon):
+            return ee.geometry.Geometry.Rectangle(
+                list(region.bounds),
+                proj=df_region.crs.to_string(),
+                geodesic=False,
+            )
+
+        return region_to_ee(region)
+
+    return _asset
+
+
+def bbox_ee_region_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="ee_region",
+        key_prefix=[top_prefix, "bbox"],
+        ins={"df_region": dg.AssetIn([top_prefix, "bbox", "region"])},
+        io_manager_key="ee_manager",
+        group_name=f"{top_prefix}_bbox",
+    )
+    @instrumented
+    def _asset(df_region: gpd.GeoDataFrame) -> ee.geometry.Geometry:
+        region = df_region["geometry"].item()
+
+        if not isinstance(region, (shapely.Polygon, shapely.MultiPolygon)):
+            err = f"Expected Polygon or MultiPolygon, got {type(region)}"
+            raise TypeError(err)
+
+        return region_to_ee(region)
+
     return _asset
 
 
-dassets = [bbox_ee_factory(prefix) for prefix in ["amazon", "mexico", "small"]]
+dassets = [
+    factory(prefix)
+    for factory in [bbox_region_factory, bbox_ee_factory, bbox_ee_region_factory]
+    for prefix in ["amazon", "mexico", "small", "zonal"]
+] + [zones_factory("amazon")]
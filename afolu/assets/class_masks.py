@@ -1,6 +1,7 @@
 import ee
 
 import dagster as dg
+from afolu.instrumentation import instrumented
 from afolu.resources import AFOLUClassMapResource, LabelResource
 
 
@@ -15,6 +16,7 @@ def class_mask_factory(top_prefix: str, class_name: str) -> dg.AssetsDefinition:
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_class_mask",
     )
+    @instrumented
     def _asset(
         class_map_resource: AFOLUClassMapResource,
         glc30: ee.image.Image,
@@ -51,6 +53,7 @@ def forests_primary_factory(top_prefix: str) -> dg.AssetsDefinition:
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_class_mask",
     )
+    @instrumented
     def _asset(
         forests_img: ee.image.Image,
         forests_mask: ee.image.Image,
@@ -73,6 +76,7 @@ def forests_secondary_factory(top_prefix: str) -> dg.AssetsDefinition:
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_class_mask",
     )
+    @instrumented
     def _asset(
         forests_img: ee.image.Image,
         forests_primary_img: ee.image.Image,
@@ -97,6 +101,7 @@ def pastures_factory(top_prefix: str) -> dg.AssetsDefinition:
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_class_mask",
     )
+    @instrumented
     def _asset(
         grasslands_to_pastures_img: ee.image.Image,
         pastures_random_mask: ee.image.Image,
@@ -122,6 +127,7 @@ def grasslands_merged_factory(top_prefix: str) -> dg.AssetsDefinition:
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_class_mask",
     )
+    @instrumented
     def _asset(
         grasslands_to_pastures_img: ee.image.Image,
         grasslands_img: ee.image.Image,
@@ -148,7 +154,7 @@ assets = [
         "shrublands",
         "other",
     )
-    for top_prefix in ("amazon", "mexico", "small")
+    for top_prefix in ("amazon", "mexico", "small", "zonal")
 ] + [
     factory(top_prefix)
     for factory in (
@@ -157,5 +163,5 @@ assets = [
         pastures_factory,
         grasslands_merged_factory,
     )
-    for top_prefix in ("amazon", "mexico", "small")
+    for top_prefix in ("amazon", "mexico", "small", "zonal")
 ]
@@ -1,12 +1,44 @@
-from collections.abc import Sequence
+import hashlib
+import time
+from collections.abc import Callable, Hashable
+from typing import TypeVar
 
 import ee
+import geopandas as gpd
 import numpy as np
 import pandas as pd
+import shapely
 
 import dagster as dg
-from afolu.assets.constants import LABEL_LIST, REDUCE_SCALE
+from afolu.assets.constants import (
+    AREA_BATCH_SIZE,
+    LABEL_LIST,
+    REDUCE_SCALE,
+    ZONE_BATCH_SIZE,
+)
+from afolu.instrumentation import get_info, instrumented
+from afolu.managers import (
+    INPUT_VERSION_METADATA_KEY,
+    UNCHANGED,
+    BaseManager,
+    Unchanged,
+    Versioned,
+    is_intact,
+)
 from afolu.partitions import year_pair_partitions
+from afolu.resources import ReductionResource
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Settings of the reductions that change their values without being inputs
+REDUCE_SETTINGS = (
+    f"reduce_scale={REDUCE_SCALE},area_batch_size={AREA_BATCH_SIZE},"
+    f"zone_batch_size={ZONE_BATCH_SIZE}"
+)
+
+# Codes of class_code_image, 0 for pixels without a class
+CLASS_CODE_COUNT = len(LABEL_LIST) + 1
 
 
 def year_to_band_name(year: int | str) -> str:
@@ -15,126 +47,405 @@ def year_to_band_name(year: int | str) -> str:
     return f"b{year - 1999}"
 
 
-def get_raster_area(raster: ee.image.Image, bbox: ee.geometry.Geometry) -> float:
-    band_names = raster.bandNames().getInfo()
+def class_code_image(img_map: dict[str, ee.image.Image], band: str) -> ee.image.Image:
+    # 0 marks pixels without a class, labels are numbered from 1 in LABEL_LIST order
+    out_img = ee.image.Image.constant(0).rename("class").uint8()
+    for i, label in enumerate(LABEL_LIST):
+        out_img = out_img.where(img_map[label].select(band).rename("class"), i + 1)
+    return out_img
+
+
+def max_relative_change(previous: dict[K, float], current: dict[K, float]) -> float:
+    # Changes are measured against the largest value, small cells fluctuate the
+    # most between scales but barely change the tables
+    largest = max((abs(value) for value in current.values()), default=0.0)
+    if largest == 0:
+        return 0.0
+    change = max(
+        abs(current.get(key, 0.0) - previous.get(key, 0.0))
+        for key in current.keys() | previous.keys()
+    )
+    return change / largest
+
+
+def reduce_progressive(
+    reduce: Callable[[int], dict[K, float]],
+    reduction_resource: ReductionResource,
+    default_scale: int = REDUCE_SCALE,
+) -> dict[K, float]:
+    context = dg.AssetExecutionContext.get()
+    scales = reduction_resource.scales or [default_scale]
+
+    levels = []
+    out: dict[K, float] = {}
+    start = time.perf_counter()
+    for i, scale in enumerate(scales):
+        level_start = time.perf_counter()
+        current = reduce(scale)
+        change = max_relative_change(out, current) if i > 0 else None
+        out = current
+
+        level = {
+            "scale": scale,
+            "seconds": time.perf_counter() - level_start,
+            "max_relative_change": change,
+        }
+        levels.append(level)
+
+        # Levels are recorded as they finish, coarse results are provisional
+        if len(scales) > 1:
+            context.log_event(
+                dg.AssetObservation(
+                    asset_key=context.asset_key,
+                    metadata={
+                        **level,
+                        "values": dg.MetadataValue.json(
+                            {str(key): value for key, value in current.items()},
+                        ),
+                    },
+                ),
+            )
+
+        if change is not None and change <= reduction_resource.tolerance:
+            break
+        budget = reduction_resource.time_budget_seconds
+        if budget is not None and time.perf_counter() - start >= budget:
+            break
+
+    context.add_output_metadata(
+        {
+            "reduce_scale": levels[-1]["scale"],
+            "reduce_levels": dg.MetadataValue.json(levels),
+        },
+    )
+    return out
+
+
+def graph_version(*objs: ee.computedobject.ComputedObject | str) -> str:
+    digest = hashlib.sha256()
+    for obj in objs:
+        digest.update((obj if isinstance(obj, str) else obj.serialize()).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_input_versions(context: dg.AssetExecutionContext) -> dict[str, str]:
+    # The IO manager observes the version of every partition it writes
+    instance = context.instance
+    storage_ids = instance.get_latest_storage_id_by_partition(
+        context.asset_key,
+        dg.DagsterEventType.ASSET_OBSERVATION,
+        set(context.partition_keys),
+    )
+    if not storage_ids:
+        return {}
+
+    records = instance.fetch_observations(
+        dg.AssetRecordsFilter(
+            asset_key=context.asset_key,
+            storage_ids=list(storage_ids.values()),
+        ),
+        limit=len(storage_ids),
+    ).records
+
+    out = {}
+    for record in records:
+        observation = record.asset_observation
+        if observation is None or observation.partition is None:
+            continue
+        version = observation.metadata.get(INPUT_VERSION_METADATA_KEY)
+        if version is not None:
+            out[observation.partition] = str(version.value)
+    return out
+
+
+def get_intact_partitions(
+    context: dg.AssetExecutionContext,
+    partition_keys: set[str],
+) -> set[str]:
+    # Partitions whose stored file exists and passes its checksum
+    manager = getattr(
+        context.resources,
+        context.assets_def.get_io_manager_key_for_asset_key(context.asset_key),
+    )
 
-    if not isinstance(band_names, Sequence):
-        err = "Band names should be a sequence."
+    if not isinstance(manager, BaseManager):
+        err = f"Expected BaseManager, got {type(manager)}"
         raise TypeError(err)
 
-    band_count = len(band_names)
+    paths = manager.get_partition_paths(
+        context.asset_key,
+        context.assets_def.partitions_def,
+        sorted(partition_keys),
+    )
+    return {key for key, fpath in paths.items() if is_intact(fpath)}
 
-    if band_count != 1:
-        err = f"Expected 1 band, got {band_count} bands: {band_names}"
-        raise ValueError(err)
 
-    response = (
-        raster.rename(["band"])
-        .multiply(ee.image.Image.pixelArea())
+def reduce_changed(
+    rasters: dict[str, ee.image.Image],
+    reduce: Callable[[dict[str, ee.image.Image]], dict[str, V]],
+    *extra: ee.computedobject.ComputedObject | str,
+    force: bool = False,
+) -> dict[str, Versioned | Unchanged]:
+    # Partitions are only reduced again when their raster expression, the
+    # extra inputs or the reduction settings changed since their last write,
+    # when their stored file is missing or corrupt, or when forced
+    context = dg.AssetExecutionContext.get()
+    versions = {
+        key: graph_version(raster, *extra, REDUCE_SETTINGS)
+        for key, raster in rasters.items()
+    }
+    previous = {} if force else get_input_versions(context)
+    current = get_intact_partitions(
+        context,
+        {key for key in rasters if previous.get(key) == versions[key]},
+    )
+    changed = {key: raster for key, raster in rasters.items() if key not in current}
+
+    out = reduce(changed) if changed else {}
+    context.add_output_metadata({"partitions_skipped": len(rasters) - len(changed)})
+    return {
+        key: Versioned(out[key], versions[key]) if key in changed else UNCHANGED
+        for key in rasters
+    }
+
+
+def reduce_zones(
+    zone_img: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+    scale: int = REDUCE_SCALE,
+) -> dict[int, float]:
+    response = get_info(
+        ee.image.Image.pixelArea()
+        .addBands(zone_img.rename("zone"))
         .reduceRegion(
-            reducer=ee.reducer.Reducer.sum(),
-            scale=REDUCE_SCALE,
+            reducer=ee.reducer.Reducer.sum().group(groupField=1, groupName="zone"),
+            scale=scale,
             geometry=bbox,
             maxPixels=int(1e10),
-        )
-        .getInfo()
+        ),
     )
 
     if response is None:
         err = "No data returned from reduceRegion."
         raise ValueError(err)
 
-    return float(
-        response["band"],
+    return {int(elem["zone"]): float(elem["sum"]) for elem in response["groups"]}
+
+
+def get_raster_areas(
+    rasters: dict[str, ee.image.Image],
+    bbox: ee.geometry.Geometry,
+    scale: int = REDUCE_SCALE,
+) -> dict[str, float]:
+    # Single band rasters are stacked so a whole batch is reduced in one request,
+    # renaming fails server-side for rasters with more than one band
+    keys = list(rasters)
+    out = {}
+    for i in range(0, len(keys), AREA_BATCH_SIZE):
+        batch = keys[i : i + AREA_BATCH_SIZE]
+        band_names = [f"b{j}" for j in range(len(batch))]
+        stacked = ee.image.Image.cat(
+            *[
+                rasters[key].rename([band_name])
+                for key, band_name in zip(batch, band_names, strict=True)
+            ],
+        )
+
+        response = get_info(
+            stacked.multiply(ee.image.Image.pixelArea()).reduceRegion(
+                reducer=ee.reducer.Reducer.sum(),
+                scale=scale,
+                geometry=bbox,
+                maxPixels=int(1e10),
+            ),
+        )
+
+        if response is None:
+            err = "No data returned from reduceRegion."
+            raise ValueError(err)
+
+        for key, band_name in zip(batch, band_names, strict=True):
+            out[key] = float(response[band_name])
+
+    return out
+
+
+def zones_to_features(zones: gpd.GeoDataFrame) -> list[ee.feature.Feature]:
+    return [
+        ee.feature.Feature(
+            ee.geometry.Geometry(shapely.geometry.mapping(geom)),
+            {"zone": str(zone)},
+        )
+        for zone, geom in zip(
+            zones["zone"],
+            zones.to_crs("EPSG:4326")["geometry"],
+            strict=True,
+        )
+    ]
+
+
+def get_zone_areas(
+    rasters: dict[str, ee.image.Image],
+    zones: gpd.GeoDataFrame,
+) -> dict[str, pd.DataFrame]:
+    # Every request reduces a batch of stacked rasters over a batch of zones, so
+    # the number of requests grows with the number of batches instead of zones
+    features = zones_to_features(zones)
+    keys = list(rasters)
+    out: dict[str, dict[str, float]] = {key: {} for key in keys}
+    for i in range(0, len(keys), AREA_BATCH_SIZE):
+        batch = keys[i : i + AREA_BATCH_SIZE]
+        band_names = [f"b{j}" for j in range(len(batch))]
+        stacked = ee.image.Image.cat(
+            *[
+                rasters[key].rename([band_name])
+                for key, band_name in zip(batch, band_names, strict=True)
+            ],
+        ).multiply(ee.image.Image.pixelArea())
+
+        # Single band images are reduced into a property named after the reducer
+        outputs = band_names if len(batch) > 1 else ["sum"]
+
+        for j in range(0, len(features), ZONE_BATCH_SIZE):
+            collection = ee.featurecollection.FeatureCollection(
+                features[j : j + ZONE_BATCH_SIZE],
+            )
+            response = get_info(
+                stacked.reduceRegions(
+                    collection=collection,
+                    reducer=ee.reducer.Reducer.sum(),
+                    scale=REDUCE_SCALE,
+                ).select(["zone", *outputs]),
+            )
+
+            if response is None:
+                err = "No data returned from reduceRegions."
+                raise ValueError(err)
+
+            for feature in response["features"]:
+                properties = feature["properties"]
+                for key, output in zip(batch, outputs, strict=True):
+                    out[key][properties["zone"]] = float(properties.get(output, 0))
+
+    return {
+        key: pd.Series(areas, name="area", dtype=float).rename_axis("zone").to_frame()
+        for key, areas in out.items()
+    }
+
+
+def fix_transition_table(table: pd.DataFrame) -> pd.DataFrame:
+    table = table.copy()
+
+    for start in LABEL_LIST:
+        if start == "forests_primary":
+            continue
+
+        table.loc[start, "forests_secondary"] = np.nansum(
+            [
+                table.loc[start, "forests_secondary"],
+                table.loc[start, "forests_primary"],
+            ],
+        )
+        table.loc[start, "forests_primary"] = np.nan
+
+    return table.fillna(0)
+
+
+def get_transition_fractions(table: pd.DataFrame) -> pd.DataFrame:
+    table = table.copy()
+
+    zero_rows = table.index[table.sum(axis=1) == 0]
+    for elem in zero_rows:
+        table.loc[elem, elem] = 1
+
+    return table.divide(table.sum(axis=1), axis=0)
+
+
+def get_transition_cube(table_frac_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    time_periods = [
+        f"{start_year}_{end_year}"
+        for start_year, end_year in zip(
+            range(2000, 2022),
+            range(2001, 2023),
+            strict=True,
+        )
+    ]
+    time_period_map = {key: i for i, key in enumerate(time_periods)}
+
+    rows = []
+    for period in time_periods:
+        table = table_frac_map[period]
+        for start_label in sorted(LABEL_LIST):
+            for end_label in sorted(LABEL_LIST):
+                rows.append(  # noqa: PERF401
+                    {
+                        "transition": f"pij_lndu_{start_label}_to_{end_label}",
+                        "time_period": time_period_map[period],
+                        "value": table.loc[start_label, end_label],
+                    },
+                )
+
+    return pd.DataFrame(rows).pivot_table(
+        index="time_period",
+        columns="transition",
+        values="value",
     )
 
 
-def transition_table_fixed_factory(top_prefix: str) -> dg.AssetsDefinition:
+def transition_table_fixed_factory(
+    top_prefix: str,
+    graph_name: str = "transition",
+) -> dg.AssetsDefinition:
     @dg.asset(
         name="table_fixed",
-        key_prefix=[top_prefix, "transition"],
-        ins={"table": dg.AssetIn([top_prefix, "transition", "table"])},
+        key_prefix=[top_prefix, graph_name],
+        ins={"table": dg.AssetIn([top_prefix, graph_name, "table"])},
         partitions_def=year_pair_partitions,
         io_manager_key="dataframe_manager",
-        group_name=f"{top_prefix}_transition",
+        group_name=f"{top_prefix}_{graph_name}",
     )
+    @instrumented
     def _asset(table: pd.DataFrame) -> pd.DataFrame:
-        table = table.set_index("start")
-
-        for start in LABEL_LIST:
-            if start == "forests_primary":
-                continue
-
-            table.loc[start, "forests_secondary"] = np.nansum(
-                [
-                    table.loc[start, "forests_secondary"],
-                    table.loc[start, "forests_primary"],
-                ],
-            )
-            table.loc[start, "forests_primary"] = np.nan
-
-        return table.fillna(0)
+        return fix_transition_table(table.set_index("start"))
 
     return _asset
 
 
-def transition_table_frac_factory(top_prefix: str) -> dg.AssetsDefinition:
+def transition_table_frac_factory(
+    top_prefix: str,
+    graph_name: str = "transition",
+) -> dg.AssetsDefinition:
     @dg.asset(
         name="table_frac",
-        key_prefix=[top_prefix, "transition"],
-        ins={"cross_fixed": dg.AssetIn([top_prefix, "transition", "table_fixed"])},
+        key_prefix=[top_prefix, graph_name],
+        ins={"cross_fixed": dg.AssetIn([top_prefix, graph_name, "table_fixed"])},
         partitions_def=year_pair_partitions,
         io_manager_key="dataframe_manager",
-        group_name=f"{top_prefix}_transition",
+        group_name=f"{top_prefix}_{graph_name}",
     )
+    @instrumented
     def _asset(cross_fixed: pd.DataFrame) -> pd.DataFrame:
-        cross_fixed = cross_fixed.set_index("start")
-
-        zero_rows = cross_fixed.index[cross_fixed.sum(axis=1) == 0]
-        for elem in zero_rows:
-            cross_fixed.loc[elem, elem] = 1
-
-        return cross_fixed.divide(cross_fixed.sum(axis=1), axis=0)
+        return get_transition_fractions(cross_fixed.set_index("start"))
 
     return _asset
 
 
-def transition_cube_factory(top_prefix: str) -> dg.AssetsDefinition:
+def transition_cube_factory(
+    top_prefix: str,
+    graph_name: str = "transition",
+) -> dg.AssetsDefinition:
     @dg.asset(
         name="cube",
-        key_prefix=[top_prefix, "transition"],
-        ins={"table_frac_map": dg.AssetIn([top_prefix, "transition", "table_frac"])},
+        key_prefix=[top_prefix, graph_name],
+        ins={"table_frac_map": dg.AssetIn([top_prefix, graph_name, "table_frac"])},
         io_manager_key="dataframe_manager",
-        group_name=f"{top_prefix}_transition",
+        group_name=f"{top_prefix}_{graph_name}",
     )
+    @instrumented
     def _asset(table_frac_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
-        time_periods = [
-            f"{start_year}_{end_year}"
-            for start_year, end_year in zip(
-                range(2000, 2022),
-                range(2001, 2023),
-                strict=True,
-            )
-        ]
-        time_period_map = {key: i for i, key in enumerate(time_periods)}
-
-        rows = []
-        for period in time_periods:
-            table = table_frac_map[period].set_index("start")
-            for start_label in sorted(LABEL_LIST):
-                for end_label in sorted(LABEL_LIST):
-                    rows.append(  # noqa: PERF401
-                        {
-                            "transition": f"pij_lndu_{start_label}_to_{end_label}",
-                            "time_period": time_period_map[period],
-                            "value": table.loc[start_label, end_label],
-                        },
-                    )
-
-        return pd.DataFrame(rows).pivot_table(
-            index="time_period",
-            columns="transition",
-            values="value",
+        return get_transition_cube(
+            {period: df.set_index("start") for period, df in table_frac_map.items()},
         )
 
     return _asset
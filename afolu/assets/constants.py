@@ -13,3 +13,25 @@ LABEL_LIST = (
 )
 
 REDUCE_SCALE = 100
+GLC30_SCALE = 30
+# The small region is reduced at the native GLC30 resolution
+SMALL_REDUCE_SCALE = GLC30_SCALE
+AREA_BATCH_SIZE = 128
+# maxPixels of every reduceRegion, and the largest computePixels response
+MAX_PIXELS = int(1e10)
+COMPUTE_PIXELS_MAX_BYTES = 48 * 2**20
+# Spherical radius in meters of the local pixel areas, as in ee.Image.pixelArea
+EARTH_RADIUS = 6_371_008.8
+
+# Draw of pastures_random_mask, the fraction of grasslands turned into pastures
+PASTURES_SEED = 42
+PASTURES_FRACTION = 0.4
+# Two-sided 95% confidence of the sampled transition estimates
+CONFIDENCE_Z = 1.96
+
+# Zones sent in every reduceRegions request
+ZONE_BATCH_SIZE = 64
+
+# Regions reduced together by the zonal assets, each one owns a bit of the
+# region flags image so that overlapping regions are counted in all of them
+ZONAL_REGIONS = ("amazon", "mexico", "small")
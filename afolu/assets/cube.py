@@ -0,0 +1,535 @@
+import hashlib
+import json
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import ee
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import rasterio as rio
+import rioxarray  # noqa: F401
+import xarray as xr
+from affine import Affine
+from rasterio.crs import CRS
+from rasterio.windows import Window
+
+import dagster as dg
+from afolu.assets.common import (
+    CLASS_CODE_COUNT,
+    class_code_image,
+    transition_cube_factory,
+    transition_table_fixed_factory,
+    transition_table_frac_factory,
+    year_to_band_name,
+)
+from afolu.assets.constants import LABEL_LIST
+from afolu.assets.load import get_source_projection
+from afolu.assets.local import (
+    evict_tile_cache,
+    get_grid_window,
+    get_region_tiles,
+    get_tile_cache_path,
+    get_tile_metadata,
+    load_row_areas,
+    read_tile_cache,
+    weighted_bincount,
+    write_tile_cache,
+)
+from afolu.instrumentation import get_pixels, instrumented, map_in_context
+from afolu.managers import (
+    PARTITION_MAP_METADATA_KEY,
+    RASTER_BLOCK_SIZE,
+    get_staging_path,
+)
+from afolu.partitions import year_pair_partitions, year_partitions
+from afolu.pools import CPU_POOL, EE_POOL
+from afolu.resources import PathResource, TilingResource
+
+CUBE_YEARS = year_partitions.get_partition_keys()
+
+
+def get_pixel_grid(
+    crs: CRS,
+    transform: Affine,
+    tile: tuple[int, int, int, int],
+) -> dict:
+    row, col, height, width = tile
+    tile_transform = transform * Affine.translation(col, row)
+    return {
+        "dimensions": {"width": width, "height": height},
+        "affineTransform": {
+            "scaleX": tile_transform.a,
+            "shearX": tile_transform.b,
+            "translateX": tile_transform.c,
+            "shearY": tile_transform.d,
+            "scaleY": tile_transform.e,
+            "translateY": tile_transform.f,
+        },
+        "crsCode": crs.to_string(),
+    }
+
+
+def fetch_tile_pixels(
+    data_path: str,
+    year_imgs: dict[str, ee.image.Image],
+    year_versions: dict[str, str],
+    grid: dict,
+) -> tuple[dict[str, np.ndarray], int]:
+    # Pixels are cached per tile of the grid, year and version of the expression
+    # of the year, only the years missing from the cache are requested
+    fpaths = {
+        year: get_tile_cache_path(
+            data_path,
+            hashlib.sha256(
+                json.dumps(["pixels", grid, year, version], sort_keys=True).encode(),
+            ).hexdigest(),
+        )
+        for year, version in year_versions.items()
+    }
+    pixels = {}
+    for year, fpath in fpaths.items():
+        entries = read_tile_cache(fpath)
+        if "pixels" in entries:
+            pixels[year] = entries["pixels"]
+
+    missing = [year for year in year_imgs if year not in pixels]
+    if len(missing) > 0:
+        fetched = get_pixels(
+            ee.image.Image.cat(*[year_imgs[year] for year in missing]),
+            grid,
+        )
+        for year in missing:
+            pixels[year] = np.asarray(fetched[year], dtype=np.uint8)
+            write_tile_cache(fpaths[year], {"pixels": pixels[year]})
+
+    return pixels, len(missing)
+
+
+def get_band_version(values: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(values)).hexdigest()[:16]
+
+
+def get_tile_name(tile: tuple[int, int, int, int]) -> str:
+    return ",".join(map(str, tile))
+
+
+def get_cube_row_areas(
+    path_resource: PathResource,
+    cube: xr.DataArray,
+) -> np.ndarray:
+    _, height, width = cube.shape
+    return load_row_areas(
+        path_resource.data_path,
+        cube.rio.crs,
+        cube.rio.transform(),
+        (height, width),
+    )
+
+
+def reduce_cube(
+    cube: xr.DataArray,
+    path_resource: PathResource,
+    tiling_resource: TilingResource,
+    df_bbox: gpd.GeoDataFrame,
+    name: str,
+    items: dict[str, tuple[int, ...]],
+    reduce: Callable[[np.ndarray, np.ndarray], np.ndarray],
+) -> np.ndarray:
+    # Every tile is read on its own and reduced to one histogram per item,
+    # computed from the bands of the item, so the cube is never loaded as a
+    # whole. Pixels outside the region take code 0
+    _, height, width = cube.shape
+    offset = (cube.attrs["row_off"], cube.attrs["col_off"])
+    row_areas = get_cube_row_areas(path_resource, cube)
+    region_tiles = get_region_tiles(
+        path_resource.data_path,
+        df_bbox.to_crs(cube.rio.crs).union_all(),
+        cube.rio.crs,
+        cube.rio.transform(),
+        (height, width),
+        tiling_resource.tile_size,
+        offset,
+    )
+
+    tile_versions = json.loads(cube.attrs.get("tile_versions", "{}"))
+
+    def reduce_tile(
+        item: tuple[tuple[int, int, int, int], Path | None],
+    ) -> tuple[np.ndarray, int]:
+        tile, mask_path = item
+        row, col, tile_height, tile_width = tile
+        mask = None if mask_path is None else np.load(mask_path)
+        window = (slice(row, row + tile_height), slice(col, col + tile_width))
+
+        # The pixels of every band are versioned when the cube is fetched,
+        # cubes tiled differently since are hashed again
+        versions = tile_versions.get(get_tile_name(tile))
+        if versions is None:
+            versions = [
+                get_band_version(values)
+                for values in cube.isel(y=window[0], x=window[1]).to_numpy()
+            ]
+
+        # Tiles are files keyed by their place on the grid and their mask, so
+        # other regions and other boundaries reuse them, and entries are keyed
+        # by the pixels of their bands
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    name,
+                    cube.rio.crs.to_string(),
+                    list(cube.rio.transform() * Affine.translation(col, row))[:6],
+                    [tile_height, tile_width],
+                    None if mask is None else hashlib.sha256(mask).hexdigest(),
+                ],
+            ).encode(),
+        ).hexdigest()
+        entry_keys = {
+            item_name: ":".join([item_name, *(versions[band] for band in bands)])
+            for item_name, bands in items.items()
+        }
+        fpath = get_tile_cache_path(path_resource.data_path, key)
+        entries = read_tile_cache(fpath)
+        missing = [
+            item_name for item_name in items if entry_keys[item_name] not in entries
+        ]
+
+        if len(missing) > 0:
+            bands = sorted({band for item_name in missing for band in items[item_name]})
+            block = cube.isel(band=bands, y=window[0], x=window[1]).to_numpy()
+            if mask is not None:
+                block = np.where(mask, block, 0)
+
+            # Entries of the same items with older pixels are dropped
+            current = set(entry_keys.values())
+            entries = {
+                entry_key: hist
+                for entry_key, hist in entries.items()
+                if entry_key in current or entry_key.split(":")[0] not in items
+            }
+            position = {band: i for i, band in enumerate(bands)}
+            for item_name in missing:
+                entries[entry_keys[item_name]] = reduce(
+                    block[[position[band] for band in items[item_name]]],
+                    row_areas[row : row + tile_height],
+                )
+            write_tile_cache(fpath, entries)
+
+        hists = np.stack([entries[entry_keys[item_name]] for item_name in items])
+        return hists, len(items) - len(missing)
+
+    with ThreadPoolExecutor(max_workers=tiling_resource.workers) as executor:
+        results = map_in_context(executor, reduce_tile, region_tiles)
+
+    hits = sum(tile_hits for _, tile_hits in results)
+    context = dg.AssetExecutionContext.get()
+    context.add_output_metadata(
+        {
+            **get_tile_metadata(
+                region_tiles,
+                (height, width),
+                tiling_resource.tile_size,
+                offset,
+            ),
+            "tile_cache_hits": hits,
+            "tile_cache_misses": len(items) * len(results) - hits,
+            "tile_cache_evicted": evict_tile_cache(
+                path_resource.data_path,
+                tiling_resource.cache_bytes,
+            ),
+        },
+    )
+    return sum(hists for hists, _ in results)
+
+
+def class_cube_factory(top_prefix: str) -> dg.AssetsDefinition:
+    ins = {
+        f"{label}_img": dg.AssetIn([top_prefix, "class_mask", label])
+        for label in LABEL_LIST
+    }
+    ins["grasslands_img"] = dg.AssetIn([top_prefix, "class_mask", "grasslands_merged"])
+    ins["df_bbox"] = dg.AssetIn([top_prefix, "bbox", "shapely"])
+
+    @dg.asset(
+        name="class_cube",
+        key_prefix=top_prefix,
+        ins=ins,
+        io_manager_key="dataarray_manager",
+        group_name=f"{top_prefix}_cube",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        path_resource: PathResource,
+        tiling_resource: TilingResource,
+        df_bbox: gpd.GeoDataFrame,
+        croplands_img: ee.image.Image,
+        flooded_img: ee.image.Image,
+        forests_mangroves_img: ee.image.Image,
+        forests_primary_img: ee.image.Image,
+        forests_secondary_img: ee.image.Image,
+        grasslands_img: ee.image.Image,
+        other_img: ee.image.Image,
+        pastures_img: ee.image.Image,
+        settlements_img: ee.image.Image,
+        shrublands_img: ee.image.Image,
+        wetlands_img: ee.image.Image,
+    ) -> Path:
+        img_map = {
+            "croplands": croplands_img,
+            "flooded": flooded_img,
+            "forests_mangroves": forests_mangroves_img,
+            "forests_primary": forests_primary_img,
+            "forests_secondary": forests_secondary_img,
+            "grasslands": grasslands_img,
+            "other": other_img,
+            "pastures": pastures_img,
+            "settlements": settlements_img,
+            "shrublands": shrublands_img,
+            "wetlands": wetlands_img,
+        }
+
+        # Tiles follow the grid of the source imagery, which the mode composite
+        # of glc30 does not keep
+        proj = get_source_projection()
+
+        crs = CRS.from_user_input(proj["crs"])
+        grid_transform = Affine(*proj["transform"])
+        df_region = df_bbox.to_crs(crs)
+        row_off, col_off, height, width = get_grid_window(
+            grid_transform,
+            tuple(df_region.total_bounds),
+        )
+        transform = grid_transform * Affine.translation(col_off, row_off)
+        region_tiles = get_region_tiles(
+            path_resource.data_path,
+            df_region.union_all(),
+            crs,
+            transform,
+            (height, width),
+            tiling_resource.tile_size,
+            (row_off, col_off),
+        )
+
+        # Class codes of every year, versioned by the expression that computes
+        # them
+        year_imgs = {
+            year: class_code_image(img_map, year_to_band_name(year)).rename(year)
+            for year in CUBE_YEARS
+        }
+        year_versions = {
+            year: hashlib.sha256(img.serialize().encode()).hexdigest()[:16]
+            for year, img in year_imgs.items()
+        }
+
+        tile_versions = {}
+        hits = []
+        write_lock = threading.Lock()
+
+        # Tiles are written to the staged GeoTIFF as they arrive, so the cube is
+        # never held in memory. Tiles outside the region are never requested and
+        # stay 0
+        def fetch_tile(item: tuple[tuple[int, int, int, int], Path | None]) -> None:
+            tile, mask_path = item
+            row, col, tile_height, tile_width = tile
+            pixels, fetched = fetch_tile_pixels(
+                path_resource.data_path,
+                year_imgs,
+                year_versions,
+                get_pixel_grid(crs, transform, tile),
+            )
+            mask = None if mask_path is None else np.load(mask_path)
+            values = np.stack(
+                [
+                    pixels[year] if mask is None else np.where(mask, pixels[year], 0)
+                    for year in CUBE_YEARS
+                ],
+            ).astype(np.uint8)
+            with write_lock:
+                dataset.write(
+                    values,
+                    window=Window(col, row, tile_width, tile_height),  # pyright: ignore[reportCallIssue]
+                )
+                tile_versions[get_tile_name(tile)] = [
+                    get_band_version(band) for band in values
+                ]
+                hits.append(len(CUBE_YEARS) - fetched)
+
+        fpath = get_staging_path(path_resource.data_path)
+        try:
+            with (
+                rio.open(
+                    fpath,
+                    "w",
+                    driver="GTiff",
+                    height=height,
+                    width=width,
+                    count=len(CUBE_YEARS),
+                    dtype=np.uint8,
+                    crs=crs,
+                    transform=transform,
+                    tiled=True,
+                    blockxsize=RASTER_BLOCK_SIZE,
+                    blockysize=RASTER_BLOCK_SIZE,
+                ) as dataset,
+                ThreadPoolExecutor(max_workers=tiling_resource.workers) as executor,
+            ):
+                map_in_context(executor, fetch_tile, region_tiles)
+
+                # Tile histograms of the cube are cached under these tags
+                dataset.descriptions = tuple(CUBE_YEARS)
+                dataset.update_tags(
+                    tile_versions=json.dumps(tile_versions),
+                    row_off=row_off,
+                    col_off=col_off,
+                )
+        except BaseException:
+            fpath.unlink(missing_ok=True)
+            raise
+
+        context.add_output_metadata(
+            {
+                **get_tile_metadata(
+                    region_tiles,
+                    (height, width),
+                    tiling_resource.tile_size,
+                    (row_off, col_off),
+                ),
+                "pixel_cache_hits": sum(hits),
+                "pixel_cache_misses": len(CUBE_YEARS) * len(hits) - sum(hits),
+                "tile_cache_evicted": evict_tile_cache(
+                    path_resource.data_path,
+                    tiling_resource.cache_bytes,
+                ),
+            },
+        )
+        return fpath
+
+    return _asset
+
+
+def area_local_table_merged_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="table_merged",
+        key_prefix=[top_prefix, "area_local"],
+        ins={
+            "cube": dg.AssetIn([top_prefix, "class_cube"]),
+            "df_bbox": dg.AssetIn([top_prefix, "bbox", "shapely"]),
+        },
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_area_local",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(
+        path_resource: PathResource,
+        tiling_resource: TilingResource,
+        cube: xr.DataArray,
+        df_bbox: gpd.GeoDataFrame,
+    ) -> pd.DataFrame:
+        years = [str(year) for year in cube["band"].to_numpy()]
+
+        areas = reduce_cube(
+            cube,
+            path_resource,
+            tiling_resource,
+            df_bbox,
+            "area",
+            {year: (i,) for i, year in enumerate(years)},
+            lambda block, row_areas: weighted_bincount(
+                block[0],
+                row_areas,
+                CLASS_CODE_COUNT,
+            ),
+        )
+
+        # Code 0 marks pixels without a class
+        return pd.DataFrame(
+            areas[:, 1:].T / 10_000,
+            index=pd.Index(LABEL_LIST, name="label"),
+            columns=pd.Index([int(year) - 2000 for year in years], name="year"),
+        ).sort_index()
+
+    return _asset
+
+
+def transition_local_table_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="table",
+        key_prefix=[top_prefix, "transition_local"],
+        ins={
+            "cube": dg.AssetIn([top_prefix, "class_cube"]),
+            "df_bbox": dg.AssetIn([top_prefix, "bbox", "shapely"]),
+        },
+        partitions_def=year_pair_partitions,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_transition_local",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        path_resource: PathResource,
+        tiling_resource: TilingResource,
+        cube: xr.DataArray,
+        df_bbox: gpd.GeoDataFrame,
+    ) -> dict[str, pd.DataFrame]:
+        band_index = {str(year): i for i, year in enumerate(cube["band"].to_numpy())}
+        pairs = {
+            key: (band_index[start_year], band_index[end_year])
+            for key, (start_year, end_year) in (
+                (key, key.split("_")) for key in context.partition_keys
+            )
+        }
+
+        areas = reduce_cube(
+            cube,
+            path_resource,
+            tiling_resource,
+            df_bbox,
+            "transition",
+            pairs,
+            lambda block, row_areas: weighted_bincount(
+                block[0].astype(np.int64) * CLASS_CODE_COUNT + block[1],
+                row_areas,
+                CLASS_CODE_COUNT**2,
+            ),
+        )
+
+        labels = sorted(LABEL_LIST)
+        out = {}
+        for partition_key, pair_areas in zip(
+            context.partition_keys,
+            areas,
+            strict=True,
+        ):
+            # Code 0 marks pixels without a class in either year
+            table = pair_areas.reshape(CLASS_CODE_COUNT, CLASS_CODE_COUNT)[1:, 1:]
+            out[partition_key] = (
+                pd.DataFrame(table, index=LABEL_LIST, columns=LABEL_LIST)
+                .reindex(index=labels, columns=labels)
+                .rename_axis(index="start", columns="end")
+            )
+        return out
+
+    return _asset
+
+
+dassets = [
+    asset
+    for top_prefix in ("small",)
+    for asset in (
+        class_cube_factory(top_prefix),
+        area_local_table_merged_factory(top_prefix),
+        transition_local_table_factory(top_prefix),
+        transition_table_fixed_factory(top_prefix, "transition_local"),
+        transition_table_frac_factory(top_prefix, "transition_local"),
+        transition_cube_factory(top_prefix, "transition_local"),
+    )
+]
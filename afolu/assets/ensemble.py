@@ -0,0 +1,227 @@
+from collections import defaultdict
+from itertools import product
+
+import ee
+import numpy as np
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.common import (
+    CLASS_CODE_COUNT,
+    class_code_image,
+    fix_transition_table,
+    get_transition_cube,
+    get_transition_fractions,
+    year_to_band_name,
+)
+from afolu.assets.constants import LABEL_LIST, REDUCE_SCALE, SMALL_REDUCE_SCALE
+from afolu.assets.load import get_source_projection
+from afolu.instrumentation import get_info, instrumented
+from afolu.managers import PARTITION_MAP_METADATA_KEY
+from afolu.partitions import year_pair_partitions
+from afolu.pools import CPU_POOL, EE_POOL
+from afolu.resources import EnsembleResource
+
+# Grasslands that may turn into pastures take the code of pastures in the
+# ensemble rasters, each member splits them between pastures and grasslands
+PASTURES_CODE = LABEL_LIST.index("pastures") + 1
+GRASSLANDS_CODE = LABEL_LIST.index("grasslands") + 1
+ENSEMBLE_QUANTILES = (0.05, 0.5, 0.95)
+
+
+def get_members(ensemble_resource: EnsembleResource) -> list[tuple[int, float]]:
+    return list(product(ensemble_resource.seeds, ensemble_resource.fractions))
+
+
+def split_members(
+    groups: list[dict],
+    members: list[tuple[int, float]],
+) -> pd.DataFrame:
+    # The first sum is the area of the group, the others the area each member
+    # turns into pastures
+    areas: dict[tuple[int, int, int], float] = defaultdict(float)
+    for group in groups:
+        start, end = divmod(int(group["zone"]), CLASS_CODE_COUNT)
+        total, *pasture_areas = group["sum"]
+
+        if PASTURES_CODE not in (start, end):
+            for i in range(len(members)):
+                areas[i, start, end] += total
+            continue
+
+        grasslands_start = GRASSLANDS_CODE if start == PASTURES_CODE else start
+        grasslands_end = GRASSLANDS_CODE if end == PASTURES_CODE else end
+        for i, pasture_area in enumerate(pasture_areas):
+            areas[i, start, end] += pasture_area
+            areas[i, grasslands_start, grasslands_end] += total - pasture_area
+
+    rows = [
+        {
+            "seed": members[i][0],
+            "fraction": members[i][1],
+            "start": LABEL_LIST[start - 1],
+            "end": LABEL_LIST[end - 1],
+            "area": area,
+        }
+        for (i, start, end), area in areas.items()
+        if start != 0 and end != 0
+    ]
+    return pd.DataFrame(rows, columns=["seed", "fraction", "start", "end", "area"])
+
+
+def ensemble_table_factory(top_prefix: str, scale: int) -> dg.AssetsDefinition:
+    ins = {
+        f"{label}_img": dg.AssetIn([top_prefix, "class_mask", label])
+        for label in LABEL_LIST
+        if label != "pastures"
+    }
+    ins["grasslands_to_pastures_img"] = dg.AssetIn(
+        [top_prefix, "class_mask", "grasslands_to_pastures"],
+    )
+    ins["bbox"] = dg.AssetIn([top_prefix, "bbox", "ee"])
+
+    @dg.asset(
+        name="table",
+        key_prefix=[top_prefix, "ensemble"],
+        ins=ins,
+        partitions_def=year_pair_partitions,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_ensemble",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        ensemble_resource: EnsembleResource,
+        bbox: ee.geometry.Geometry,
+        croplands_img: ee.image.Image,
+        flooded_img: ee.image.Image,
+        forests_mangroves_img: ee.image.Image,
+        forests_primary_img: ee.image.Image,
+        forests_secondary_img: ee.image.Image,
+        grasslands_img: ee.image.Image,
+        grasslands_to_pastures_img: ee.image.Image,
+        other_img: ee.image.Image,
+        settlements_img: ee.image.Image,
+        shrublands_img: ee.image.Image,
+        wetlands_img: ee.image.Image,
+    ) -> dict[str, pd.DataFrame]:
+        img_map = {
+            "croplands": croplands_img,
+            "flooded": flooded_img,
+            "forests_mangroves": forests_mangroves_img,
+            "forests_primary": forests_primary_img,
+            "forests_secondary": forests_secondary_img,
+            "grasslands": grasslands_img,
+            "other": other_img,
+            "pastures": grasslands_to_pastures_img,
+            "settlements": settlements_img,
+            "shrublands": shrublands_img,
+            "wetlands": wetlands_img,
+        }
+
+        # The draws follow the grid of the source imagery, which the mode
+        # composite of glc30 does not keep
+        proj = get_source_projection()
+
+        # Each member adds one band with the area of the pixels it turns into
+        # pastures, the same draws as pastures_random_mask for its seed
+        members = get_members(ensemble_resource)
+        area_img = ee.image.Image.pixelArea().rename("area")
+        member_imgs = [
+            area_img.multiply(
+                ee.image.Image.random(seed)
+                .reproject(crs=proj["crs"], crsTransform=proj["transform"])
+                .lte(fraction),
+            ).rename(f"m{i}")
+            for i, (seed, fraction) in enumerate(members)
+        ]
+
+        out = {}
+        for partition_key in context.partition_keys:
+            start_year, end_year = partition_key.split("_")
+            start_img = class_code_image(img_map, year_to_band_name(start_year))
+            end_img = class_code_image(img_map, year_to_band_name(end_year))
+            zone_img = start_img.multiply(CLASS_CODE_COUNT).add(end_img).rename("zone")
+
+            response = get_info(
+                ee.image.Image.cat(area_img, *member_imgs, zone_img).reduceRegion(
+                    reducer=ee.reducer.Reducer.sum()
+                    .repeat(len(members) + 1)
+                    .group(groupField=len(members) + 1, groupName="zone"),
+                    scale=scale,
+                    geometry=bbox,
+                    maxPixels=int(1e10),
+                ),
+            )
+
+            if response is None:
+                err = "No data returned from reduceRegion."
+                raise ValueError(err)
+
+            out[partition_key] = split_members(response["groups"], members)
+
+        context.add_output_metadata({"members": len(members)})
+        return out
+
+    return _asset
+
+
+def ensemble_cube_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="cube",
+        key_prefix=[top_prefix, "ensemble"],
+        ins={"table_map": dg.AssetIn([top_prefix, "ensemble", "table"])},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_ensemble",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(table_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
+        labels = sorted(LABEL_LIST)
+
+        frac_maps: dict[tuple[int, float], dict[str, pd.DataFrame]] = defaultdict(dict)
+        for period, df in table_map.items():
+            for member, member_df in df.groupby(["seed", "fraction"]):
+                table = (
+                    member_df.pivot_table(index="start", columns="end", values="area")
+                    .reindex(index=labels, columns=labels)
+                    .fillna(0)
+                )
+                frac_maps[member][period] = get_transition_fractions(
+                    fix_transition_table(table),
+                )
+
+        cubes = [get_transition_cube(frac_map) for frac_map in frac_maps.values()]
+        stacked = np.stack([cube.to_numpy() for cube in cubes])
+        index, columns = cubes[0].index, cubes[0].columns
+
+        stats = {"mean": stacked.mean(axis=0)}
+        for q in ENSEMBLE_QUANTILES:
+            stats[f"q{round(q * 100):02d}"] = np.quantile(stacked, q, axis=0)
+
+        return pd.concat(
+            {
+                name: pd.DataFrame(values, index=index, columns=columns)
+                for name, values in stats.items()
+            },
+            names=["statistic"],
+        )
+
+    return _asset
+
+
+dassets = [
+    asset
+    for top_prefix, scale in (
+        ("amazon", REDUCE_SCALE),
+        ("mexico", REDUCE_SCALE),
+        ("small", SMALL_REDUCE_SCALE),
+    )
+    for asset in (
+        ensemble_table_factory(top_prefix, scale),
+        ensemble_cube_factory(top_prefix),
+    )
+]
@@ -1,6 +1,6 @@
 import dagster as dg
-from afolu.assets.large import areas, transitions
+from afolu.assets.large import areas, samples, transitions
 
 defs = dg.Definitions(
-    assets=dg.load_assets_from_modules([areas, transitions]),
+    assets=dg.load_assets_from_modules([areas, samples, transitions]),
 )
@@ -1,10 +1,35 @@
+import math
+from typing import Any
+
 import ee
+import geopandas as gpd
 import pandas as pd
 
 import dagster as dg
-from afolu.assets.common import get_raster_area, year_to_band_name
-from afolu.assets.constants import LABEL_LIST
+from afolu.assets.common import (
+    get_raster_areas,
+    get_zone_areas,
+    reduce_changed,
+    reduce_progressive,
+    year_to_band_name,
+)
+from afolu.assets.constants import (
+    AREA_BATCH_SIZE,
+    LABEL_LIST,
+    REDUCE_SCALE,
+    ZONE_BATCH_SIZE,
+)
+from afolu.assets.plan import require_plan
+from afolu.instrumentation import instrumented
+from afolu.managers import PARTITION_MAP_METADATA_KEY
 from afolu.partitions import label_partitions, year_partitions
+from afolu.pools import CPU_POOL, EE_POOL
+from afolu.resources import (
+    MosaicResource,
+    PlannerResource,
+    ReductionResource,
+    TilingResource,
+)
 
 
 def area_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
@@ -21,9 +46,12 @@ def area_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
         partitions_def=dg.MultiPartitionsDefinition(
             {"year": year_partitions, "label": label_partitions},
         ),
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_area",
     )
+    @instrumented
     def _asset(
         context: dg.AssetExecutionContext,
         croplands_img: ee.image.Image,
@@ -37,10 +65,7 @@ def area_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
         settlements_img: ee.image.Image,
         shrublands_img: ee.image.Image,
         wetlands_img: ee.image.Image,
-    ) -> ee.image.Image:
-        label, year = context.partition_key.split("|")
-        band = year_to_band_name(year)
-
+    ) -> dict[str, ee.image.Image]:
         img_map = {
             "croplands": croplands_img,
             "flooded": flooded_img,
@@ -55,7 +80,12 @@ def area_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
             "wetlands": wetlands_img,
         }
 
-        return img_map[label].select(band).rename("class")
+        out = {}
+        for partition_key in context.partition_keys:
+            label, year = partition_key.split("|")
+            band = year_to_band_name(year)
+            out[partition_key] = img_map[label].select(band).rename("class")
+        return out
 
     return _asset
 
@@ -65,8 +95,12 @@ def area_value_factory(top_prefix: str) -> dg.AssetsDefinition:
         name="value",
         key_prefix=[top_prefix, "area"],
         ins={
-            "raster": dg.AssetIn([top_prefix, "area", "raster"]),
+            "raster": dg.AssetIn(
+                [top_prefix, "area", "raster"],
+                metadata={PARTITION_MAP_METADATA_KEY: True},
+            ),
             "bbox": dg.AssetIn([top_prefix, "bbox", "ee"]),
+            "df_region": dg.AssetIn([top_prefix, "bbox", "region"]),
         },
         partitions_def=dg.MultiPartitionsDefinition(
             {
@@ -74,11 +108,95 @@ def area_value_factory(top_prefix: str) -> dg.AssetsDefinition:
                 "label": label_partitions,
             },
         ),
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
         io_manager_key="text_manager",
         group_name=f"{top_prefix}_area",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        planner_resource: PlannerResource,
+        mosaic_resource: MosaicResource,
+        reduction_resource: ReductionResource,
+        tiling_resource: TilingResource,
+        raster: dict[str, ee.image.Image],
+        bbox: ee.geometry.Geometry,
+        df_region: gpd.GeoDataFrame,
+    ) -> dict[str, Any]:
+        # Rasters are reduced AREA_BATCH_SIZE at a time at every scale
+        require_plan(
+            planner_resource,
+            mosaic_resource,
+            tiling_resource,
+            df_region,
+            reduction_resource.scales or [REDUCE_SCALE],
+            math.ceil(len(raster) / AREA_BATCH_SIZE),
+        )
+        return reduce_changed(
+            raster,
+            lambda changed: reduce_progressive(
+                lambda scale: get_raster_areas(changed, bbox, scale),
+                reduction_resource,
+            ),
+            bbox,
+            reduction_resource.model_dump_json(exclude={"force"}),
+            force=reduction_resource.force,
+        )
+
+    return _asset
+
+
+def area_zone_value_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="zone_value",
+        key_prefix=[top_prefix, "area"],
+        ins={
+            "raster": dg.AssetIn(
+                [top_prefix, "area", "raster"],
+                metadata={PARTITION_MAP_METADATA_KEY: True},
+            ),
+            "zones": dg.AssetIn([top_prefix, "zones"]),
+            "df_region": dg.AssetIn([top_prefix, "bbox", "region"]),
+        },
+        partitions_def=dg.MultiPartitionsDefinition(
+            {
+                "year": year_partitions,
+                "label": label_partitions,
+            },
+        ),
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_area",
+        pool=EE_POOL,
     )
-    def _asset(raster: ee.image.Image, bbox: ee.geometry.Geometry) -> float:
-        return get_raster_area(raster, bbox)
+    @instrumented
+    def _asset(
+        planner_resource: PlannerResource,
+        mosaic_resource: MosaicResource,
+        reduction_resource: ReductionResource,
+        tiling_resource: TilingResource,
+        raster: dict[str, ee.image.Image],
+        zones: gpd.GeoDataFrame,
+        df_region: gpd.GeoDataFrame,
+    ) -> dict[str, Any]:
+        # Rasters and zones are reduced in batches at the default scale
+        require_plan(
+            planner_resource,
+            mosaic_resource,
+            tiling_resource,
+            df_region,
+            [REDUCE_SCALE],
+            math.ceil(len(raster) / AREA_BATCH_SIZE)
+            * math.ceil(len(zones) / ZONE_BATCH_SIZE),
+        )
+        return reduce_changed(
+            raster,
+            lambda changed: get_zone_areas(changed, zones),
+            zones.to_json(),
+            force=reduction_resource.force,
+        )
 
     return _asset
 
@@ -92,7 +210,9 @@ def area_table_factory(top_prefix: str) -> dg.AssetsDefinition:
         },
         io_manager_key="dataframe_manager",
         group_name=f"{top_prefix}_area",
+        pool=CPU_POOL,
     )
+    @instrumented
     def _asset(value_map: dict[str, float]) -> pd.DataFrame:
         rows = []
         for key, area in value_map.items():
@@ -113,6 +233,32 @@ def area_table_factory(top_prefix: str) -> dg.AssetsDefinition:
     return _asset
 
 
+def area_zone_table_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="zone_table",
+        key_prefix=[top_prefix, "area"],
+        ins={
+            "value_map": dg.AssetIn([top_prefix, "area", "zone_value"]),
+        },
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_area",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(value_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
+        out = []
+        for key, df in value_map.items():
+            label, year = key.split("|")
+            out.append(df.assign(label=label, year=int(year) - 2000))
+        return (
+            pd.concat(out)
+            .pivot_table(index=["zone", "label"], columns="year", values="area")
+            .divide(10_000)
+        )
+
+    return _asset
+
+
 def area_table_frac_factory(top_prefix: str) -> dg.AssetsDefinition:
     @dg.asset(
         name="table_frac",
@@ -123,6 +269,7 @@ def area_table_frac_factory(top_prefix: str) -> dg.AssetsDefinition:
         io_manager_key="dataframe_manager",
         group_name=f"{top_prefix}_area",
     )
+    @instrumented
     def _asset(table: pd.DataFrame) -> pd.DataFrame:
         table = table.set_index("label")
         return table.div(table.sum(axis=0), axis=1)
@@ -135,7 +282,9 @@ dassets = [
     for factory in (
         area_raster_factory,
         area_value_factory,
+        area_zone_value_factory,
         area_table_factory,
+        area_zone_table_factory,
         area_table_frac_factory,
     )
     for top_prefix in ["amazon", "mexico"]
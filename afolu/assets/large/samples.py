@@ -0,0 +1,201 @@
+import ee
+import numpy as np
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.common import (
+    class_code_image,
+    transition_cube_factory,
+    transition_table_fixed_factory,
+    transition_table_frac_factory,
+    year_to_band_name,
+)
+from afolu.assets.constants import CONFIDENCE_Z, LABEL_LIST, REDUCE_SCALE
+from afolu.instrumentation import get_info, instrumented
+from afolu.managers import PARTITION_MAP_METADATA_KEY
+from afolu.partitions import year_pair_partitions
+from afolu.pools import EE_POOL
+from afolu.resources import SamplingResource
+
+
+def sample_transitions(
+    start_img: ee.image.Image,
+    end_img: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+    sampling_resource: SamplingResource,
+) -> pd.DataFrame:
+    response = get_info(
+        start_img.rename("start")
+        .addBands(end_img.rename("end"))
+        .stratifiedSample(
+            numPoints=sampling_resource.points_per_class,
+            classBand="start",
+            region=bbox,
+            scale=REDUCE_SCALE,
+            seed=sampling_resource.seed,
+            geometries=False,
+        ),
+    )
+
+    if response is None:
+        err = "No data returned from stratifiedSample."
+        raise ValueError(err)
+
+    return pd.DataFrame(
+        [feature["properties"] for feature in response["features"]],
+        columns=["start", "end"],
+    ).astype(int)
+
+
+def get_strata_areas(table: pd.DataFrame, year: str) -> dict[int, float]:
+    # Strata are the class codes of class_code_image, the area table holds the
+    # hectares of every label with one column per year since 2000
+    areas = table.set_index("label").rename(columns=int)[int(year) - 2000].fillna(0)
+    return {
+        LABEL_LIST.index(label) + 1: float(area) * 10_000
+        for label, area in areas.items()
+    }
+
+
+def estimate_transitions(
+    strata_areas: dict[int, float],
+    samples: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Strata are the start classes, so every row of the table is the stratum area
+    # split by the sampled proportions of each end class
+    counts = pd.crosstab(samples["start"], samples["end"])
+    n = counts.sum(axis=1)
+    p = counts.divide(n, axis=0)
+    areas = pd.Series(strata_areas).reindex(counts.index, fill_value=0)
+
+    table = p.multiply(areas, axis=0)
+    half_width = (
+        np.sqrt(p * (1 - p)).divide(np.sqrt((n - 1).clip(lower=1)), axis=0)
+    ).multiply(areas * CONFIDENCE_Z, axis=0)
+
+    labels = sorted(LABEL_LIST)
+    out = []
+    for df in (table, half_width):
+        # Code 0 marks pixels without a class in either year
+        classified = df.loc[df.index != 0, df.columns != 0].rename(
+            index=lambda code: LABEL_LIST[code - 1],
+            columns=lambda code: LABEL_LIST[code - 1],
+        )
+        out.append(
+            classified.reindex(index=labels, columns=labels, fill_value=0)
+            .fillna(0)
+            .rename_axis(index="start", columns="end"),
+        )
+    return out[0], out[1]
+
+
+def transition_table_sampled_factory(top_prefix: str) -> dg.AssetsDefinition:
+    ins = {
+        f"{label}_img": dg.AssetIn([top_prefix, "class_mask", label])
+        for label in LABEL_LIST
+    }
+    ins["grasslands_img"] = dg.AssetIn([top_prefix, "class_mask", "grasslands_merged"])
+    ins["bbox"] = dg.AssetIn([top_prefix, "bbox", "ee"])
+    ins["area_table"] = dg.AssetIn([top_prefix, "area", "table"])
+
+    # The estimates and their 95% confidence half widths are written side by
+    # side, one table of each per partition
+    @dg.multi_asset(
+        name=f"{top_prefix}_transition_sampled_table",
+        outs={
+            name: dg.AssetOut(
+                key=[top_prefix, "transition_sampled", name],
+                metadata={PARTITION_MAP_METADATA_KEY: True},
+                io_manager_key="dataframe_manager",
+            )
+            for name in ("table", "half_width")
+        },
+        ins=ins,
+        partitions_def=year_pair_partitions,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        group_name=f"{top_prefix}_transition_sampled",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        sampling_resource: SamplingResource,
+        bbox: ee.geometry.Geometry,
+        area_table: pd.DataFrame,
+        croplands_img: ee.image.Image,
+        flooded_img: ee.image.Image,
+        forests_mangroves_img: ee.image.Image,
+        forests_primary_img: ee.image.Image,
+        forests_secondary_img: ee.image.Image,
+        grasslands_img: ee.image.Image,
+        other_img: ee.image.Image,
+        pastures_img: ee.image.Image,
+        settlements_img: ee.image.Image,
+        shrublands_img: ee.image.Image,
+        wetlands_img: ee.image.Image,
+    ) -> tuple[dict[str, pd.DataFrame], dict[str, pd.DataFrame]]:
+        img_map = {
+            "croplands": croplands_img,
+            "flooded": flooded_img,
+            "forests_mangroves": forests_mangroves_img,
+            "forests_primary": forests_primary_img,
+            "forests_secondary": forests_secondary_img,
+            "grasslands": grasslands_img,
+            "other": other_img,
+            "pastures": pastures_img,
+            "settlements": settlements_img,
+            "shrublands": shrublands_img,
+            "wetlands": wetlands_img,
+        }
+
+        out, half_widths = {}, {}
+        sample_points = 0
+        max_half_width, max_half_width_pct = 0.0, 0.0
+        for partition_key in context.partition_keys:
+            start_year, end_year = partition_key.split("_")
+            start_img = class_code_image(img_map, year_to_band_name(start_year))
+            end_img = class_code_image(img_map, year_to_band_name(end_year))
+
+            # The stratum areas come from the area table instead of another
+            # reduction of the start year
+            strata_areas = get_strata_areas(area_table, start_year)
+            samples = sample_transitions(start_img, end_img, bbox, sampling_resource)
+            table, half_width = estimate_transitions(strata_areas, samples)
+            out[partition_key] = table
+            half_widths[partition_key] = half_width
+
+            # Half widths are also reported relative to the area of the region
+            half_width_max = float(half_width.to_numpy().max())
+            total_area = sum(strata_areas.values())
+            sample_points += len(samples)
+            max_half_width = max(max_half_width, half_width_max)
+            if total_area > 0:
+                max_half_width_pct = max(
+                    max_half_width_pct,
+                    100 * half_width_max / total_area,
+                )
+
+        context.add_output_metadata(
+            {
+                "sample_points": sample_points,
+                "points_per_class": sampling_resource.points_per_class,
+                "ci_half_width_max_ha": max_half_width / 10_000,
+                "ci_half_width_max_pct": max_half_width_pct,
+            },
+            output_name="table",
+        )
+        return out, half_widths
+
+    return _asset
+
+
+dassets = [
+    asset
+    for top_prefix in ("amazon", "mexico")
+    for asset in (
+        transition_table_sampled_factory(top_prefix),
+        transition_table_fixed_factory(top_prefix, "transition_sampled"),
+        transition_table_frac_factory(top_prefix, "transition_sampled"),
+        transition_cube_factory(top_prefix, "transition_sampled"),
+    )
+]
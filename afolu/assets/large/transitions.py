@@ -1,16 +1,38 @@
+import math
+from typing import Any
+
 import ee
+import geopandas as gpd
 import pandas as pd
 
 import dagster as dg
 from afolu.assets.common import (
-    get_raster_area,
+    get_raster_areas,
+    get_zone_areas,
+    reduce_changed,
+    reduce_progressive,
     transition_cube_factory,
     transition_table_fixed_factory,
     transition_table_frac_factory,
     year_to_band_name,
 )
-from afolu.assets.constants import LABEL_LIST
+from afolu.assets.constants import (
+    AREA_BATCH_SIZE,
+    LABEL_LIST,
+    REDUCE_SCALE,
+    ZONE_BATCH_SIZE,
+)
+from afolu.assets.plan import require_plan
+from afolu.instrumentation import instrumented
+from afolu.managers import PARTITION_MAP_METADATA_KEY
 from afolu.partitions import label_pair_partitions, year_pair_partitions
+from afolu.pools import CPU_POOL, EE_POOL
+from afolu.resources import (
+    MosaicResource,
+    PlannerResource,
+    ReductionResource,
+    TilingResource,
+)
 
 cross_partitions_def = dg.MultiPartitionsDefinition(
     {
@@ -33,8 +55,11 @@ def transition_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
         ins=ins,
         io_manager_key="ee_manager",
         partitions_def=cross_partitions_def,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
         group_name=f"{top_prefix}_transition",
     )
+    @instrumented
     def _asset(
         context: dg.AssetExecutionContext,
         croplands_img: ee.image.Image,
@@ -48,15 +73,7 @@ def transition_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
         settlements_img: ee.image.Image,
         shrublands_img: ee.image.Image,
         wetlands_img: ee.image.Image,
-    ) -> ee.image.Image:
-        label_pair, year_pair = context.partition_key.split("|")
-
-        start_year, end_year = year_pair.split("_")
-        start_band = year_to_band_name(start_year)
-        end_band = year_to_band_name(end_year)
-
-        start_label, end_label = label_pair.split("-")
-
+    ) -> dict[str, ee.image.Image]:
         img_map = {
             "croplands": croplands_img,
             "flooded": flooded_img,
@@ -71,10 +88,21 @@ def transition_raster_factory(top_prefix: str) -> dg.AssetsDefinition:
             "wetlands": wetlands_img,
         }
 
-        a: ee.image.Image = img_map[start_label].select(start_band).rename("class")
-        b: ee.image.Image = img_map[end_label].select(end_band).rename("class")
+        out = {}
+        for partition_key in context.partition_keys:
+            label_pair, year_pair = partition_key.split("|")
 
-        return a.And(b)
+            start_year, end_year = year_pair.split("_")
+            start_band = year_to_band_name(start_year)
+            end_band = year_to_band_name(end_year)
+
+            start_label, end_label = label_pair.split("-")
+
+            a: ee.image.Image = img_map[start_label].select(start_band).rename("class")
+            b: ee.image.Image = img_map[end_label].select(end_band).rename("class")
+
+            out[partition_key] = a.And(b)
+        return out
 
     return _asset
 
@@ -84,15 +112,98 @@ def transition_value_factory(top_prefix: str) -> dg.AssetsDefinition:
         name="value",
         key_prefix=[top_prefix, "transition"],
         ins={
-            "raster": dg.AssetIn([top_prefix, "transition", "raster_split"]),
+            "raster": dg.AssetIn(
+                [top_prefix, "transition", "raster_split"],
+                metadata={PARTITION_MAP_METADATA_KEY: True},
+            ),
             "bbox": dg.AssetIn([top_prefix, "bbox", "ee"]),
+            "df_region": dg.AssetIn([top_prefix, "bbox", "region"]),
         },
         partitions_def=cross_partitions_def,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
         io_manager_key="text_manager",
         group_name=f"{top_prefix}_transition",
+        pool=EE_POOL,
     )
-    def _asset(raster: ee.image.Image, bbox: ee.geometry.Geometry) -> float:
-        return get_raster_area(raster, bbox)
+    @instrumented
+    def _asset(
+        planner_resource: PlannerResource,
+        mosaic_resource: MosaicResource,
+        reduction_resource: ReductionResource,
+        tiling_resource: TilingResource,
+        raster: dict[str, ee.image.Image],
+        bbox: ee.geometry.Geometry,
+        df_region: gpd.GeoDataFrame,
+    ) -> dict[str, Any]:
+        # Rasters are reduced AREA_BATCH_SIZE at a time at every scale
+        require_plan(
+            planner_resource,
+            mosaic_resource,
+            tiling_resource,
+            df_region,
+            reduction_resource.scales or [REDUCE_SCALE],
+            math.ceil(len(raster) / AREA_BATCH_SIZE),
+        )
+        return reduce_changed(
+            raster,
+            lambda changed: reduce_progressive(
+                lambda scale: get_raster_areas(changed, bbox, scale),
+                reduction_resource,
+            ),
+            bbox,
+            reduction_resource.model_dump_json(exclude={"force"}),
+            force=reduction_resource.force,
+        )
+
+    return _asset
+
+
+def transition_zone_value_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="zone_value",
+        key_prefix=[top_prefix, "transition"],
+        ins={
+            "raster": dg.AssetIn(
+                [top_prefix, "transition", "raster_split"],
+                metadata={PARTITION_MAP_METADATA_KEY: True},
+            ),
+            "zones": dg.AssetIn([top_prefix, "zones"]),
+            "df_region": dg.AssetIn([top_prefix, "bbox", "region"]),
+        },
+        partitions_def=cross_partitions_def,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_transition",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        planner_resource: PlannerResource,
+        mosaic_resource: MosaicResource,
+        reduction_resource: ReductionResource,
+        tiling_resource: TilingResource,
+        raster: dict[str, ee.image.Image],
+        zones: gpd.GeoDataFrame,
+        df_region: gpd.GeoDataFrame,
+    ) -> dict[str, Any]:
+        # Rasters and zones are reduced in batches at the default scale
+        require_plan(
+            planner_resource,
+            mosaic_resource,
+            tiling_resource,
+            df_region,
+            [REDUCE_SCALE],
+            math.ceil(len(raster) / AREA_BATCH_SIZE)
+            * math.ceil(len(zones) / ZONE_BATCH_SIZE),
+        )
+        return reduce_changed(
+            raster,
+            lambda changed: get_zone_areas(changed, zones),
+            zones.to_json(),
+            force=reduction_resource.force,
+        )
 
     return _asset
 
@@ -103,26 +214,68 @@ def transition_table_factory(top_prefix: str) -> dg.AssetsDefinition:
         key_prefix=[top_prefix, "transition"],
         ins={"value_map": dg.AssetIn([top_prefix, "transition", "value"])},
         partitions_def=year_pair_partitions,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
         io_manager_key="dataframe_manager",
         group_name=f"{top_prefix}_transition",
+        pool=CPU_POOL,
     )
-    def _asset(value_map: dict[str, float]) -> pd.DataFrame:
-        out = []
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        value_map: dict[str, float],
+    ) -> dict[str, pd.DataFrame]:
+        rows: dict[str, list[dict]] = {key: [] for key in context.partition_keys}
         for key, value in value_map.items():
-            label_pair, _ = key.split("|")
+            label_pair, year_pair = key.split("|")
             start_label, end_label = label_pair.split("-")
-            out.append(
+            rows[year_pair].append(
                 {
                     "start": start_label,
                     "end": end_label,
                     "total_area": value,
                 },
             )
-        return (
-            pd.DataFrame(out)
+
+        return {
+            year_pair: pd.DataFrame(out)
             .pivot_table(index="start", columns="end", values="total_area")
             .fillna(0)
-        )
+            for year_pair, out in rows.items()
+        }
+
+    return _asset
+
+
+def transition_zone_table_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="zone_table",
+        key_prefix=[top_prefix, "transition"],
+        ins={"value_map": dg.AssetIn([top_prefix, "transition", "zone_value"])},
+        partitions_def=year_pair_partitions,
+        backfill_policy=dg.BackfillPolicy.single_run(),
+        metadata={PARTITION_MAP_METADATA_KEY: True},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_transition",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        value_map: dict[str, pd.DataFrame],
+    ) -> dict[str, pd.DataFrame]:
+        out: dict[str, list[pd.DataFrame]] = {key: [] for key in context.partition_keys}
+        for key, df in value_map.items():
+            label_pair, year_pair = key.split("|")
+            start_label, end_label = label_pair.split("-")
+            out[year_pair].append(df.assign(start=start_label, end=end_label))
+
+        return {
+            year_pair: pd.concat(dfs)
+            .pivot_table(index=["zone", "start"], columns="end", values="area")
+            .fillna(0)
+            for year_pair, dfs in out.items()
+        }
 
     return _asset
 
@@ -133,7 +286,9 @@ dassets = [
     for factory in (
         transition_raster_factory,
         transition_value_factory,
+        transition_zone_value_factory,
         transition_table_factory,
+        transition_zone_table_factory,
         transition_table_fixed_factory,
         transition_table_frac_factory,
         transition_cube_factory,
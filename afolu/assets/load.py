@@ -1,25 +1,162 @@
+import hashlib
+import time
+
 import ee
 
 import dagster as dg
+from afolu.assets.constants import PASTURES_FRACTION, PASTURES_SEED
+from afolu.instrumentation import get_info, instrumented
+from afolu.pools import EE_POOL
+from afolu.resources import GeometryResource, MosaicResource
 
+GLC30_COLLECTION = "projects/sat-io/open-datasets/GLC-FCS30D/annual"
+FORESTS_COLLECTION = "NASA/ORNL/global_forest_classification_2020/V1"
+GLC30_BANDS = [f"b{i}" for i in range(1, 24)]
+TASK_DONE_STATES = ("COMPLETED", "FAILED", "CANCELLED")
 
-def glc30_factory(top_prefix: str) -> dg.AssetsDefinition:
+
+def asset_exists(asset_id: str) -> bool:
+    try:
+        ee.data.getAsset(asset_id)
+    except ee.ee_exception.EEException:
+        return False
+    return True
+
+
+def get_source_projection() -> dict:
+    # Composites lose the projection of their collection, the GLC30 images
+    # all share one grid
+    proj = get_info(
+        ee.imagecollection.ImageCollection(GLC30_COLLECTION).first().projection(),
+    )
+
+    if not isinstance(proj, dict):
+        err = f"Expected dict, got {type(proj)}"
+        raise TypeError(err)
+
+    return proj
+
+
+def export_mosaic(
+    image: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+    asset_id: str,
+    poll_seconds: float,
+) -> None:
+    # The export keeps the grid of the source imagery, a scale alone would
+    # resample it onto a grid anchored at the corner of the bbox
+    proj = get_source_projection()
+    task = ee.batch.Export.image.toAsset(
+        image=image,
+        description=asset_id.rsplit("/", 1)[-1],
+        assetId=asset_id,
+        region=bbox,
+        crs=proj["crs"],
+        crsTransform=proj["transform"],
+        maxPixels=int(1e13),
+        pyramidingPolicy={".default": "mode"},
+    )
+    task.start()
+
+    status = task.status()
+    while status["state"] not in TASK_DONE_STATES:
+        time.sleep(poll_seconds)
+        status = task.status()
+
+    if status["state"] != "COMPLETED":
+        err = f"Export of {asset_id} ended as {status['state']}: {status}"
+        raise RuntimeError(err)
+
+
+def mosaic_factory(top_prefix: str) -> dg.AssetsDefinition:
     @dg.asset(
-        name="glc30",
+        name="mosaic",
         key_prefix=top_prefix,
-        ins={"bbox": dg.AssetIn([top_prefix, "bbox", "ee"])},
+        ins={
+            "bbox": dg.AssetIn([top_prefix, "bbox", "ee"]),
+            "region": dg.AssetIn([top_prefix, "bbox", "ee_region"]),
+        },
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_load",
+        pool=EE_POOL,
     )
-    def _asset(bbox: ee.geometry.Geometry) -> ee.image.Image:
-        return (
-            ee.imagecollection.ImageCollection(
-                "projects/sat-io/open-datasets/GLC-FCS30D/annual",
-            )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        geometry_resource: GeometryResource,
+        mosaic_resource: MosaicResource,
+        bbox: ee.geometry.Geometry,
+        region: ee.geometry.Geometry,
+    ) -> ee.image.Image:
+        glc30 = (
+            ee.imagecollection.ImageCollection(GLC30_COLLECTION)
             .filterBounds(bbox)
             .mode()
-            .clip(bbox)
+            .select(GLC30_BANDS)
         )
+        forests_mask = (
+            ee.imagecollection.ImageCollection(FORESTS_COLLECTION)
+            .filterBounds(bbox)
+            .mode()
+            .unmask(0)
+            .eq(1)
+            .rename("forests")
+        )
+        mosaic = glc30.addBands(forests_mask).clip(bbox)
+
+        # The bbox is only the rectangle around the region, which is painted
+        # into a mask band so no reduction clips against the polygon. The paint
+        # is rasterized once when the mosaic is exported, and by every request
+        # that reads the lazy mosaic otherwise
+        if geometry_resource.rectangle:
+            region_mask = (
+                ee.image.Image.constant(0)
+                .uint8()
+                .paint(
+                    ee.featurecollection.FeatureCollection(
+                        [ee.feature.Feature(region)],
+                    ),
+                    1,
+                )
+                .rename("region")
+            )
+            mosaic = mosaic.addBands(region_mask).updateMask(region_mask)
+
+        if mosaic_resource.asset_root is None:
+            return mosaic
+
+        # The expression holds the source collections and the bbox, so the
+        # mosaic is only exported again when one of them changes
+        version = hashlib.sha256(mosaic.serialize().encode()).hexdigest()[:16]
+        asset_id = f"{mosaic_resource.asset_root}/{top_prefix}_mosaic_{version}"
+        exported = not asset_exists(asset_id)
+        if exported:
+            export_mosaic(
+                mosaic.toUint8(),
+                bbox,
+                asset_id,
+                mosaic_resource.poll_seconds,
+            )
+
+        context.add_output_metadata(
+            {"mosaic_asset_id": asset_id, "mosaic_exported": exported},
+        )
+        return ee.image.Image(asset_id)
+
+    return _asset
+
+
+def glc30_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="glc30",
+        key_prefix=top_prefix,
+        ins={"mosaic": dg.AssetIn([top_prefix, "mosaic"])},
+        io_manager_key="ee_manager",
+        group_name=f"{top_prefix}_load",
+    )
+    @instrumented
+    def _asset(mosaic: ee.image.Image) -> ee.image.Image:
+        return mosaic.select(GLC30_BANDS)
 
     return _asset
 
@@ -28,21 +165,13 @@ def forests_mask_factory(top_prefix: str) -> dg.AssetsDefinition:
     @dg.asset(
         name="forests_mask",
         key_prefix=top_prefix,
-        ins={"bbox": dg.AssetIn([top_prefix, "bbox", "ee"])},
+        ins={"mosaic": dg.AssetIn([top_prefix, "mosaic"])},
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_load",
     )
-    def _asset(bbox: ee.geometry.Geometry) -> ee.image.Image:
-        return (
-            ee.imagecollection.ImageCollection(
-                "NASA/ORNL/global_forest_classification_2020/V1",
-            )
-            .filterBounds(bbox)
-            .mode()
-            .clip(bbox)
-            .unmask(0)
-            .eq(1)
-        )
+    @instrumented
+    def _asset(mosaic: ee.image.Image) -> ee.image.Image:
+        return mosaic.select("forests")
 
     return _asset
 
@@ -53,22 +182,21 @@ def pastures_random_mask_factory(top_prefix: str) -> dg.AssetsDefinition:
         key_prefix=top_prefix,
         ins={
             "bbox": dg.AssetIn([top_prefix, "bbox", "ee"]),
-            "glc30": dg.AssetIn([top_prefix, "glc30"]),
         },
         io_manager_key="ee_manager",
         group_name=f"{top_prefix}_load",
+        pool=EE_POOL,
     )
-    def _asset(bbox: ee.geometry.Geometry, glc30: ee.image.Image) -> ee.image.Image:
-        proj = glc30.projection().getInfo()
-
-        if not isinstance(proj, dict):
-            err = f"Expected dict, got {type(proj)}"
-            raise TypeError(err)
+    @instrumented
+    def _asset(bbox: ee.geometry.Geometry) -> ee.image.Image:
+        # The draws follow the grid of the source imagery, which the mode
+        # composite of glc30 does not keep
+        proj = get_source_projection()
 
         return (
-            ee.image.Image.random(42)
+            ee.image.Image.random(PASTURES_SEED)
             .reproject(crs=proj["crs"], crsTransform=proj["transform"])
-            .lte(0.4)
+            .lte(PASTURES_FRACTION)
             .clip(bbox)
         )
 
@@ -77,6 +205,11 @@ def pastures_random_mask_factory(top_prefix: str) -> dg.AssetsDefinition:
 
 dassets = [
     factory(top_prefix)
-    for factory in [glc30_factory, forests_mask_factory, pastures_random_mask_factory]
-    for top_prefix in ["amazon", "mexico", "small"]
+    for factory in [
+        mosaic_factory,
+        glc30_factory,
+        forests_mask_factory,
+        pastures_random_mask_factory,
+    ]
+    for top_prefix in ["amazon", "mexico", "small", "zonal"]
 ]
@@ -0,0 +1,337 @@
+import hashlib
+import json
+import math
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import rasterio.features as rio_features
+import shapely
+from affine import Affine
+from rasterio.crs import CRS
+
+import dagster as dg
+from afolu.assets.constants import EARTH_RADIUS, PASTURES_FRACTION, PASTURES_SEED
+from afolu.assets.load import get_source_projection
+from afolu.instrumentation import instrumented
+from afolu.managers import make_parent_dir, replace_atomic
+from afolu.pools import EE_POOL
+from afolu.resources import PathResource, TilingResource
+
+# Philox outputs four 64 bit words per counter step
+PHILOX_WORDS = 4
+UINT64_MASK = 2**64 - 1
+
+
+def random_tile(
+    seed: int,
+    row_off: int,
+    col_off: int,
+    height: int,
+    width: int,
+) -> np.ndarray:
+    # Every row of the global grid has its own Philox stream and every column
+    # its own word in it, so a pixel only depends on (seed, row, col) and not
+    # on the tiling or on the order in which tiles are computed
+    out = np.empty((height, width), dtype=np.float64)
+    block, skip = divmod(col_off, PHILOX_WORDS)
+    for i in range(height):
+        bit_generator = np.random.Philox(
+            key=seed,
+            counter=np.array(
+                [block & UINT64_MASK, (row_off + i) & UINT64_MASK, 0, 0],
+                dtype=np.uint64,
+            ),
+        )
+        raw = bit_generator.random_raw(skip + width)[skip:]
+        out[i] = (raw >> np.uint64(11)) * 2.0**-53
+    return out
+
+
+def iter_tiles(
+    height: int,
+    width: int,
+    tile_size: int,
+    offset: tuple[int, int] = (0, 0),
+) -> Iterator[tuple[int, int, int, int]]:
+    # Tiles follow the global grid, so windows at different offsets of the grid
+    # share the tiles they both cover
+    row_off, col_off = offset
+    for row in range(-(row_off % tile_size), height, tile_size):
+        for col in range(-(col_off % tile_size), width, tile_size):
+            row_start, col_start = max(row, 0), max(col, 0)
+            yield (
+                row_start,
+                col_start,
+                min(row + tile_size, height) - row_start,
+                min(col + tile_size, width) - col_start,
+            )
+
+
+def get_tile_box(
+    transform: Affine,
+    tile: tuple[int, int, int, int],
+) -> shapely.Polygon:
+    row, col, height, width = tile
+    x0, x1 = transform.c + col * transform.a, transform.c + (col + width) * transform.a
+    y0, y1 = transform.f + row * transform.e, transform.f + (row + height) * transform.e
+    return shapely.box(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+
+def get_region_tiles(
+    data_path: str,
+    region: shapely.Geometry,
+    crs: CRS,
+    transform: Affine,
+    shape: tuple[int, int],
+    tile_size: int,
+    offset: tuple[int, int] = (0, 0),
+) -> list[tuple[tuple[int, int, int, int], Path | None]]:
+    # Tiles outside the region are dropped, tiles inside it need no mask and
+    # tiles on its boundary get the path of their rasterized mask
+    tiles = list(iter_tiles(*shape, tile_size, offset))
+    tree = shapely.STRtree([get_tile_box(transform, tile) for tile in tiles])
+    touching = tree.query(region, predicate="intersects")
+    inside = set(tree.query(region, predicate="contains").tolist())
+
+    if len(touching) == 0:
+        err = "The region does not overlap the tile grid."
+        raise ValueError(err)
+
+    key = hashlib.sha256(
+        json.dumps([crs.to_string(), list(transform)[:6]]).encode() + region.wkb,
+    ).hexdigest()
+    mask_path = Path(data_path) / "generated" / "_cache" / "tile_masks" / key
+
+    out = []
+    for i in sorted(touching.tolist()):
+        row, col, height, width = tile = tiles[i]
+        if i in inside:
+            out.append((tile, None))
+            continue
+
+        fpath = mask_path / f"{row}_{col}_{height}_{width}.npy"
+        if not fpath.exists():
+            # Pixels are inside when their center is, as in Earth Engine
+            mask = rio_features.geometry_mask(
+                [region.intersection(tree.geometries[i])],
+                out_shape=(height, width),
+                transform=transform * Affine.translation(col, row),
+                invert=True,
+            )
+            make_parent_dir(fpath)
+            replace_atomic(fpath, lambda tmp_path, mask=mask: np.save(tmp_path, mask))
+        out.append((tile, fpath))
+    return out
+
+
+def get_tile_metadata(
+    region_tiles: list[tuple[tuple[int, int, int, int], Path | None]],
+    shape: tuple[int, int],
+    tile_size: int,
+    offset: tuple[int, int] = (0, 0),
+) -> dict[str, int]:
+    total = sum(1 for _ in iter_tiles(*shape, tile_size, offset))
+    return {
+        "tiles": len(region_tiles),
+        "tiles_skipped": total - len(region_tiles),
+        "tiles_masked": sum(mask_path is not None for _, mask_path in region_tiles),
+    }
+
+
+def get_tile_cache_path(data_path: str, key: str) -> Path:
+    return Path(data_path) / "generated" / "_cache" / "tiles" / key[:2] / f"{key}.npz"
+
+
+def read_tile_cache(fpath: Path) -> dict[str, np.ndarray]:
+    # Reads refresh the modification time, which orders the eviction
+    try:
+        with np.load(fpath) as f:
+            entries = dict(f)
+        os.utime(fpath)
+    except FileNotFoundError:
+        return {}
+    return entries
+
+
+def write_tile_cache(fpath: Path, entries: dict[str, np.ndarray]) -> None:
+    make_parent_dir(fpath)
+    replace_atomic(fpath, lambda tmp_path: np.savez(tmp_path, **entries))
+
+
+def evict_tile_cache(data_path: str, max_bytes: int) -> int:
+    # Least recently used entries are removed until the cache fits the budget
+    entries = []
+    for fpath in (Path(data_path) / "generated" / "_cache" / "tiles").glob("*/*.npz"):
+        try:
+            stat = fpath.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, fpath))
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, fpath in sorted(entries):
+        if total <= max_bytes:
+            break
+        fpath.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def get_grid_window(
+    transform: Affine,
+    bounds: tuple[float, float, float, float],
+) -> tuple[int, int, int, int]:
+    # Window of the grid covering the bounds, as (row, col, height, width)
+    # relative to the origin of the grid, which is north-up without shear
+    minx, miny, maxx, maxy = bounds
+    col_off = math.floor((minx - transform.c) / transform.a)
+    row_off = math.floor((maxy - transform.f) / transform.e)
+    return (
+        row_off,
+        col_off,
+        math.ceil((miny - transform.f) / transform.e) - row_off,
+        math.ceil((maxx - transform.c) / transform.a) - col_off,
+    )
+
+
+def get_row_areas(crs: CRS, transform: Affine, height: int) -> np.ndarray:
+    # Pixels of a geographic grid only change their area from row to row
+    if not crs.is_geographic:
+        return np.full(height, abs(transform.a * transform.e))
+
+    rows = np.arange(height)
+    lat_top = np.radians(transform.f + rows * transform.e)
+    lat_bottom = np.radians(transform.f + (rows + 1) * transform.e)
+    return (
+        EARTH_RADIUS**2
+        * np.radians(abs(transform.a))
+        * np.abs(np.sin(lat_top) - np.sin(lat_bottom))
+    )
+
+
+def load_row_areas(
+    data_path: str,
+    crs: CRS,
+    transform: Affine,
+    shape: tuple[int, int],
+) -> np.ndarray:
+    key = hashlib.sha256(
+        json.dumps([crs.to_string(), list(transform)[:6], list(shape)]).encode(),
+    ).hexdigest()
+    fpath = Path(data_path) / "generated" / "_cache" / "row_areas" / f"{key}.npy"
+
+    if not fpath.exists():
+        areas = get_row_areas(crs, transform, shape[0])
+        make_parent_dir(fpath)
+        replace_atomic(fpath, lambda tmp_path: np.save(tmp_path, areas))
+
+    return np.load(fpath, mmap_mode="r")
+
+
+def weighted_bincount(
+    codes: np.ndarray,
+    row_areas: np.ndarray,
+    minlength: int,
+) -> np.ndarray:
+    # The counts of every row are scaled by its area, so no per-pixel area
+    # array is needed
+    counts = np.stack([np.bincount(row, minlength=minlength) for row in codes])
+    return row_areas @ counts
+
+
+def pastures_random_mask_local_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="pastures_random_mask_local",
+        key_prefix=top_prefix,
+        ins={
+            "df_bbox": dg.AssetIn([top_prefix, "bbox", "shapely"]),
+        },
+        io_manager_key="raster_manager",
+        group_name=f"{top_prefix}_load",
+        pool=EE_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        path_resource: PathResource,
+        tiling_resource: TilingResource,
+        df_bbox: gpd.GeoDataFrame,
+    ) -> tuple[np.ndarray, CRS, Affine]:
+        # The mask follows the grid of the source imagery, which the mode
+        # composite of glc30 does not keep
+        proj = get_source_projection()
+        crs = CRS.from_user_input(proj["crs"])
+        grid_transform = Affine(*proj["transform"])
+        df_region = df_bbox.to_crs(crs)
+        row_off, col_off, height, width = get_grid_window(
+            grid_transform,
+            tuple(df_region.total_bounds),
+        )
+
+        transform = grid_transform * Affine.translation(col_off, row_off)
+        row_areas = load_row_areas(
+            path_resource.data_path,
+            crs,
+            transform,
+            (height, width),
+        )
+        region_tiles = get_region_tiles(
+            path_resource.data_path,
+            df_region.union_all(),
+            crs,
+            transform,
+            (height, width),
+            tiling_resource.tile_size,
+            (row_off, col_off),
+        )
+        out = np.zeros((height, width), dtype=np.uint8)
+
+        def compute_tile(
+            item: tuple[tuple[int, int, int, int], Path | None],
+        ) -> np.ndarray:
+            (row, col, tile_height, tile_width), mask_path = item
+            values = random_tile(
+                PASTURES_SEED,
+                row_off + row,
+                col_off + col,
+                tile_height,
+                tile_width,
+            )
+            mask = (values <= PASTURES_FRACTION).astype(np.uint8)
+
+            # Pixels outside the region take code 2 and are not counted
+            if mask_path is not None:
+                mask = np.where(np.load(mask_path), mask, 2).astype(np.uint8)
+            counts = weighted_bincount(mask, row_areas[row : row + tile_height], 3)
+
+            out[row : row + tile_height, col : col + tile_width] = mask == 1
+            return counts[:2]
+
+        with ThreadPoolExecutor(max_workers=tiling_resource.workers) as executor:
+            areas = sum(executor.map(compute_tile, region_tiles))
+
+        context.add_output_metadata(
+            {
+                **get_tile_metadata(
+                    region_tiles,
+                    (height, width),
+                    tiling_resource.tile_size,
+                    (row_off, col_off),
+                ),
+                "pixels": height * width,
+                "area_ha": float(areas.sum()) / 10_000,
+                "drawn_area_ha": float(areas[1]) / 10_000,
+            },
+        )
+        return out, crs, transform
+
+    return _asset
+
+
+dassets = [pastures_random_mask_local_factory("small")]
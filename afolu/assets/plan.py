@@ -0,0 +1,166 @@
+import math
+from typing import Any
+
+import geopandas as gpd
+import shapely
+
+import dagster as dg
+from afolu.assets.bbox import get_equal_area_crs
+from afolu.assets.constants import (
+    COMPUTE_PIXELS_MAX_BYTES,
+    GLC30_SCALE,
+    MAX_PIXELS,
+    REDUCE_SCALE,
+    SMALL_REDUCE_SCALE,
+)
+from afolu.partitions import year_pair_partitions, year_partitions
+from afolu.resources import (
+    MosaicResource,
+    PlannerResource,
+    ReductionResource,
+    TilingResource,
+)
+
+# Strategies in order of preference
+STRATEGIES = ("single_call", "export", "local")
+
+
+def estimate_plan(
+    df_region: gpd.GeoDataFrame,
+    scales: list[int],
+    tile_size: int,
+    reductions: int,
+) -> dict[str, float]:
+    crs = get_equal_area_crs(df_region.to_crs("EPSG:4326")["geometry"].item())
+    region = df_region.to_crs(crs)["geometry"].item()
+
+    # Reductions are counted over the bounding rectangle, as maxPixels is, of
+    # every part of outlines made of several regions
+    pixels = 0.0
+    cube_pixels = tiles = tile_pixels = 0
+    for part in shapely.get_parts(region):
+        minx, miny, maxx, maxy = part.bounds
+        pixels += (maxx - minx) * (maxy - miny) / min(scales) ** 2
+        height = math.ceil((maxy - miny) / GLC30_SCALE)
+        width = math.ceil((maxx - minx) / GLC30_SCALE)
+        cube_pixels += height * width
+        tiles += math.ceil(height / tile_size) * math.ceil(width / tile_size)
+        tile_pixels = max(tile_pixels, min(tile_size, height) * min(tile_size, width))
+
+    years = len(year_partitions.get_partition_keys())
+    return {
+        "region_area_ha": region.area / 10_000,
+        "pixels_per_reduction": pixels,
+        "ee_calls": reductions * len(scales),
+        "cube_bytes": years * cube_pixels,
+        "tiles": tiles,
+        "tile_request_bytes": years * tile_pixels,
+    }
+
+
+def get_viable_strategies(
+    plan: dict[str, float],
+    planner_resource: PlannerResource,
+) -> list[str]:
+    viable = {
+        "single_call": plan["pixels_per_reduction"]
+        <= planner_resource.single_call_pixels,
+        # Exported mosaics are read instead of recomputed, so only maxPixels
+        # bounds their reductions
+        "export": plan["pixels_per_reduction"] <= MAX_PIXELS,
+        "local": plan["cube_bytes"] <= planner_resource.max_memory_bytes
+        and plan["tile_request_bytes"] <= COMPUTE_PIXELS_MAX_BYTES,
+    }
+    return [strategy for strategy in STRATEGIES if viable[strategy]]
+
+
+def evaluate_plan(
+    planner_resource: PlannerResource,
+    mosaic_resource: MosaicResource,
+    tiling_resource: TilingResource,
+    df_region: gpd.GeoDataFrame,
+    scales: list[int],
+    reductions: int,
+) -> tuple[bool, dict[str, Any]]:
+    plan = estimate_plan(df_region, scales, tiling_resource.tile_size, reductions)
+    viable = get_viable_strategies(plan, planner_resource)
+
+    # Reductions read the exported mosaic when it is configured
+    configured = "single_call" if mosaic_resource.asset_root is None else "export"
+    return configured in viable, {
+        **plan,
+        "configured_strategy": configured,
+        "recommended_strategy": viable[0] if viable else "none",
+        "viable_strategies": ", ".join(viable),
+    }
+
+
+def require_plan(
+    planner_resource: PlannerResource,
+    mosaic_resource: MosaicResource,
+    tiling_resource: TilingResource,
+    df_region: gpd.GeoDataFrame,
+    scales: list[int],
+    reductions: int,
+) -> None:
+    # Reductions are planned for the partitions they were launched with, so a
+    # backfill stops before its first request even when the bbox is not part
+    # of the run
+    passed, metadata = evaluate_plan(
+        planner_resource,
+        mosaic_resource,
+        tiling_resource,
+        df_region,
+        scales,
+        reductions,
+    )
+    if not passed:
+        err = (
+            f"The {metadata['configured_strategy']} strategy is not viable, "
+            f"viable strategies: {metadata['viable_strategies'] or 'none'}."
+        )
+        raise dg.Failure(description=err, metadata=metadata)
+
+
+def plan_check_factory(top_prefix: str, default_scale: int) -> dg.AssetChecksDefinition:
+    @dg.asset_check(
+        asset=dg.AssetKey([top_prefix, "bbox", "ee"]),
+        name="plan",
+        additional_ins={"df_region": dg.AssetIn([top_prefix, "bbox", "region"])},
+        blocking=True,
+    )
+    def _check(
+        planner_resource: PlannerResource,
+        mosaic_resource: MosaicResource,
+        reduction_resource: ReductionResource,
+        tiling_resource: TilingResource,
+        df_region: gpd.GeoDataFrame,
+    ) -> dg.AssetCheckResult:
+        # The bbox is planned for a backfill of every year and year pair
+        passed, metadata = evaluate_plan(
+            planner_resource,
+            mosaic_resource,
+            tiling_resource,
+            df_region,
+            reduction_resource.scales or [default_scale],
+            len(year_partitions.get_partition_keys())
+            + len(year_pair_partitions.get_partition_keys()),
+        )
+        return dg.AssetCheckResult(
+            passed=passed,
+            severity=dg.AssetCheckSeverity.ERROR,
+            metadata=metadata,
+        )
+
+    return _check
+
+
+dasset_checks = [
+    plan_check_factory(top_prefix, scale)
+    for top_prefix, scale in (
+        ("amazon", REDUCE_SCALE),
+        ("mexico", REDUCE_SCALE),
+        ("small", SMALL_REDUCE_SCALE),
+        ("zonal", REDUCE_SCALE),
+    )
+]
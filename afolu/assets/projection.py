@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.constants import LABEL_LIST
+from afolu.assets.ensemble import ENSEMBLE_QUANTILES
+from afolu.instrumentation import instrumented
+from afolu.pools import CPU_POOL
+from afolu.resources import ProjectionResource
+
+# Rows and columns of the transition matrices, in the order of the cube
+PROJECTION_LABELS = sorted(LABEL_LIST)
+
+
+def get_transition_matrices(cube: pd.DataFrame) -> np.ndarray:
+    # (period, start, end) array of the wide cube, one column per transition
+    cube = cube.set_index("time_period").sort_index()
+    columns = [
+        f"pij_lndu_{start}_to_{end}"
+        for start in PROJECTION_LABELS
+        for end in PROJECTION_LABELS
+    ]
+    size = len(PROJECTION_LABELS)
+    return cube[columns].to_numpy().reshape(len(cube), size, size)
+
+
+def sample_paths(
+    periods: int,
+    scenarios: int,
+    horizon: int,
+    seed: int,
+) -> np.ndarray:
+    # Every scenario draws the period whose transitions apply at each step
+    rng = np.random.default_rng(seed)
+    return rng.integers(periods, size=(scenarios, horizon))
+
+
+def project_areas(
+    initial: np.ndarray,
+    matrices: np.ndarray,
+    paths: np.ndarray,
+) -> np.ndarray:
+    # Advances a batch of (batch, label) states along (batch, step) indices
+    # into a stack of (matrix, start, end) transitions. At every step the
+    # states are sorted by matrix, so each matrix takes one product over all
+    # the states it applies to instead of being copied once per state. Regions
+    # are batched by stacking their matrices and offsetting their indices.
+    # The result is indexed by batch, then step, then label
+    batch, horizon = paths.shape
+    out = np.empty((horizon + 1, batch, initial.shape[-1]))
+    out[0] = initial
+
+    order = np.argsort(paths, axis=0, kind="stable")
+    sorted_paths = np.take_along_axis(paths, order, axis=0)
+    for step in range(horizon):
+        bounds = np.searchsorted(sorted_paths[:, step], np.arange(len(matrices) + 1))
+        states = out[step][order[:, step]]
+        projected = np.empty_like(states)
+        for i, matrix in enumerate(matrices):
+            start, end = bounds[i], bounds[i + 1]
+            np.matmul(states[start:end], matrix, out=projected[start:end])
+        out[step + 1][order[:, step]] = projected
+
+    return out.transpose(1, 0, 2)
+
+
+def projection_trajectories_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="trajectories",
+        key_prefix=[top_prefix, "projection"],
+        ins={
+            "table_frac": dg.AssetIn([top_prefix, "area", "table_frac"]),
+            "cube": dg.AssetIn([top_prefix, "transition", "cube"]),
+        },
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_projection",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(
+        context: dg.AssetExecutionContext,
+        projection_resource: ProjectionResource,
+        table_frac: pd.DataFrame,
+        cube: pd.DataFrame,
+    ) -> pd.DataFrame:
+        matrices = get_transition_matrices(cube)
+        if projection_resource.periods is not None:
+            matrices = matrices[-projection_resource.periods :]
+
+        # The last year of the area fractions is the initial state
+        table_frac = (
+            table_frac.set_index("label")
+            .reindex(PROJECTION_LABELS)
+            .fillna(0)
+            .rename(columns=int)
+        )
+        start_year = table_frac.columns.max()
+        initial = table_frac[start_year].to_numpy()
+
+        paths = sample_paths(
+            len(matrices),
+            projection_resource.scenarios,
+            projection_resource.horizon,
+            projection_resource.seed,
+        )
+        projected = project_areas(
+            np.broadcast_to(initial, (len(paths), len(initial))),
+            matrices,
+            paths,
+        )
+
+        context.add_output_metadata(
+            {
+                "scenarios": projection_resource.scenarios,
+                "horizon": projection_resource.horizon,
+                "periods": len(matrices),
+                "start_year": int(start_year),
+            },
+        )
+        return pd.DataFrame(
+            projected.reshape(-1, len(PROJECTION_LABELS)),
+            index=pd.MultiIndex.from_product(
+                [
+                    range(projection_resource.scenarios),
+                    range(start_year, start_year + projection_resource.horizon + 1),
+                ],
+                names=["scenario", "year"],
+            ),
+            columns=pd.Index(PROJECTION_LABELS, name="label"),
+        )
+
+    return _asset
+
+
+def projection_summary_factory(top_prefix: str) -> dg.AssetsDefinition:
+    @dg.asset(
+        name="summary",
+        key_prefix=[top_prefix, "projection"],
+        ins={"trajectories": dg.AssetIn([top_prefix, "projection", "trajectories"])},
+        io_manager_key="dataframe_manager",
+        group_name=f"{top_prefix}_projection",
+        pool=CPU_POOL,
+    )
+    @instrumented
+    def _asset(trajectories: pd.DataFrame) -> pd.DataFrame:
+        grouped = trajectories.drop(columns="scenario").groupby("year")
+
+        stats = {"mean": grouped.mean()}
+        for q in ENSEMBLE_QUANTILES:
+            stats[f"q{round(q * 100):02d}"] = grouped.quantile(q)
+
+        return pd.concat(stats, names=["statistic"])
+
+    return _asset
+
+
+dassets = [
+    factory(top_prefix)
+    for factory in (projection_trajectories_factory, projection_summary_factory)
+    for top_prefix in ("amazon", "mexico", "small")
+]
@@ -0,0 +1,106 @@
+from collections.abc import Callable
+from functools import cache, partial
+
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.constants import LABEL_LIST
+from afolu.instrumentation import instrumented
+from afolu.managers import LAZY_METADATA_KEY
+from afolu.pools import CPU_POOL
+
+SISEPUEDE_REGIONS = ("amazon", "mexico", "small")
+
+
+@cache
+def get_sisepuede_schema() -> tuple[str, ...]:
+    # Land use fields of the sisepuede input, named after the sisepuede
+    # variables. No sisepuede template is read, the fields and their order are
+    # only defined here
+    labels = sorted(LABEL_LIST)
+    return (
+        "region",
+        "time_period",
+        *(f"frac_lndu_initial_{label}" for label in labels),
+        *(f"pij_lndu_{start}_to_{end}" for start in labels for end in labels),
+    )
+
+
+def get_region_rows(
+    region: str,
+    get_cube: Callable[[], pd.DataFrame],
+    get_table_frac: Callable[[], pd.DataFrame],
+) -> pd.DataFrame:
+    # Each period of the cube starts on the year of the same index, the area
+    # fractions of that year are its initial state
+    fractions = (
+        get_table_frac()
+        .set_index("label")
+        .reindex(sorted(LABEL_LIST))
+        .fillna(0)
+        .T.rename(index=int)
+        .add_prefix("frac_lndu_initial_")
+    )
+    out = (
+        get_cube()
+        .join(fractions, on="time_period", how="left")
+        .assign(region=region)
+        .reindex(columns=list(get_sisepuede_schema()))
+    )
+
+    # Fields missing from the cube and periods without area fractions are left
+    # empty by the reindex and the join
+    incomplete = out.columns[out.isna().any()].tolist()
+    if len(incomplete) > 0:
+        err = f"{region} has no values for sisepuede fields: {', '.join(incomplete)}"
+        raise ValueError(err)
+
+    return out
+
+
+@dg.asset(
+    name="input",
+    key_prefix="sisepuede",
+    ins={
+        f"{region}_{name}": dg.AssetIn(
+            [region, *suffix],
+            metadata={LAZY_METADATA_KEY: True},
+            dagster_type=dg.Any,
+        )
+        for region in SISEPUEDE_REGIONS
+        for name, suffix in (
+            ("cube", ("transition", "cube")),
+            ("table_frac", ("area", "table_frac")),
+        )
+    },
+    io_manager_key="chunked_dataframe_manager",
+    dagster_type=dg.Any,
+    group_name="sisepuede",
+    pool=CPU_POOL,
+)
+@instrumented
+def sisepuede_input(
+    context: dg.AssetExecutionContext,
+    **region_tables: Callable[[], pd.DataFrame],
+) -> list[Callable[[], pd.DataFrame]]:
+    # Regions are built and validated once, as the manager appends them to the
+    # temporary file, so an invalid region fails the write before the file
+    # replaces the stored one
+    context.add_output_metadata(
+        {
+            "regions": ", ".join(SISEPUEDE_REGIONS),
+            "fields": len(get_sisepuede_schema()),
+        },
+    )
+    return [
+        partial(
+            get_region_rows,
+            region,
+            region_tables[f"{region}_cube"],
+            region_tables[f"{region}_table_frac"],
+        )
+        for region in SISEPUEDE_REGIONS
+    ]
+
+
+dassets = [sisepuede_input]
@@ -3,10 +3,16 @@ import pandas as pd
 
 import dagster as dg
 from afolu.assets.common import (
+    class_code_image,
+    reduce_progressive,
+    reduce_zones,
     year_to_band_name,
 )
-from afolu.assets.constants import LABEL_LIST
+from afolu.assets.constants import LABEL_LIST, SMALL_REDUCE_SCALE
+from afolu.instrumentation import instrumented
 from afolu.partitions import year_partitions
+from afolu.pools import EE_POOL
+from afolu.resources import ReductionResource
 
 ins = {
     f"{label}_img": dg.AssetIn(["small", "class_mask", label]) for label in LABEL_LIST
@@ -22,6 +28,7 @@ ins["grasslands_img"] = dg.AssetIn(["small", "class_mask", "grasslands_merged"])
     io_manager_key="ee_manager",
     group_name="small_area",
 )
+@instrumented
 def area_raster(
     context: dg.AssetExecutionContext,
     croplands_img: ee.image.Image,
@@ -52,11 +59,7 @@ def area_raster(
         "wetlands": wetlands_img,
     }
 
-    out_img = ee.image.Image.constant(0).rename("class").uint8()
-    for i, label in enumerate(LABEL_LIST):
-        out_img = out_img.where(img_map[label].select(band).rename("class"), i + 1)
-
-    return out_img
+    return class_code_image(img_map, band)
 
 
 @dg.asset(
@@ -69,30 +72,27 @@ def area_raster(
     partitions_def=year_partitions,
     io_manager_key="dataframe_manager",
     group_name="small_area",
+    pool=EE_POOL,
 )
-def area_table(img: ee.image.Image, bbox: ee.geometry.Geometry) -> pd.DataFrame:
-    transition_img: ee.image.Image = img.addBands(ee.image.Image.pixelArea()).select(
-        ["area", "class"],
+@instrumented
+def area_table(
+    reduction_resource: ReductionResource,
+    img: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+) -> pd.DataFrame:
+    class_areas = reduce_progressive(
+        lambda scale: reduce_zones(img, bbox, scale),
+        reduction_resource,
+        default_scale=SMALL_REDUCE_SCALE,
     )
 
-    response = transition_img.reduceRegion(
-        reducer=(ee.reducer.Reducer.sum().group(groupField=1, groupName="transition")),
-        scale=30,
-        geometry=bbox,
-        maxPixels=int(1e10),
-    ).getInfo()
-
-    if response is None:
-        err = "No data returned from reduceRegion."
-        raise ValueError(err)
-
     rows = [
         {
-            "label": LABEL_LIST[elem["transition"] - 1],
-            "area": float(elem["sum"]),
+            "label": LABEL_LIST[code - 1],
+            "area": area,
         }
-        for elem in response["groups"]
-        if elem["transition"] != 0
+        for code, area in class_areas.items()
+        if code != 0
     ]
 
     return pd.DataFrame(rows).set_index("label")
@@ -107,6 +107,7 @@ def area_table(img: ee.image.Image, bbox: ee.geometry.Geometry) -> pd.DataFrame:
     io_manager_key="dataframe_manager",
     group_name="small_area",
 )
+@instrumented
 def area_table_merged(table_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
     out = []
     for year, df in table_map.items():
@@ -129,6 +130,7 @@ def area_table_merged(table_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
     io_manager_key="dataframe_manager",
     group_name="small_area",
 )
+@instrumented
 def area_table_frac(table: pd.DataFrame) -> pd.DataFrame:
     table = table.set_index("label")
     return table.div(table.sum(axis=0), axis=1)
@@ -2,17 +2,22 @@ import ee
 import pandas as pd
 
 import dagster as dg
+from afolu.instrumentation import get_info
 
 
 @dg.op
 def reduce_image_by_area(img: ee.image.Image, bbox: ee.geometry.Geometry) -> dict:
     transition_img = img.addBands(ee.image.Image.pixelArea()).select(["area", "class"])
-    return transition_img.reduceRegion(
-        reducer=(ee.reducer.Reducer.sum().group(groupField=1, groupName="transition")),
-        scale=100,
-        geometry=bbox,
-        maxPixels=1e10,
-    ).getInfo()
+    return get_info(
+        transition_img.reduceRegion(
+            reducer=(
+                ee.reducer.Reducer.sum().group(groupField=1, groupName="transition")
+            ),
+            scale=100,
+            geometry=bbox,
+            maxPixels=1e10,
+        ),
+    )
 
 
 @dg.op(out=dg.Out(io_manager_key="dataframe_manager"))
@@ -4,16 +4,22 @@ import pandas as pd
 
 import dagster as dg
 from afolu.assets.common import (
+    reduce_progressive,
+    reduce_zones,
     transition_cube_factory,
     transition_table_fixed_factory,
     transition_table_frac_factory,
     year_to_band_name,
 )
-from afolu.assets.constants import LABEL_LIST
+from afolu.assets.constants import LABEL_LIST, SMALL_REDUCE_SCALE
+from afolu.instrumentation import instrumented
 from afolu.partitions import year_pair_partitions
+from afolu.pools import EE_POOL
+from afolu.resources import ReductionResource
 
 
 @dg.asset(io_manager_key="json_manager", group_name="small_transition")
+@instrumented
 def transition_label_map() -> dict[int, list[str]]:
     multiplier = 10 ** np.ceil(np.log10(len(LABEL_LIST)))
 
@@ -44,6 +50,7 @@ ins["bbox"] = dg.AssetIn(["small", "bbox", "ee"])
     io_manager_key="ee_manager",
     group_name="small_transition",
 )
+@instrumented
 def transition_raster(
     context: dg.AssetExecutionContext,
     bbox: ee.geometry.Geometry,
@@ -107,33 +114,27 @@ def transition_raster(
     partitions_def=year_pair_partitions,
     io_manager_key="dataframe_manager",
     group_name="small_transition",
+    pool=EE_POOL,
 )
+@instrumented
 def transition_table(
+    reduction_resource: ReductionResource,
     raster: ee.image.Image,
     bbox: ee.geometry.Geometry,
     transition_label_map: dict[str, list[str]],
 ) -> pd.DataFrame:
-    transition_img: ee.image.Image = raster.addBands(ee.image.Image.pixelArea()).select(
-        ["area", "class"],
+    transition_areas = reduce_progressive(
+        lambda scale: reduce_zones(raster, bbox, scale),
+        reduction_resource,
+        default_scale=SMALL_REDUCE_SCALE,
     )
 
-    response = transition_img.reduceRegion(
-        reducer=(ee.reducer.Reducer.sum().group(groupField=1, groupName="transition")),
-        scale=30,
-        geometry=bbox,
-        maxPixels=int(1e10),
-    ).getInfo()
-
-    if response is None:
-        err = "No data returned from reduceRegion."
-        raise ValueError(err)
-
     rows = [
         {
-            "label": transition_label_map[str(elem["transition"])],
-            "area": float(elem["sum"]),
+            "label": transition_label_map[str(code)],
+            "area": area,
         }
-        for elem in response["groups"]
+        for code, area in transition_areas.items()
     ]
 
     out = (
@@ -0,0 +1,6 @@
+import dagster as dg
+from afolu.assets.zonal import areas, common, transitions
+
+defs = dg.Definitions(
+    assets=dg.load_assets_from_modules([areas, common, transitions]),
+)
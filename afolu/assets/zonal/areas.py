@@ -0,0 +1,122 @@
+import ee
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.common import (
+    CLASS_CODE_COUNT,
+    class_code_image,
+    reduce_progressive,
+    reduce_zones,
+    year_to_band_name,
+)
+from afolu.assets.constants import LABEL_LIST
+from afolu.assets.zonal.common import split_regions
+from afolu.instrumentation import instrumented
+from afolu.partitions import year_partitions
+from afolu.pools import EE_POOL
+from afolu.resources import ReductionResource
+
+ins = {
+    f"{label}_img": dg.AssetIn(["zonal", "class_mask", label]) for label in LABEL_LIST
+}
+ins["grasslands_img"] = dg.AssetIn(["zonal", "class_mask", "grasslands_merged"])
+ins["region_flags"] = dg.AssetIn(["zonal", "region_flags"])
+
+
+@dg.asset(
+    name="raster",
+    key_prefix=["zonal", "area"],
+    ins=ins,
+    partitions_def=year_partitions,
+    io_manager_key="ee_manager",
+    group_name="zonal_area",
+)
+@instrumented
+def area_raster(
+    context: dg.AssetExecutionContext,
+    region_flags: ee.image.Image,
+    croplands_img: ee.image.Image,
+    flooded_img: ee.image.Image,
+    forests_mangroves_img: ee.image.Image,
+    forests_primary_img: ee.image.Image,
+    forests_secondary_img: ee.image.Image,
+    grasslands_img: ee.image.Image,
+    other_img: ee.image.Image,
+    pastures_img: ee.image.Image,
+    settlements_img: ee.image.Image,
+    shrublands_img: ee.image.Image,
+    wetlands_img: ee.image.Image,
+) -> ee.image.Image:
+    band = year_to_band_name(context.partition_key)
+
+    img_map = {
+        "croplands": croplands_img,
+        "flooded": flooded_img,
+        "forests_mangroves": forests_mangroves_img,
+        "forests_primary": forests_primary_img,
+        "forests_secondary": forests_secondary_img,
+        "grasslands": grasslands_img,
+        "other": other_img,
+        "pastures": pastures_img,
+        "settlements": settlements_img,
+        "shrublands": shrublands_img,
+        "wetlands": wetlands_img,
+    }
+
+    return region_flags.multiply(CLASS_CODE_COUNT).add(class_code_image(img_map, band))
+
+
+@dg.asset(
+    name="table",
+    key_prefix=["zonal", "area"],
+    ins={
+        "raster": dg.AssetIn(["zonal", "area", "raster"]),
+        "bbox": dg.AssetIn(["zonal", "bbox", "ee"]),
+    },
+    partitions_def=year_partitions,
+    io_manager_key="dataframe_manager",
+    group_name="zonal_area",
+    pool=EE_POOL,
+)
+@instrumented
+def area_table(
+    reduction_resource: ReductionResource,
+    raster: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+) -> pd.DataFrame:
+    zone_areas = reduce_progressive(
+        lambda scale: reduce_zones(raster, bbox, scale),
+        reduction_resource,
+    )
+    region_areas = split_regions(zone_areas, CLASS_CODE_COUNT)
+
+    rows = [
+        {"region": region, "label": LABEL_LIST[code - 1], "area": area}
+        for (region, code), area in region_areas.items()
+        if code != 0
+    ]
+
+    return pd.DataFrame(rows).set_index(["region", "label"]).sort_index()
+
+
+@dg.asset(
+    name="table_merged",
+    key_prefix=["zonal", "area"],
+    ins={
+        "table_map": dg.AssetIn(["zonal", "area", "table"]),
+    },
+    io_manager_key="dataframe_manager",
+    group_name="zonal_area",
+)
+@instrumented
+def area_table_merged(table_map: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    out = []
+    for year, df in table_map.items():
+        temp = df.assign(year=int(year) - 2000)
+        out.append(temp)
+
+    return (
+        pd.concat(out)
+        .pivot_table(index=["region", "label"], columns="year", values="area")
+        .divide(10_000)
+    )
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+import ee
+
+import dagster as dg
+from afolu.assets.constants import ZONAL_REGIONS
+from afolu.instrumentation import instrumented
+
+
+@dg.asset(
+    name="region_flags",
+    key_prefix="zonal",
+    ins={
+        "bbox": dg.AssetIn(["zonal", "bbox", "ee"]),
+        **{
+            f"{region}_bbox": dg.AssetIn([region, "bbox", "ee_region"])
+            for region in ZONAL_REGIONS
+        },
+    },
+    io_manager_key="ee_manager",
+    group_name="zonal_bbox",
+)
+@instrumented
+def region_flags(
+    bbox: ee.geometry.Geometry,
+    **region_bboxes: ee.geometry.Geometry,
+) -> ee.image.Image:
+    out_img = ee.image.Image.constant(0).rename("region")
+    for i, region in enumerate(ZONAL_REGIONS):
+        region_img = ee.image.Image.constant(1 << i).clip(
+            region_bboxes[f"{region}_bbox"],
+        )
+        out_img = out_img.add(region_img.unmask(0))
+
+    # Pixels of the envelope outside every region are masked, so the zonal
+    # reductions skip them
+    return out_img.updateMask(out_img.gt(0)).clip(bbox)
+
+
+def split_regions(
+    zone_areas: dict[int, float],
+    code_count: int,
+) -> dict[tuple[str, int], float]:
+    # Zones are region_flags * code_count + code, a pixel inside several
+    # regions counts towards each of them
+    out: dict[tuple[str, int], float] = defaultdict(float)
+    for zone, area in zone_areas.items():
+        flags, code = divmod(zone, code_count)
+        for i, region in enumerate(ZONAL_REGIONS):
+            if flags >> i & 1:
+                out[region, code] += area
+    return out
@@ -0,0 +1,123 @@
+import ee
+import pandas as pd
+
+import dagster as dg
+from afolu.assets.common import (
+    CLASS_CODE_COUNT,
+    class_code_image,
+    reduce_progressive,
+    reduce_zones,
+    year_to_band_name,
+)
+from afolu.assets.constants import LABEL_LIST, ZONAL_REGIONS
+from afolu.assets.zonal.common import split_regions
+from afolu.instrumentation import instrumented
+from afolu.partitions import year_pair_partitions
+from afolu.pools import EE_POOL
+from afolu.resources import ReductionResource
+
+ins = {
+    f"{label}_img": dg.AssetIn(["zonal", "class_mask", label]) for label in LABEL_LIST
+}
+ins["grasslands_img"] = dg.AssetIn(["zonal", "class_mask", "grasslands_merged"])
+ins["region_flags"] = dg.AssetIn(["zonal", "region_flags"])
+
+
+@dg.asset(
+    name="raster",
+    key_prefix=["zonal", "transition"],
+    ins=ins,
+    partitions_def=year_pair_partitions,
+    io_manager_key="ee_manager",
+    group_name="zonal_transition",
+)
+@instrumented
+def transition_raster(
+    context: dg.AssetExecutionContext,
+    region_flags: ee.image.Image,
+    croplands_img: ee.image.Image,
+    flooded_img: ee.image.Image,
+    forests_mangroves_img: ee.image.Image,
+    forests_primary_img: ee.image.Image,
+    forests_secondary_img: ee.image.Image,
+    grasslands_img: ee.image.Image,
+    other_img: ee.image.Image,
+    pastures_img: ee.image.Image,
+    settlements_img: ee.image.Image,
+    shrublands_img: ee.image.Image,
+    wetlands_img: ee.image.Image,
+) -> ee.image.Image:
+    start_year, end_year = context.partition_key.split("_")
+
+    img_map = {
+        "croplands": croplands_img,
+        "flooded": flooded_img,
+        "forests_mangroves": forests_mangroves_img,
+        "forests_primary": forests_primary_img,
+        "forests_secondary": forests_secondary_img,
+        "grasslands": grasslands_img,
+        "other": other_img,
+        "pastures": pastures_img,
+        "settlements": settlements_img,
+        "shrublands": shrublands_img,
+        "wetlands": wetlands_img,
+    }
+
+    start_img = class_code_image(img_map, year_to_band_name(start_year))
+    end_img = class_code_image(img_map, year_to_band_name(end_year))
+
+    return (
+        region_flags.multiply(CLASS_CODE_COUNT**2)
+        .add(start_img.multiply(CLASS_CODE_COUNT))
+        .add(end_img)
+    )
+
+
+@dg.asset(
+    name="table",
+    key_prefix=["zonal", "transition"],
+    ins={
+        "raster": dg.AssetIn(["zonal", "transition", "raster"]),
+        "bbox": dg.AssetIn(["zonal", "bbox", "ee"]),
+    },
+    partitions_def=year_pair_partitions,
+    io_manager_key="dataframe_manager",
+    group_name="zonal_transition",
+    pool=EE_POOL,
+)
+@instrumented
+def transition_table(
+    reduction_resource: ReductionResource,
+    raster: ee.image.Image,
+    bbox: ee.geometry.Geometry,
+) -> pd.DataFrame:
+    zone_areas = reduce_progressive(
+        lambda scale: reduce_zones(raster, bbox, scale),
+        reduction_resource,
+    )
+    region_areas = split_regions(zone_areas, CLASS_CODE_COUNT**2)
+
+    rows = []
+    for (region, code), area in region_areas.items():
+        start, end = divmod(code, CLASS_CODE_COUNT)
+        if start == 0 or end == 0:
+            continue
+        rows.append(
+            {
+                "region": region,
+                "start": LABEL_LIST[start - 1],
+                "end": LABEL_LIST[end - 1],
+                "area": area,
+            },
+        )
+
+    index = pd.MultiIndex.from_product(
+        [ZONAL_REGIONS, sorted(LABEL_LIST)],
+        names=["region", "start"],
+    )
+    return (
+        pd.DataFrame(rows, columns=["region", "start", "end", "area"])
+        .pivot_table(index=["region", "start"], columns="end", values="area")
+        .reindex(index=index, columns=sorted(LABEL_LIST))
+        .fillna(0)
+    )
@@ -4,6 +4,8 @@ import toml
 import dagster as dg
 from afolu import assets
 from afolu.managers import (
+    ChunkedDataFrameManager,
+    DataArrayManager,
     DataFrameManager,
     EarthEngineManager,
     GeoDataFrameManager,
@@ -20,9 +22,18 @@ from afolu.partitions import (
 )
 from afolu.resources import (
     AFOLUClassMapResource,
+    EnsembleResource,
+    GeometryResource,
     LabelResource,
+    MosaicResource,
     PathResource,
+    PlannerResource,
+    ProfilerResource,
+    ProjectionResource,
+    ReductionResource,
+    SamplingResource,
     SelectedAreaResource,
+    TilingResource,
 )
 
 ee.Initialize(project="ee-ursa-test")
@@ -37,6 +48,24 @@ path_resource = PathResource(
     population_grids_path=dg.EnvVar("POPULATION_GRIDS_PATH"),
 )
 
+profiler_resource = ProfilerResource(path_resource=path_resource, enabled=False)
+
+reduction_resource = ReductionResource()
+
+mosaic_resource = MosaicResource()
+
+geometry_resource = GeometryResource()
+
+projection_resource = ProjectionResource()
+
+ensemble_resource = EnsembleResource(seeds=list(range(42, 52)), fractions=[0.4])
+
+sampling_resource = SamplingResource(points_per_class=1000, seed=0)
+
+tiling_resource = TilingResource(tile_size=1024, workers=4)
+
+planner_resource = PlannerResource()
+
 with open("./id_map.toml", encoding="utf8") as f:
     config = toml.load(f)
 
@@ -53,6 +82,14 @@ for key, spec in config.items():
 class_map_resource = AFOLUClassMapResource(**spec_map)
 
 # Managers
+dataarray_manager = DataArrayManager(
+    path_resource=path_resource,
+    extension=".tif",
+)
+chunked_dataframe_manager = ChunkedDataFrameManager(
+    path_resource=path_resource,
+    extension=".csv",
+)
 dataframe_manager = DataFrameManager(
     path_resource=path_resource,
     extension=".csv",
@@ -63,7 +100,7 @@ ee_manager = EarthEngineManager(
 )
 geodataframe_manager = GeoDataFrameManager(
     path_resource=path_resource,
-    extension=".gpkg",
+    extension=".fgb",
 )
 json_manager = JSONManager(
     path_resource=path_resource,
@@ -79,7 +116,7 @@ raster_manager = RasterManager(
 )
 shapely_manager = ShapelyManager(
     path_resource=path_resource,
-    extension=".json",
+    extension=".wkb",
 )
 text_manager = TextManager(
     path_resource=path_resource,
@@ -96,14 +133,31 @@ defs = dg.Definitions.merge(
                     [
                         assets.bbox,
                         assets.class_masks,
+                        assets.cube,
+                        assets.ensemble,
                         assets.load,
+                        assets.local,
+                        assets.projection,
+                        assets.sisepuede,
                     ],
                 ),
             )
         ),
+        asset_checks=dg.load_asset_checks_from_modules([assets.plan]),
         resources=dict(
             class_map_resource=class_map_resource,
             path_resource=path_resource,
+            profiler_resource=profiler_resource,
+            ensemble_resource=ensemble_resource,
+            geometry_resource=geometry_resource,
+            mosaic_resource=mosaic_resource,
+            planner_resource=planner_resource,
+            projection_resource=projection_resource,
+            reduction_resource=reduction_resource,
+            sampling_resource=sampling_resource,
+            tiling_resource=tiling_resource,
+            dataarray_manager=dataarray_manager,
+            chunked_dataframe_manager=chunked_dataframe_manager,
             dataframe_manager=dataframe_manager,
             ee_manager=ee_manager,
             geodataframe_manager=geodataframe_manager,
@@ -121,4 +175,5 @@ defs = dg.Definitions.merge(
     ),
     assets.large.defs,
     assets.small.defs,
+    assets.zonal.defs,
 )
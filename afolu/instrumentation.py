@@ -0,0 +1,276 @@
+import cProfile
+import csv
+import inspect
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+import ee
+
+import dagster as dg
+from afolu.profiling import write_profile
+from afolu.resources import ProfilerResource
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+EXPORT_PAGE_SIZE = 1000
+PROFILER_RESOURCE_KEY = "profiler_resource"
+
+
+class AssetStats:
+    def __init__(self) -> None:
+        self.ee_wait_seconds = 0.0
+        self.getinfo_calls = 0
+        self.pixel_calls = 0
+        self.ee_request_bytes = 0
+        self.io_read_seconds = 0.0
+        # Tiles are requested from worker threads
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._wait_start = 0.0
+
+    def add_request(
+        self,
+        obj: ee.computedobject.ComputedObject,
+        *,
+        pixels: bool,
+    ) -> None:
+        request_bytes = len(obj.serialize())
+        with self._lock:
+            if pixels:
+                self.pixel_calls += 1
+            else:
+                self.getinfo_calls += 1
+            self.ee_request_bytes += request_bytes
+
+    @contextmanager
+    def waiting(self) -> Iterator[None]:
+        # Concurrent requests overlap, only the time with at least one of them
+        # in flight is waiting
+        with self._lock:
+            if self._in_flight == 0:
+                self._wait_start = time.perf_counter()
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self.ee_wait_seconds += time.perf_counter() - self._wait_start
+
+
+_current_stats: ContextVar[AssetStats | None] = ContextVar(
+    "current_stats",
+    default=None,
+)
+# Inputs are loaded by the IO managers right before the asset body runs, their
+# read time is kept per step until the step's asset picks it up
+_pending_reads: ContextVar[dict[str, float] | None] = ContextVar(
+    "pending_reads",
+    default=None,
+)
+
+
+def get_info(obj: ee.computedobject.ComputedObject) -> Any:  # noqa: ANN401
+    stats = _current_stats.get()
+    if stats is None:
+        return obj.getInfo()
+
+    stats.add_request(obj, pixels=False)
+    with stats.waiting():
+        return obj.getInfo()
+
+
+def get_pixels(obj: ee.image.Image, grid: dict) -> Any:  # noqa: ANN401
+    params = {"expression": obj, "fileFormat": "NUMPY_NDARRAY", "grid": grid}
+    stats = _current_stats.get()
+    if stats is None:
+        return ee.data.computePixels(params)
+
+    stats.add_request(obj, pixels=True)
+    with stats.waiting():
+        return ee.data.computePixels(params)
+
+
+def map_in_context(
+    executor: Executor,
+    func: Callable[[Any], R],
+    items: Iterable[Any],
+) -> list[R]:
+    # Worker threads start from an empty context, every task runs in a copy of
+    # the caller's so its requests are counted on the current asset
+    futures = [executor.submit(copy_context().run, func, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def record_read(context: dg.InputContext, seconds: float) -> None:
+    # Inputs loaded outside of a step, such as by load_asset_value, are not
+    # charged to any asset
+    try:
+        step_key = context.step_context.step.key
+    except dg.DagsterInvariantViolationError:
+        return
+
+    pending_reads = _pending_reads.get()
+    if pending_reads is None:
+        pending_reads = {}
+        _pending_reads.set(pending_reads)
+    pending_reads[step_key] = pending_reads.get(step_key, 0.0) + seconds
+
+
+def pop_reads(context: dg.AssetExecutionContext) -> float:
+    pending_reads = _pending_reads.get()
+    if pending_reads is None:
+        return 0.0
+
+    step_key = context.op_execution_context.get_step_execution_context().step.key
+    return pending_reads.pop(step_key, 0.0)
+
+
+def get_profiler_resource(
+    context: dg.AssetExecutionContext,
+) -> ProfilerResource | None:
+    profiler_resource = getattr(context.resources, PROFILER_RESOURCE_KEY, None)
+
+    if isinstance(profiler_resource, ProfilerResource) and profiler_resource.enabled:
+        return profiler_resource
+    return None
+
+
+def add_profiler_parameter(func: Callable) -> inspect.Signature:
+    # Keyword-only parameters have to come before **kwargs
+    signature = inspect.signature(func)
+    params = list(signature.parameters.values())
+    index = next(
+        (i for i, param in enumerate(params) if param.kind == param.VAR_KEYWORD),
+        len(params),
+    )
+    params.insert(
+        index,
+        inspect.Parameter(
+            PROFILER_RESOURCE_KEY,
+            inspect.Parameter.KEYWORD_ONLY,
+            annotation=ProfilerResource,
+        ),
+    )
+    return signature.replace(parameters=params)
+
+
+def get_partition_name(context: dg.AssetExecutionContext) -> str | None:
+    if context.has_partition_key:
+        return context.partition_key
+
+    if context.has_partition_key_range:
+        partition_key_range = context.partition_key_range
+        return f"{partition_key_range.start}...{partition_key_range.end}"
+
+    return None
+
+
+def instrumented(func: Callable[P, R]) -> Callable[P, R]:
+    @wraps(func)
+    def _wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        # The profiler resource is only requested for the wrapper
+        kwargs.pop(PROFILER_RESOURCE_KEY, None)
+        context = dg.AssetExecutionContext.get()
+        profiler_resource = get_profiler_resource(context)
+        profiler = cProfile.Profile() if profiler_resource is not None else None
+
+        stats = AssetStats()
+        stats.io_read_seconds = pop_reads(context)
+
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            out = func(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _current_stats.reset(token)
+        elapsed = time.perf_counter() - start
+
+        metadata = {
+            "ee_wait_seconds": stats.ee_wait_seconds,
+            "compute_seconds": elapsed - stats.ee_wait_seconds,
+            "io_read_seconds": stats.io_read_seconds,
+            "getinfo_calls": stats.getinfo_calls,
+            "computepixels_calls": stats.pixel_calls,
+            "ee_request_bytes": stats.ee_request_bytes,
+        }
+
+        # Multi assets record the metadata on every output, and are profiled
+        # under the key of the first one
+        output_names = sorted(context.selected_output_names)
+        if profiler is not None and profiler_resource is not None:
+            profile_path = profiler_resource.get_profile_path(
+                context.asset_key_for_output(output_names[0]),
+                get_partition_name(context),
+            )
+            metadata.update(write_profile(profiler, profile_path))
+
+        for output_name in output_names:
+            context.add_output_metadata(metadata, output_name=output_name)
+        return out
+
+    # Every instrumented asset requires the top-level profiler resource, so its
+    # run config reaches context.resources
+    _wrapper.__signature__ = add_profiler_parameter(func)  # pyright: ignore[reportFunctionMemberAccess]
+    _wrapper.__annotations__ = {
+        **func.__annotations__,
+        PROFILER_RESOURCE_KEY: ProfilerResource,
+    }
+    return _wrapper
+
+
+def export_materialization_metadata(instance: dg.DagsterInstance, fpath: Path) -> int:
+    rows = []
+    for asset_key in instance.get_asset_keys():
+        cursor = None
+        while True:
+            result = instance.fetch_materializations(
+                asset_key,
+                limit=EXPORT_PAGE_SIZE,
+                cursor=cursor,
+            )
+            for record in result.records:
+                materialization = record.asset_materialization
+                if materialization is None:
+                    continue
+
+                row = {
+                    "asset_key": asset_key.to_user_string(),
+                    "partition": materialization.partition,
+                    "run_id": record.run_id,
+                    "timestamp": record.timestamp,
+                }
+                for key, value in materialization.metadata.items():
+                    row[key] = value.value
+                rows.append(row)
+
+            if not result.has_more:
+                break
+            cursor = result.cursor
+
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(fpath, "w", encoding="utf8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return len(rows)
+
+
+if __name__ == "__main__":
+    with dg.DagsterInstance.get() as instance:
+        export_materialization_metadata(instance, Path(sys.argv[1]))
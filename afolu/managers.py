@@ -1,8 +1,15 @@
+import hashlib
 import json
 import os
-from collections.abc import Sequence
+import shutil
+import time
+import uuid
+import zlib
+from abc import abstractmethod
+from collections.abc import Callable, Iterator, Sequence
+from functools import cache, partial
 from pathlib import Path
-from typing import assert_never
+from typing import Any
 
 import ee
 import ee.deserializer
@@ -10,13 +17,47 @@ import geopandas as gpd
 import numpy as np
 import pandas as pd
 import rasterio as rio
+import rasterio.shutil as rio_shutil
+import rioxarray
 import shapely
+import xarray as xr
 from affine import Affine
 from rasterio.crs import CRS
 
 import dagster as dg
+from afolu.instrumentation import record_read
 from afolu.resources import PathResource
 
+CHECKSUM_SUFFIX = ".sha256"
+# Set on assets and inputs whose values map each partition key to its own value
+PARTITION_MAP_METADATA_KEY = "afolu/partition_map"
+# Set on inputs that are passed as functions reading the value when called
+LAZY_METADATA_KEY = "afolu/lazy"
+# Observed on every partition written from a Versioned value
+INPUT_VERSION_METADATA_KEY = "afolu/input_version"
+HASH_CHUNK_SIZE = 1 << 20
+GRAPH_COMPRESSION_LEVEL = 6
+# Block size of tiled rasters, windowed reads only decompress the blocks they touch
+RASTER_BLOCK_SIZE = 512
+GEOMETRY_ORDER_COLUMN = "_order"
+
+_created_dirs: set[Path] = set()
+_stored_nodes: set[Path] = set()
+
+
+class Unchanged:
+    pass
+
+
+# Returned for partitions whose stored value is still current, it is not written
+UNCHANGED = Unchanged()
+
+
+class Versioned:
+    def __init__(self, value: Any, version: str) -> None:  # noqa: ANN401
+        self.value = value
+        self.version = version
+
 
 def process_partition_key(partition_key: str, root_path: Path, extension: str) -> Path:
     partition_key_split = partition_key.split("|")
@@ -24,15 +65,248 @@ def process_partition_key(partition_key: str, root_path: Path, extension: str) -
     return final_path.with_suffix(final_path.suffix + extension)
 
 
+@cache
+def get_asset_root_path(data_path: str, asset_key_path: tuple[str, ...]) -> Path:
+    return Path(data_path) / "generated" / "/".join(asset_key_path)
+
+
+@cache
+def get_partition_path_index(
+    root_path: Path,
+    extension: str,
+    partitions_def: dg.PartitionsDefinition,
+) -> dict[str, Path]:
+    # One index per asset root and extension covers every key of the asset, so
+    # single and multiple partition lookups of any run share it
+    return {
+        key: process_partition_key(key, root_path, extension)
+        for key in partitions_def.get_partition_keys()
+    }
+
+
 def process_multiple_partitions(
     partition_keys: Sequence[str],
     root_path: Path,
     extension: str,
+    partitions_def: dg.PartitionsDefinition,
 ) -> dict[str, Path]:
-    path_map = {}
-    for key in partition_keys:
-        path_map[key] = process_partition_key(key, root_path, extension)
-    return path_map
+    index = get_partition_path_index(root_path, extension, partitions_def)
+    return {key: index[key] for key in partition_keys}
+
+
+def make_parent_dir(fpath: Path) -> None:
+    parent = fpath.parent
+    if parent not in _created_dirs:
+        parent.mkdir(exist_ok=True, parents=True)
+        _created_dirs.add(parent)
+
+
+def get_checksum_path(fpath: Path) -> Path:
+    return fpath.with_name(fpath.name + CHECKSUM_SUFFIX)
+
+
+def hash_file(fpath: Path) -> str:
+    digest = hashlib.sha256()
+    with open(fpath, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fsync_path(fpath: Path) -> None:
+    fd = os.open(fpath, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace_atomic(fpath: Path, write: Callable[[Path], None]) -> None:
+    # The temporary file keeps the final name, formats such as GeoPackage derive
+    # the layer name from it
+    tmp_dir = fpath.with_name(f".{uuid.uuid4().hex}")
+    tmp_dir.mkdir()
+    tmp_path = tmp_dir / fpath.name
+    try:
+        write(tmp_path)
+        fsync_path(tmp_path)
+        tmp_path.replace(fpath)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Directory entries can only be synced on POSIX systems
+    if os.name == "posix":
+        fsync_path(fpath.parent)
+
+
+def get_staging_path(data_path: str) -> Path:
+    # Outputs written by their asset before the IO manager stores them
+    fpath = Path(data_path) / "generated" / "_cache" / "staging" / uuid.uuid4().hex
+    make_parent_dir(fpath)
+    return fpath
+
+
+def write_checksum_record(fpath: Path, checksum: str) -> None:
+    stat = fpath.stat()
+    record = {"sha256": checksum, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _write_record(tmp_path: Path) -> None:
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(record, f)
+
+    replace_atomic(get_checksum_path(fpath), _write_record)
+
+
+def write_atomic(fpath: Path, write: Callable[[Path], None]) -> str:
+    make_parent_dir(fpath)
+
+    checksum = ""
+
+    def _write(tmp_path: Path) -> None:
+        nonlocal checksum
+        write(tmp_path)
+        checksum = hash_file(tmp_path)
+
+    # A stale checksum must never describe the new file, so it is removed first
+    get_checksum_path(fpath).unlink(missing_ok=True)
+    replace_atomic(fpath, _write)
+    write_checksum_record(fpath, checksum)
+    return checksum
+
+
+def verify_checksum(fpath: Path) -> Path:
+    checksum_path = get_checksum_path(fpath)
+
+    try:
+        with open(checksum_path, encoding="utf8") as f:
+            record = json.load(f)
+    # Files written before checksums were recorded cannot be verified
+    except FileNotFoundError:
+        dg.get_dagster_logger().warning(
+            "%s has no checksum and is read unverified, re-materialize it to "
+            "record one.",
+            fpath,
+        )
+        return fpath
+
+    stat = fpath.stat()
+    if stat.st_size == record["size"] and stat.st_mtime_ns == record["mtime_ns"]:
+        return fpath
+
+    checksum = hash_file(fpath)
+    if checksum != record["sha256"]:
+        err = f"Checksum mismatch for {fpath}, re-materialize the partition."
+        raise ValueError(err)
+
+    # Only the modification time changed, so later reads skip the hash again
+    write_checksum_record(fpath, checksum)
+    return fpath
+
+
+def is_intact(fpath: Path) -> bool:
+    # Missing files and files failing their checksum have to be written again
+    try:
+        verify_checksum(fpath)
+    except (FileNotFoundError, ValueError):
+        return False
+    return True
+
+
+def map_references(obj: Any, func: Callable[[str], str]) -> Any:  # noqa: ANN401
+    if isinstance(obj, dict):
+        if obj.keys() == {"valueReference"}:
+            return {"valueReference": func(obj["valueReference"])}
+        return {key: map_references(value, func) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [map_references(value, func) for value in obj]
+    return obj
+
+
+def iter_references(obj: Any) -> Iterator[str]:  # noqa: ANN401
+    if isinstance(obj, dict):
+        if obj.keys() == {"valueReference"}:
+            yield obj["valueReference"]
+            return
+        for value in obj.values():
+            yield from iter_references(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from iter_references(value)
+
+
+def get_graph_node_path(store_path: Path, node_hash: str) -> Path:
+    return store_path / node_hash[:2] / f"{node_hash}.json.zz"
+
+
+def write_graph(store_path: Path, serialized: dict) -> str:
+    # Every node is stored under the hash of its content, with its references
+    # replaced by the hashes of the nodes they point to, so subgraphs shared
+    # between graphs are only stored once
+    values = serialized["values"]
+    hashes: dict[str, str] = {}
+
+    # Nodes are stored children first, graphs are too deep to recurse over
+    stack = [serialized["result"]]
+    while stack:
+        ref = stack[-1]
+        if ref in hashes:
+            stack.pop()
+            continue
+
+        missing = [
+            child for child in iter_references(values[ref]) if child not in hashes
+        ]
+        if missing:
+            stack.extend(missing)
+            continue
+        stack.pop()
+
+        node = map_references(values[ref], hashes.__getitem__)
+        payload = json.dumps(node, sort_keys=True, separators=(",", ":")).encode()
+        node_hash = hashlib.sha256(payload).hexdigest()
+
+        fpath = get_graph_node_path(store_path, node_hash)
+        if fpath not in _stored_nodes and not fpath.exists():
+            make_parent_dir(fpath)
+            replace_atomic(
+                fpath,
+                lambda tmp_path, payload=payload: tmp_path.write_bytes(
+                    zlib.compress(payload, GRAPH_COMPRESSION_LEVEL),
+                ),
+            )
+        _stored_nodes.add(fpath)
+        hashes[ref] = node_hash
+
+    return hashes[serialized["result"]]
+
+
+@cache
+def read_graph_node(store_path: Path, node_hash: str) -> dict:
+    fpath = get_graph_node_path(store_path, node_hash)
+    return json.loads(zlib.decompress(fpath.read_bytes()))
+
+
+@cache
+def decode_graph(store_path: Path, root: str) -> Any:  # noqa: ANN401
+    # Nodes are immutable, so graphs are decoded once per process
+    values = {}
+    pending = [root]
+    while pending:
+        node_hash = pending.pop()
+        if node_hash in values:
+            continue
+        values[node_hash] = read_graph_node(store_path, node_hash)
+        pending.extend(iter_references(values[node_hash]))
+
+    return ee.deserializer.decode({"result": root, "values": values})
+
+
+def is_partition_map(context: dg.InputContext | dg.OutputContext) -> bool:
+    return bool(context.definition_metadata.get(PARTITION_MAP_METADATA_KEY, False))
+
+
+def is_lazy(context: dg.InputContext) -> bool:
+    return bool(context.definition_metadata.get(LAZY_METADATA_KEY, False))
 
 
 class BaseManager(dg.ConfigurableIOManager):
@@ -43,23 +317,29 @@ class BaseManager(dg.ConfigurableIOManager):
         self,
         context: dg.InputContext | dg.OutputContext,
     ) -> Path | dict[str, Path]:
-        out_path = Path(self.path_resource.data_path) / "generated"
-        fpath = out_path / "/".join(context.asset_key.path)
+        fpath = get_asset_root_path(
+            self.path_resource.data_path,
+            tuple(context.asset_key.path),
+        )
 
         if context.has_asset_partitions:
+            partition_keys = context.asset_partition_keys
+            partitions_def = context.asset_partitions_def
+
             # Single partition
-            if len(context.asset_partition_keys) == 1:
-                final_path = process_partition_key(
-                    context.asset_partition_keys[0],
+            if len(partition_keys) == 1:
+                final_path = get_partition_path_index(
                     fpath,
                     self.extension,
-                )
+                    partitions_def,
+                )[partition_keys[0]]
             # Multiple partitions
             else:
                 final_path = process_multiple_partitions(
-                    context.asset_partition_keys,
+                    partition_keys,
                     fpath,
                     self.extension,
+                    partitions_def,
                 )
 
         # No partitions
@@ -67,58 +347,180 @@ class BaseManager(dg.ConfigurableIOManager):
             final_path = fpath.with_suffix(fpath.suffix + self.extension)
         return final_path
 
-
-class BaseJSONManager(BaseManager):
-    def _write_serialized_json(
+    def get_partition_paths(
+        self,
+        asset_key: dg.AssetKey,
+        partitions_def: dg.PartitionsDefinition,
+        partition_keys: Sequence[str],
+    ) -> dict[str, Path]:
+        return process_multiple_partitions(
+            partition_keys,
+            get_asset_root_path(self.path_resource.data_path, tuple(asset_key.path)),
+            self.extension,
+            partitions_def,
+        )
+
+    def _get_output_paths(
         self,
-        serialized: dict,
         context: dg.OutputContext,
-    ) -> None:
+        obj: Any,  # noqa: ANN401
+    ) -> list[tuple[Path, Any]]:
         fpath = self._get_path(context)
 
-        if isinstance(fpath, dict):
-            err = "JSONManager does not support multiple partitions."
-            raise TypeError(err)
+        if not is_partition_map(context):
+            if isinstance(fpath, dict):
+                err = f"{type(self).__name__} does not support multiple partitions."
+                raise TypeError(err)
+            return [(fpath, obj)]
 
-        fpath.parent.mkdir(exist_ok=True, parents=True)
+        # Assets backfilled in a single run return one value per partition key
+        if isinstance(fpath, Path):
+            fpath = {context.asset_partition_key: fpath}
 
-        with open(fpath, "w", encoding="utf8") as f:
-            json.dump(serialized, f)
+        if not isinstance(obj, dict) or obj.keys() != fpath.keys():
+            err = f"Expected one output per partition: {sorted(fpath)}"
+            raise ValueError(err)
 
-    def _read_serialized_json(self, context: dg.InputContext) -> dict:
+        return [(p, obj[key]) for key, p in fpath.items()]
+
+    # Counts returned by _write are summed over the written partitions into
+    # the output metadata
+    @abstractmethod
+    def _write(self, obj: Any, fpath: Path) -> dict[str, int] | None: ...  # noqa: ANN401
+
+    @abstractmethod
+    def _read(self, fpath: Path) -> Any: ...  # noqa: ANN401
+
+    def _write_counted(
+        self,
+        counts: dict[str, int],
+        obj: Any,  # noqa: ANN401
+        fpath: Path,
+    ) -> None:
+        for key, count in (self._write(obj, fpath) or {}).items():
+            counts[key] = counts.get(key, 0) + count
+
+    def handle_output(
+        self,
+        context: dg.OutputContext,
+        obj: Any,  # noqa: ANN401
+    ) -> None:
+        start = time.perf_counter()
+
+        # Versions are observed once per written partition, after its write
+        versions = {}
+        if is_partition_map(context) and isinstance(obj, dict):
+            versions = {
+                key: value.version
+                for key, value in obj.items()
+                if isinstance(value, Versioned)
+            }
+            obj = {
+                key: value.value if isinstance(value, Versioned) else value
+                for key, value in obj.items()
+            }
+
+        checksums = []
+        counts: dict[str, int] = {}
+        bytes_written = 0
+        unchanged = 0
+        for fpath, value in self._get_output_paths(context, obj):
+            if isinstance(value, Unchanged):
+                if not fpath.exists():
+                    err = f"{fpath} is marked unchanged but does not exist."
+                    raise FileNotFoundError(err)
+                unchanged += 1
+                continue
+
+            checksums.append(
+                write_atomic(fpath, partial(self._write_counted, counts, value)),
+            )
+            bytes_written += fpath.stat().st_size
+
+        metadata: dict[str, Any] = {
+            "bytes_written": bytes_written,
+            "io_write_seconds": time.perf_counter() - start,
+            **counts,
+        }
+        if len(checksums) == 1:
+            metadata["sha256"] = checksums[0]
+        else:
+            metadata["partitions_written"] = len(checksums)
+        if unchanged > 0:
+            metadata["partitions_unchanged"] = unchanged
+        context.add_output_metadata(metadata)
+
+        for key, version in versions.items():
+            context.log_event(
+                dg.AssetObservation(
+                    asset_key=context.asset_key,
+                    partition=key,
+                    metadata={INPUT_VERSION_METADATA_KEY: version},
+                ),
+            )
+
+    def _read_verified(self, fpath: Path) -> Any:  # noqa: ANN401
+        return self._read(verify_checksum(fpath))
+
+    def load_input(self, context: dg.InputContext) -> Any:  # noqa: ANN401
+        start = time.perf_counter()
         fpath = self._get_path(context)
 
+        # Lazy inputs are read by the asset, one at a time if it needs to
+        if is_lazy(context):
+            if isinstance(fpath, dict):
+                err = f"{type(self).__name__} does not support lazy partitions."
+                raise TypeError(err)
+            return partial(self._read_verified, fpath)
+
         if isinstance(fpath, dict):
-            err = "JSONManager does not support multiple partitions."
-            raise TypeError(err)
+            out = {key: self._read_verified(p) for key, p in fpath.items()}
+        elif is_partition_map(context):
+            out = {context.asset_partition_key: self._read_verified(fpath)}
+        else:
+            out = self._read_verified(fpath)
 
-        with open(fpath, encoding="utf8") as f:
-            return json.load(f)
+        record_read(context, time.perf_counter() - start)
+        return out
 
 
-class JSONManager(BaseJSONManager):
-    def handle_output(self, context: dg.OutputContext, obj: dict) -> None:
-        self._write_serialized_json(obj, context)
+class JSONManager(BaseManager):
+    def _write(self, obj: dict, fpath: Path) -> None:
+        with open(fpath, "w", encoding="utf8") as f:
+            json.dump(obj, f)
 
-    def load_input(self, context: dg.InputContext) -> dict:
-        return self._read_serialized_json(context)
+    def _read(self, fpath: Path) -> dict:
+        with open(fpath, encoding="utf8") as f:
+            return json.load(f)
 
 
-class EarthEngineManager(BaseJSONManager):
-    def handle_output(
+class EarthEngineManager(BaseManager):
+    def _get_store_path(self) -> Path:
+        return Path(self.path_resource.data_path) / "generated" / "_graphs"
+
+    def _write(
         self,
-        context: dg.OutputContext,
         obj: ee.image.Image | ee.geometry.Geometry,
-    ) -> None:
-        serialized = json.loads(obj.serialize())
-        self._write_serialized_json(serialized, context)
+        fpath: Path,
+    ) -> dict[str, int]:
+        serialized = obj.serialize()
+        root = write_graph(self._get_store_path(), json.loads(serialized))
+        with open(fpath, "w", encoding="utf8") as f:
+            json.dump({"graph": root}, f)
 
-    def load_input(
-        self,
-        context: dg.InputContext,
-    ) -> ee.image.Image | ee.geometry.Geometry:
-        serialized = self._read_serialized_json(context)
-        deserialized = ee.deserializer.decode(serialized)
+        # bytes_written only counts the files holding the graph roots, the
+        # graphs themselves are stored as nodes shared between outputs
+        return {"graph_bytes": len(serialized)}
+
+    def _read(self, fpath: Path) -> ee.image.Image | ee.geometry.Geometry:
+        with open(fpath, encoding="utf8") as f:
+            stored = json.load(f)
+
+        # Files written before the graph store hold the whole serialized graph
+        if "graph" in stored:
+            deserialized = decode_graph(self._get_store_path(), stored["graph"])
+        else:
+            deserialized = ee.deserializer.decode(stored)
 
         if isinstance(deserialized, (ee.image.Image, ee.geometry.Geometry)):
             return deserialized
@@ -127,93 +529,67 @@ class EarthEngineManager(BaseJSONManager):
         raise TypeError(err)
 
 
-class ShapelyManager(BaseJSONManager):
-    def handle_output(self, context: dg.OutputContext, obj: shapely.Geometry) -> None:
-        serialized = json.loads(shapely.to_geojson(obj))
-        self._write_serialized_json(serialized, context)
+class ShapelyManager(BaseManager):
+    def _write(self, obj: shapely.Geometry, fpath: Path) -> None:
+        with open(fpath, "wb") as f:
+            f.write(shapely.to_wkb(obj))
 
-    def load_input(self, context: dg.InputContext) -> shapely.Geometry:
-        serialized = self._read_serialized_json(context)
-        return shapely.geometry.shape(serialized)
+    def _read(self, fpath: Path) -> shapely.Geometry:
+        with open(fpath, "rb") as f:
+            return shapely.from_wkb(f.read())
 
 
 class DataFrameManager(BaseManager):
-    def handle_output(self, context: dg.OutputContext, obj: pd.DataFrame) -> None:
-        fpath = self._get_path(context)
-
-        if isinstance(fpath, dict):
-            err = "DataFrameManager does not support multiple partitions."
-            raise TypeError(err)
-
-        fpath.parent.mkdir(exist_ok=True, parents=True)
+    def _write(self, obj: pd.DataFrame, fpath: Path) -> None:
         obj.to_csv(fpath)
 
-    def load_input(
-        self,
-        context: dg.InputContext,
-    ) -> pd.DataFrame | dict[str, pd.DataFrame]:
-        fpath = self._get_path(context)
-        if isinstance(fpath, Path):
-            return pd.read_csv(fpath)
-        return {key: pd.read_csv(p) for key, p in fpath.items()}
-
+    def _read(self, fpath: Path) -> pd.DataFrame:
+        return pd.read_csv(fpath)
 
-class GeoDataFrameManager(BaseManager):
-    def handle_output(self, context: dg.OutputContext, obj: gpd.GeoDataFrame) -> None:
-        fpath = self._get_path(context)
 
-        if isinstance(fpath, dict):
-            err = "GeoDataFrameManager does not support multiple partitions."
-            raise TypeError(err)
+class ChunkedDataFrameManager(BaseManager):
+    # Chunks are produced one at a time and appended to one CSV, so only one
+    # of them is held in memory. A chunk that fails to build fails the write
+    # before the CSV replaces the stored one
+    def _write(self, obj: Sequence[Callable[[], pd.DataFrame]], fpath: Path) -> None:
+        with open(fpath, "w", encoding="utf8", newline="") as f:
+            for i, get_chunk in enumerate(obj):
+                get_chunk().to_csv(f, header=i == 0, index=False)
 
-        fpath.parent.mkdir(exist_ok=True, parents=True)
-        obj.to_file(fpath)
+    def _read(self, fpath: Path) -> pd.DataFrame:
+        return pd.read_csv(fpath)
 
-    def load_input(self, context: dg.InputContext) -> gpd.GeoDataFrame:
-        fpath = self._get_path(context)
 
-        if isinstance(fpath, dict):
-            err = "GeoDataFrameManager does not support multiple partitions."
-            raise TypeError(err)
+class GeoDataFrameManager(BaseManager):
+    def _write(self, obj: gpd.GeoDataFrame, fpath: Path) -> None:
+        # The spatial index stores features in Hilbert order, so the original
+        # order is kept in its own column
+        obj.assign(**{GEOMETRY_ORDER_COLUMN: np.arange(len(obj))}).to_file(
+            fpath,
+            driver="FlatGeobuf",
+            SPATIAL_INDEX="YES",
+        )
 
-        return gpd.read_file(fpath)
+    def _read(self, fpath: Path) -> gpd.GeoDataFrame:
+        return (
+            gpd.read_file(fpath)
+            .sort_values(GEOMETRY_ORDER_COLUMN)
+            .drop(columns=GEOMETRY_ORDER_COLUMN)
+            .reset_index(drop=True)
+        )
 
 
 class NumPyManager(BaseManager):
-    def handle_output(self, context: dg.OutputContext, obj: np.ndarray) -> None:
-        fpath = self._get_path(context)
-
-        if isinstance(fpath, dict):
-            err = "NumPyManager does not support multiple partitions."
-            raise TypeError(err)
-
-        fpath.parent.mkdir(exist_ok=True, parents=True)
+    def _write(self, obj: np.ndarray, fpath: Path) -> None:
         np.save(fpath, obj)
 
-    def load_input(self, context: dg.InputContext) -> np.ndarray:
-        fpath = self._get_path(context)
-
-        if isinstance(fpath, dict):
-            err = "NumPyManager does not support multiple partitions."
-            raise TypeError(err)
-
+    def _read(self, fpath: Path) -> np.ndarray:
         return np.load(fpath)
 
 
 class RasterManager(BaseManager):
-    def handle_output(
-        self,
-        context: dg.OutputContext,
-        obj: tuple[np.ndarray, CRS, Affine],
-    ) -> None:
+    def _write(self, obj: tuple[np.ndarray, CRS, Affine], fpath: Path) -> None:
         data, crs, transform = obj
-        fpath = self._get_path(context)
-        if isinstance(fpath, dict):
-            err = "RasterManager does not support multiple partitions."
-            raise TypeError(err)
-
-        fpath.parent.mkdir(exist_ok=True, parents=True)
-
         with rio.open(
             fpath,
             "w",
@@ -228,8 +604,7 @@ class RasterManager(BaseManager):
         ) as ds:
             ds.write(data, 1)
 
-    def load_input(self, context: dg.InputContext) -> tuple[np.ndarray, CRS, Affine]:
-        fpath = self._get_path(context)
+    def _read(self, fpath: Path) -> tuple[np.ndarray, CRS, Affine]:
         with rio.open(fpath) as ds:
             data = ds.read(1)
             crs = ds.crs
@@ -239,30 +614,54 @@ class RasterManager(BaseManager):
         return data, crs, transform
 
 
-class TextManager(BaseManager):
-    def handle_output(self, context: dg.OutputContext, obj: float) -> None:
-        fpath = self._get_path(context)
+class DataArrayManager(BaseManager):
+    # Bands are the first dimension of the array, their labels are stored as the
+    # band descriptions. Arrays too large for memory are staged by their asset
+    # as an uncompressed GeoTIFF, which is compressed a block at a time
+    def _write(self, obj: xr.DataArray | Path, fpath: Path) -> None:
+        if isinstance(obj, Path):
+            rio_shutil.copy(
+                obj,
+                fpath,
+                driver="GTiff",
+                tiled=True,
+                blockxsize=RASTER_BLOCK_SIZE,
+                blockysize=RASTER_BLOCK_SIZE,
+                compress="lzw",
+            )
+            obj.unlink()
+            return
+
+        labels = tuple(str(label) for label in obj[obj.dims[0]].to_numpy())
+        obj.assign_attrs(long_name=labels).rio.to_raster(
+            fpath,
+            tiled=True,
+            blockxsize=RASTER_BLOCK_SIZE,
+            blockysize=RASTER_BLOCK_SIZE,
+            compress="lzw",
+        )
 
-        if isinstance(fpath, dict):
-            err = "TextManager does not support multiple partitions."
+    def _read(self, fpath: Path) -> xr.DataArray:
+        # Pixels are only read when indexed
+        da = rioxarray.open_rasterio(fpath, cache=False)
+
+        if not isinstance(da, xr.DataArray):
+            err = f"Expected xr.DataArray, got {type(da)}"
             raise TypeError(err)
 
-        fpath.parent.mkdir(exist_ok=True, parents=True)
-        with open(fpath, "w", encoding="utf8") as f:
-            f.write(f"{obj:.6f}")
+        labels = da.attrs.get("long_name")
+        if isinstance(labels, str):
+            labels = (labels,)
+        if labels is not None:
+            da = da.assign_coords(band=list(labels))
+        return da
 
-    def load_input(self, context: dg.InputContext) -> float | dict[str, float]:
-        fpath = self._get_path(context)
-        if isinstance(fpath, os.PathLike):
-            with open(fpath, encoding="utf8") as f:
-                return float(f.read())
 
-        elif isinstance(fpath, dict):
-            out = {}
-            for key, p in fpath.items():
-                with open(p, encoding="utf8") as f:
-                    out[key] = float(f.read())
-            return out
+class TextManager(BaseManager):
+    def _write(self, obj: float, fpath: Path) -> None:
+        with open(fpath, "w", encoding="utf8") as f:
+            f.write(f"{obj:.6f}")
 
-        else:
-            assert_never(type(fpath))
+    def _read(self, fpath: Path) -> float:
+        with open(fpath, encoding="utf8") as f:
+            return float(f.read())
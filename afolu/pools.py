@@ -0,0 +1,36 @@
+import os
+
+import dagster as dg
+from afolu.resources import TilingResource
+
+# Assets bound by Earth Engine requests and by local compute run in their own
+# pools. Assets without a pool only build lazy expressions and never wait
+EE_POOL = "earth_engine"
+CPU_POOL = "cpu"
+
+# Earth Engine serves up to 40 concurrent interactive requests per project
+EE_MAX_CONCURRENT_REQUESTS = 40
+
+
+def get_pool_limits(tiling_resource: TilingResource) -> dict[str, int]:
+    # An asset sends up to one request per tiling worker at once, the tiles of
+    # the class cube
+    return {
+        EE_POOL: max(1, EE_MAX_CONCURRENT_REQUESTS // tiling_resource.workers),
+        CPU_POOL: os.cpu_count() or 1,
+    }
+
+
+def set_pool_limits(
+    instance: dg.DagsterInstance,
+    tiling_resource: TilingResource,
+) -> None:
+    for pool, limit in get_pool_limits(tiling_resource).items():
+        instance.event_log_storage.set_concurrency_slots(pool, limit)
+
+
+if __name__ == "__main__":
+    from afolu.definitions import tiling_resource
+
+    with dg.DagsterInstance.get() as instance:
+        set_pool_limits(instance, tiling_resource)
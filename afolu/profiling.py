@@ -0,0 +1,78 @@
+import cProfile
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+import dagster as dg
+
+MAX_STACK_DEPTH = 128
+MIN_FRAME_SECONDS = 1e-6
+
+# (filename, line number, function name), as used as keys by pstats
+Frame = tuple[str, int, str]
+
+
+def _frame_label(frame: Frame) -> str:
+    filename, lineno, funcname = frame
+    if filename == "~":
+        return funcname
+    return f"{funcname} ({Path(filename).name}:{lineno})".replace(";", ",")
+
+
+def collapse_stacks(stats: pstats.Stats) -> dict[str, float]:
+    # pstats only keeps caller -> callee edges, so full stacks are rebuilt by
+    # splitting each function's time among its callers proportionally
+    raw_stats: dict[Frame, tuple] = stats.stats  # type: ignore[attr-defined]
+
+    callees: dict[Frame, dict[Frame, float]] = defaultdict(dict)
+    for frame, (_, _, _, _, callers) in raw_stats.items():
+        for caller, (_, _, _, edge_cumtime) in callers.items():
+            callees[caller][frame] = edge_cumtime
+
+    out: dict[str, float] = defaultdict(float)
+
+    def _walk(frame: Frame, stack: tuple[Frame, ...], scale: float) -> None:
+        _, _, tottime, cumtime, _ = raw_stats[frame]
+        if cumtime * scale < MIN_FRAME_SECONDS or len(stack) >= MAX_STACK_DEPTH:
+            return
+
+        stack = (*stack, frame)
+        if tottime > 0:
+            out[";".join(_frame_label(elem) for elem in stack)] += tottime * scale
+
+        for callee, edge_cumtime in callees[frame].items():
+            callee_cumtime = raw_stats[callee][3]
+            # Recursive calls are already accounted for in the caller's frame
+            if callee in stack or callee_cumtime <= 0:
+                continue
+            _walk(callee, stack, scale * edge_cumtime / callee_cumtime)
+
+    for frame, (_, _, _, _, callers) in raw_stats.items():
+        if not callers:
+            _walk(frame, (), 1.0)
+
+    return out
+
+
+def write_profile(
+    profiler: cProfile.Profile,
+    fpath: Path,
+) -> dict[str, dg.MetadataValue]:
+    fpath.parent.mkdir(exist_ok=True, parents=True)
+
+    pstats_path = fpath.with_name(fpath.name + ".prof")
+    profiler.dump_stats(pstats_path)
+
+    # Collapsed stacks in microseconds, as read by flamegraph.pl and speedscope
+    collapsed_path = fpath.with_name(fpath.name + ".collapsed")
+    stacks = collapse_stacks(pstats.Stats(profiler))
+    with open(collapsed_path, "w", encoding="utf8") as f:
+        for stack, seconds in sorted(stacks.items()):
+            microseconds = round(seconds * 1e6)
+            if microseconds > 0:
+                f.write(f"{stack} {microseconds}\n")
+
+    return {
+        "profile_pstats": dg.MetadataValue.path(str(pstats_path)),
+        "profile_collapsed": dg.MetadataValue.path(str(collapsed_path)),
+    }
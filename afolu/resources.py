@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import dagster as dg
 
 
@@ -26,3 +28,80 @@ class AFOLUClassMapResource(dg.ConfigurableResource):
 
 class SelectedAreaResource(dg.ConfigurableResource):
     selected_area: str
+
+
+class SamplingResource(dg.ConfigurableResource):
+    points_per_class: int = 1000
+    seed: int = 0
+
+
+class EnsembleResource(dg.ConfigurableResource):
+    # Every seed is paired with every fraction of grasslands turned into pastures
+    seeds: list[int]
+    fractions: list[float]
+
+
+class ReductionResource(dg.ConfigurableResource):
+    # Scales in meters from coarse to fine, each asset's own scale when unset.
+    # Partitions whose inputs did not change are reduced again when force is set
+    scales: list[int] | None = None
+    tolerance: float = 0.01
+    time_budget_seconds: float | None = None
+    force: bool = False
+
+
+class MosaicResource(dg.ConfigurableResource):
+    # Earth Engine folder of the exported mosaics, they stay lazy when unset
+    asset_root: str | None = None
+    poll_seconds: float = 30
+
+
+class GeometryResource(dg.ConfigurableResource):
+    # Regions are simplified to at most max_vertices vertices, and reduced over
+    # their bounding rectangle with a rasterized mask band when rectangle is set
+    max_vertices: int | None = None
+    rectangle: bool = False
+
+
+class TilingResource(dg.ConfigurableResource):
+    # Tiles are square windows of tile_size pixels, computed by up to workers threads.
+    # Their histograms are cached on disk up to cache_bytes
+    tile_size: int = 1024
+    workers: int = 1
+    cache_bytes: int = 4 * 2**30
+
+
+class PlannerResource(dg.ConfigurableResource):
+    # Pixels a single reduceRegion may read before it risks the interactive
+    # timeout, and memory the local class cube may take
+    single_call_pixels: float = 1e9
+    max_memory_bytes: int = 8 * 2**30
+
+
+class ProjectionResource(dg.ConfigurableResource):
+    # Scenarios draw one of the last periods of the transition cube (all when
+    # unset) at each of the horizon yearly steps
+    scenarios: int = 1000
+    horizon: int = 28
+    seed: int = 0
+    periods: int | None = None
+
+
+class ProfilerResource(dg.ConfigurableResource):
+    path_resource: dg.ResourceDependency[PathResource]
+    enabled: bool = False
+
+    def get_profile_path(
+        self,
+        asset_key: dg.AssetKey,
+        partition_key: str | None,
+    ) -> Path:
+        fpath = (
+            Path(self.path_resource.data_path)
+            / "generated"
+            / "_profiles"
+            / "/".join(asset_key.path)
+        )
+        if partition_key is not None:
+            fpath = fpath / "/".join(partition_key.split("|"))
+        return fpath
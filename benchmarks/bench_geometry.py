@@ -0,0 +1,119 @@
+import argparse
+import tempfile
+import timeit
+from functools import partial
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from afolu.managers import GeoDataFrameManager, ShapelyManager
+
+REPEATS = 5
+REGIONS = ("amazon", "mexico", "small")
+
+
+def synthetic_region(vertices: int, seed: int) -> gpd.GeoDataFrame:
+    # Star shaped polygon with a ragged boundary, close to the vertex count of
+    # the simplified country outlines
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = 10 + rng.uniform(-0.5, 0.5, vertices)
+    polygon = shapely.Polygon(
+        np.column_stack([-100 + radii * np.cos(angles), 20 + radii * np.sin(angles)]),
+    )
+    return gpd.GeoDataFrame(geometry=[polygon], crs="EPSG:4326")
+
+
+def load_regions(data_path: str | None, vertices: int) -> dict[str, gpd.GeoDataFrame]:
+    regions = {}
+    for i, region in enumerate(REGIONS):
+        root_path = Path(data_path or "") / "generated" / region / "bbox"
+        fpath = next(
+            (
+                root_path / f"shapely{ext}"
+                for ext in (".fgb", ".gpkg")
+                if data_path is not None and (root_path / f"shapely{ext}").exists()
+            ),
+            None,
+        )
+        if fpath is None:
+            regions[f"{region}/synthetic"] = synthetic_region(vertices, i)
+        else:
+            regions[region] = gpd.read_file(fpath)
+    return regions
+
+
+def write_gpkg(df: gpd.GeoDataFrame, fpath: Path) -> None:
+    df.to_file(fpath)
+
+
+def read_gpkg(fpath: Path) -> gpd.GeoDataFrame:
+    return gpd.read_file(fpath)
+
+
+def write_geojson(geom: shapely.Geometry, fpath: Path) -> None:
+    with open(fpath, "w", encoding="utf8") as f:
+        f.write(shapely.to_geojson(geom))
+
+
+def read_geojson(fpath: Path) -> shapely.Geometry:
+    with open(fpath, encoding="utf8") as f:
+        return shapely.from_geojson(f.read())
+
+
+def best_time(func: partial) -> float:
+    return min(timeit.repeat(func, number=1, repeat=REPEATS))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--data-path",
+        help="Read the bbox/shapely assets of this data path",
+    )
+    parser.add_argument(
+        "--vertices",
+        type=int,
+        default=200_000,
+        help="Vertices of the synthetic regions used when an asset is missing",
+    )
+    args = parser.parse_args()
+
+    # The managers are only used for their file formats
+    gdf_manager = GeoDataFrameManager.model_construct(extension=".fgb")
+    shapely_manager = ShapelyManager.model_construct(extension=".wkb")
+    gdf_format = (gdf_manager._write, gdf_manager._read)  # noqa: SLF001
+    shapely_format = (shapely_manager._write, shapely_manager._read)  # noqa: SLF001
+
+    print(
+        f"{'region':<20} {'format':<16} {'bytes':>12} {'write ms':>10} {'read ms':>10}",
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, df in load_regions(args.data_path, args.vertices).items():
+            geom = df["geometry"].item()
+            for fmt, obj, ext, write, read in (
+                ("gdf/gpkg", df, ".gpkg", write_gpkg, read_gpkg),
+                ("gdf/flatgeobuf", df, ".fgb", *gdf_format),
+                ("geom/geojson", geom, ".json", write_geojson, read_geojson),
+                ("geom/wkb", geom, ".wkb", *shapely_format),
+            ):
+                fpath = Path(tmp_dir) / f"{name.replace('/', '_')}{ext}"
+                write_seconds = best_time(partial(write, obj, fpath))
+                read_seconds = best_time(partial(read, fpath))
+
+                out = read(fpath)
+                out_geom = out["geometry"].item() if fmt.startswith("gdf") else out
+                if not shapely.equals_exact(out_geom, geom, tolerance=0):
+                    err = f"{fmt} does not round-trip {name}."
+                    raise ValueError(err)
+
+                print(
+                    f"{name:<20} {fmt:<16} {fpath.stat().st_size:>12,}"
+                    f" {write_seconds * 1000:>10.2f} {read_seconds * 1000:>10.2f}",
+                )
+
+
+if __name__ == "__main__":
+    main()
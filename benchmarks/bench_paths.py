@@ -0,0 +1,82 @@
+import tempfile
+import timeit
+from functools import partial
+from itertools import product
+from pathlib import Path
+
+import dagster as dg
+from afolu.assets.constants import LABEL_LIST
+from afolu.managers import (
+    get_asset_root_path,
+    make_parent_dir,
+    process_multiple_partitions,
+    process_partition_key,
+)
+
+REPEATS = 20
+
+
+def uncached_paths(partition_keys: list[str], data_path: str) -> dict[str, Path]:
+    root_path = Path(data_path) / "generated" / "mexico/transition/value"
+    return {
+        key: process_partition_key(key, root_path, ".txt") for key in partition_keys
+    }
+
+
+def cached_paths(
+    partition_keys: list[str],
+    data_path: str,
+    partitions_def: dg.PartitionsDefinition,
+) -> dict[str, Path]:
+    root_path = get_asset_root_path(data_path, ("mexico", "transition", "value"))
+    return process_multiple_partitions(
+        partition_keys,
+        root_path,
+        ".txt",
+        partitions_def,
+    )
+
+
+def uncached_mkdir(paths: list[Path]) -> None:
+    for path in paths:
+        path.parent.mkdir(exist_ok=True, parents=True)
+
+
+def cached_mkdir(paths: list[Path]) -> None:
+    for path in paths:
+        make_parent_dir(path)
+
+
+def main() -> None:
+    partition_keys = [
+        f"{start}-{end}|{year}_{year + 1}"
+        for start, end in product(LABEL_LIST, LABEL_LIST)
+        for year in range(2000, 2022)
+    ]
+    partitions_def = dg.StaticPartitionsDefinition(partition_keys)
+    print(f"Partitions: {len(partition_keys)}")
+
+    with tempfile.TemporaryDirectory() as data_path:
+        paths = list(cached_paths(partition_keys, data_path, partitions_def).values())
+        if paths != list(uncached_paths(partition_keys, data_path).values()):
+            err = "Cached and uncached path indices differ."
+            raise ValueError(err)
+
+        for name, func, args in (
+            ("paths/uncached", uncached_paths, (partition_keys, data_path)),
+            (
+                "paths/cached",
+                cached_paths,
+                (partition_keys, data_path, partitions_def),
+            ),
+            ("mkdir/uncached", uncached_mkdir, (paths,)),
+            ("mkdir/cached", cached_mkdir, (paths,)),
+        ):
+            elapsed = min(
+                timeit.repeat(partial(func, *args), number=1, repeat=REPEATS),
+            )
+            print(f"{name:<16} {elapsed * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+import toml
+
+import dagster as dg
+from benchmarks import fake_ee
+
+REPO_PATH = Path(__file__).resolve().parents[1]
+ALL_YEARS = [str(year) for year in range(2000, 2023)]
+ALL_YEAR_PAIRS = [f"{year}_{year + 1}" for year in range(2000, 2022)]
+METRICS = (
+    "wall_seconds",
+    "compute_seconds",
+    "ee_wait_seconds",
+    "io_read_seconds",
+    "io_write_seconds",
+    "getinfo_calls",
+    "bytes_written",
+)
+
+
+def get_codes() -> tuple[int, ...]:
+    with open(REPO_PATH / "id_map.toml", encoding="utf8") as f:
+        config = toml.load(f)
+
+    codes = set()
+    for spec in config.values():
+        for start, end in spec["ranges"]:
+            codes.update(range(start, end + 1))
+    return tuple(sorted(codes))
+
+
+def write_regions(data_path: Path) -> None:
+    from afolu.definitions import geodataframe_manager  # noqa: PLC0415
+
+    regions = {
+        "amazon": shapely.Point(-98.5, 18.5).buffer(0.4, quad_segs=16),
+        "mexico": shapely.Polygon(
+            [(-99.9, 19.1), (-99.1, 19.9), (-98.2, 19.6), (-98.9, 18.9)],
+        ),
+        "small": shapely.box(-99.8, 18.2, -99.3, 18.7),
+    }
+    for region, geom in regions.items():
+        fpath = data_path / "generated" / region / "bbox" / "shapely"
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        geodataframe_manager._write(  # noqa: SLF001
+            gpd.GeoDataFrame(geometry=[geom], crs="EPSG:4326"),
+            fpath.with_suffix(geodataframe_manager.extension),
+        )
+
+    # Mexico is split into synthetic states for the zone assets
+    mexico = regions["mexico"]
+    xmin, ymin, xmax, ymax = mexico.bounds
+    xs = [xmin + (xmax - xmin) * i / 4 for i in range(5)]
+    states = [
+        mexico.intersection(shapely.box(x0, ymin, x1, ymax))
+        for x0, x1 in itertools.pairwise(xs)
+    ]
+    fpath = data_path / "initial" / "gadm41_MEX.gpkg"
+    fpath.parent.mkdir(parents=True, exist_ok=True)
+    gpd.GeoDataFrame(
+        {"NAME_1": [f"state_{i}" for i in range(len(states))]},
+        geometry=states,
+        crs="EPSG:4326",
+    ).to_file(fpath, layer="ADM_ADM_1")
+
+
+def keep_partition(partition_key: str, years: set[str], year_pairs: set[str]) -> bool:
+    for part in partition_key.split("|"):
+        if part in ALL_YEARS and part not in years:
+            return False
+        if part in ALL_YEAR_PAIRS and part not in year_pairs:
+            return False
+    return True
+
+
+def get_partition_keys(
+    node,  # noqa: ANN001
+    years: set[str],
+    year_pairs: set[str],
+) -> list:
+    if node.partitions_def is None:
+        return [None]
+    return [
+        partition_key
+        for partition_key in node.partitions_def.get_partition_keys()
+        if keep_partition(partition_key, years, year_pairs)
+    ]
+
+
+def plan_steps(
+    asset_graph,  # noqa: ANN001
+    regions: set[str],
+    years: set[str],
+    year_pairs: set[str],
+) -> list[tuple]:
+    # Assets are run in topological order, each partition only once all of the
+    # upstream partitions it depends on have been materialized
+    done: dict = defaultdict(set)
+    steps = []
+    for key in asset_graph.toposorted_asset_keys:
+        node = asset_graph.get(key)
+        # The zonal assets read the bounding boxes of every region
+        in_region = (
+            key.path[0] in regions
+            or ("small" in regions and key.path == ["transition_label_map"])
+            or ("zonal" in regions and key.path[1:2] == ["bbox"])
+        )
+        if not in_region:
+            continue
+        # Region outlines are written by write_regions, the zonal one is derived
+        if key.path[-2:] == ["bbox", "shapely"] and key.path[0] != "zonal":
+            done[key].add(None)
+            continue
+
+        # Multi assets materialize all of their keys in the same step
+        candidates = [
+            partition_key
+            for partition_key in get_partition_keys(node, years, year_pairs)
+            if partition_key not in done[key]
+        ]
+
+        for partition_key in candidates:
+            ready = True
+            for parent in node.parent_keys:
+                if asset_graph.get(parent).partitions_def is None:
+                    required = {None}
+                else:
+                    required = set(
+                        asset_graph.get_parent_partition_keys_for_child(
+                            partition_key,
+                            parent,
+                            key,
+                        ).partitions_subset.get_partition_keys(),
+                    )
+                if not required <= done[parent]:
+                    ready = False
+                    break
+
+            if ready:
+                steps.append((key, partition_key))
+                for execution_key in node.execution_set_asset_keys:
+                    done[execution_key].add(partition_key)
+
+    return steps
+
+
+def group_single_runs(
+    asset_graph,  # noqa: ANN001
+    steps: list[tuple],
+) -> list[tuple]:
+    # Consecutive partitions of assets with a single-run backfill policy are
+    # launched as one run over a partition key range, as a backfill would
+    runs: list[tuple] = []
+    for key, partition_key in steps:
+        node = asset_graph.get(key)
+        single_run = (
+            partition_key is not None
+            and node.backfill_policy is not None
+            and node.backfill_policy.max_partitions_per_run is None
+        )
+        if single_run and runs and runs[-1][0] == key:
+            all_keys = node.partitions_def.get_partition_keys()
+            last = runs[-1][1][-1]
+            if all_keys.index(partition_key) == all_keys.index(last) + 1:
+                runs[-1][1].append(partition_key)
+                continue
+        runs.append((key, [partition_key]))
+    return runs
+
+
+def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    fake_ee.engine.configure(
+        shape=(args.size, args.size),
+        codes=get_codes(),
+        latency=args.latency,
+    )
+
+    data_path = Path(tempfile.mkdtemp(prefix="afolu-bench-"))
+    for var in ("DATA_PATH", "GHSL_PATH", "POPULATION_GRIDS_PATH"):
+        os.environ[var] = str(data_path)
+    write_regions(data_path)
+
+    # The definitions read id_map.toml relative to the working directory and
+    # must only be imported once the fake ee module is installed
+    os.chdir(REPO_PATH)
+    from afolu.definitions import defs  # noqa: PLC0415
+
+    job = defs.resolve_implicit_global_asset_job_def()
+    asset_graph = defs.resolve_asset_graph()
+    steps = plan_steps(
+        asset_graph,
+        set(args.regions),
+        set(ALL_YEARS[: args.years]),
+        set(ALL_YEAR_PAIRS[: args.year_pairs]),
+    )
+    if args.single_run:
+        runs = group_single_runs(asset_graph, steps)
+    else:
+        runs = [(key, [partition_key]) for key, partition_key in steps]
+    print(f"Running {len(steps)} materializations in {len(runs)} runs in {data_path}")
+
+    resources = {}
+    if args.scales is not None:
+        resources["reduction_resource"] = {"config": {"scales": args.scales}}
+    if args.max_vertices is not None or args.rectangle:
+        resources["geometry_resource"] = {
+            "config": {"max_vertices": args.max_vertices, "rectangle": args.rectangle},
+        }
+    run_config = {"resources": resources} if resources else {}
+
+    totals: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    with dg.DagsterInstance.ephemeral() as instance:
+        for key, partition_keys in runs:
+            if len(partition_keys) == 1:
+                partition_key, tags = partition_keys[0], None
+            else:
+                partition_key = None
+                tags = {
+                    "dagster/asset_partition_range_start": partition_keys[0],
+                    "dagster/asset_partition_range_end": partition_keys[-1],
+                }
+
+            start = time.perf_counter()
+            result = job.execute_in_process(
+                asset_selection=list(asset_graph.get(key).execution_set_asset_keys),
+                partition_key=partition_key,
+                tags=tags,
+                instance=instance,
+                run_config=run_config,
+            )
+            elapsed = time.perf_counter() - start
+
+            row = totals[key.to_user_string()]
+            row["runs"] += 1
+            row["materializations"] += len(partition_keys)
+            row["wall_seconds"] += elapsed
+            # Metadata is recorded once per run and repeated on every partition
+            events = result.get_asset_materialization_events()
+            metadata = events[0].materialization.metadata
+            for metric in METRICS[1:]:
+                if metric in metadata:
+                    row[metric] += metadata[metric].value  # pyright: ignore[reportOperatorIssue]
+
+    totals["_total"]["getinfo_calls_fake"] = fake_ee.engine.getinfo_calls
+    return totals
+
+
+def report(totals: dict[str, dict[str, float]]) -> None:
+    header = f"{'asset':<40} {'runs':>5} {'n':>5} " + " ".join(
+        f"{m[:14]:>14}" for m in METRICS
+    )
+    print(header)
+    print("-" * len(header))
+    for asset_key, row in sorted(totals.items()):
+        if asset_key.startswith("_"):
+            continue
+        values = " ".join(f"{row[m]:>14.4g}" for m in METRICS)
+        counts = f"{int(row['runs']):>5} {int(row['materializations']):>5}"
+        print(f"{asset_key:<40} {counts} {values}")
+
+    summed = {m: sum(row[m] for row in totals.values()) for m in METRICS}
+    print("-" * len(header))
+    print(f"{'total':<40} {'':>11} " + " ".join(f"{summed[m]:>14.4g}" for m in METRICS))
+
+
+def check_baseline(totals: dict[str, dict[str, float]], fpath: Path) -> list[str]:
+    with open(fpath, encoding="utf8") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for asset_key, expected in baseline.items():
+        actual = totals.get(asset_key, {}).get("getinfo_calls", 0)
+        if actual > expected:
+            regressions.append(f"{asset_key}: {actual:g} getInfo calls > {expected:g}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Materialize the asset graphs against a fake Earth Engine.",
+    )
+    parser.add_argument(
+        "--regions",
+        nargs="+",
+        default=["small", "amazon", "mexico"],
+        choices=["small", "amazon", "mexico", "zonal"],
+    )
+    parser.add_argument("--years", type=int, default=len(ALL_YEARS))
+    parser.add_argument("--year-pairs", type=int, default=2)
+    parser.add_argument("--size", type=int, default=128, help="Raster side in pixels")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per call")
+    parser.add_argument(
+        "--single-run",
+        action="store_true",
+        help="Run partition ranges of single-run backfill assets in one run",
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        type=int,
+        help="Reduce progressively at these scales, from coarse to fine",
+    )
+    parser.add_argument(
+        "--max-vertices",
+        type=int,
+        help="Simplify the regions to at most this many vertices",
+    )
+    parser.add_argument(
+        "--rectangle",
+        action="store_true",
+        help="Reduce over region rectangles with a rasterized region mask",
+    )
+    parser.add_argument("--csv", type=Path, help="Write per-asset totals to CSV")
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    args = parser.parse_args()
+
+    fake_ee.install()
+    totals = run(args)
+    report(totals)
+
+    if args.csv is not None:
+        pd.DataFrame(totals).T.rename_axis("asset").to_csv(args.csv)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    key: row["getinfo_calls"]
+                    for key, row in sorted(totals.items())
+                    if not key.startswith("_")
+                },
+                f,
+                indent=2,
+            )
+
+    if args.baseline is not None:
+        regressions = check_baseline(totals, args.baseline)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
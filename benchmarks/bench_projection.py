@@ -0,0 +1,99 @@
+import argparse
+import timeit
+from functools import partial
+
+import numpy as np
+
+from afolu.assets.projection import PROJECTION_LABELS, project_areas, sample_paths
+
+REPEATS = 3
+PERIODS = 22
+
+
+def synthetic_inputs(
+    regions: int,
+    seed: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Row stochastic matrices close to the identity, as land use mostly stays
+    rng = np.random.default_rng(seed)
+    size = len(PROJECTION_LABELS)
+    matrices = rng.random((regions, PERIODS, size, size)) + 20 * np.eye(size)
+    matrices /= matrices.sum(axis=-1, keepdims=True)
+    initial = rng.random((regions, size))
+    initial /= initial.sum(axis=-1, keepdims=True)
+    return initial, matrices
+
+
+def project_loop(
+    initial: np.ndarray,
+    matrices: np.ndarray,
+    paths: np.ndarray,
+) -> np.ndarray:
+    # One scenario of one region at a time, as a projection run by hand would
+    regions, scenarios, horizon = paths.shape
+    out = np.empty((regions, scenarios, horizon + 1, initial.shape[-1]))
+    for region in range(regions):
+        for scenario in range(scenarios):
+            state = initial[region]
+            out[region, scenario, 0] = state
+            for step in range(horizon):
+                state = state @ matrices[region, paths[region, scenario, step]]
+                out[region, scenario, step + 1] = state
+    return out
+
+
+def project_batched(
+    initial: np.ndarray,
+    matrices: np.ndarray,
+    paths: np.ndarray,
+) -> np.ndarray:
+    # Regions and scenarios share the batch, with the matrices of all regions
+    # in one stack
+    regions, scenarios, horizon = paths.shape
+    offsets = np.arange(regions)[:, None, None] * matrices.shape[1]
+    out = project_areas(
+        np.repeat(initial, scenarios, axis=0),
+        matrices.reshape(-1, *matrices.shape[2:]),
+        (paths + offsets).reshape(-1, horizon),
+    )
+    return out.reshape(regions, scenarios, horizon + 1, -1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--regions", type=int, default=3)
+    parser.add_argument("--scenarios", type=int, default=5000)
+    parser.add_argument("--horizon", type=int, default=28)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    initial, matrices = synthetic_inputs(args.regions, args.seed)
+    paths = np.stack(
+        [
+            sample_paths(PERIODS, args.scenarios, args.horizon, args.seed + region)
+            for region in range(args.regions)
+        ],
+    )
+    print(
+        f"Regions: {args.regions}, scenarios: {args.scenarios},"
+        f" horizon: {args.horizon}",
+    )
+
+    expected = project_loop(initial, matrices, paths)
+    if not np.allclose(project_batched(initial, matrices, paths), expected):
+        err = "Batched and looped projections differ."
+        raise ValueError(err)
+
+    for name, func in (("loop", project_loop), ("batched", project_batched)):
+        elapsed = min(
+            timeit.repeat(
+                partial(func, initial, matrices, paths),
+                number=1,
+                repeat=REPEATS,
+            ),
+        )
+        print(f"{name:<8} {elapsed * 1000:12.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
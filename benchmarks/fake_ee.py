@@ -0,0 +1,1027 @@
+import hashlib
+import json
+import sys
+import time
+import types
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+import shapely
+
+EARTH_RADIUS = 6_371_008.8
+CACHE_SIZE = 128
+GLC30_COLLECTION = "projects/sat-io/open-datasets/GLC-FCS30D/annual"
+GLC30_BAND_COUNT = 23
+
+# Output type of every function the fake can evaluate, used when decoding
+FUNCTION_TYPES = {
+    "Collection": "FeatureCollection",
+    "Collection.filter": "ImageCollection",
+    "Collection.first": "Image",
+    "Collection.select": "FeatureCollection",
+    "Feature": "Feature",
+    "GeometryConstructors.GeoJSON": "Geometry",
+    "GeometryConstructors.Polygon": "Geometry",
+    "GeometryConstructors.Rectangle": "Geometry",
+    "Image.add": "Image",
+    "Image.addBands": "Image",
+    "Image.and": "Image",
+    "Image.bandNames": "List",
+    "Image.clip": "Image",
+    "Image.constant": "Image",
+    "Image.eq": "Image",
+    "Image.gt": "Image",
+    "Image.gte": "Image",
+    "Image.lte": "Image",
+    "Image.multiply": "Image",
+    "Image.not": "Image",
+    "Image.or": "Image",
+    "Image.paint": "Image",
+    "Image.pixelArea": "Image",
+    "Image.projection": "Projection",
+    "Image.random": "Image",
+    "Image.reduceRegion": "Dictionary",
+    "Image.reduceRegions": "FeatureCollection",
+    "Image.rename": "Image",
+    "Image.reproject": "Image",
+    "Image.select": "Image",
+    "Image.stratifiedSample": "FeatureCollection",
+    "Image.toUint8": "Image",
+    "Image.unmask": "Image",
+    "Image.updateMask": "Image",
+    "Image.where": "Image",
+    "ImageCollection.load": "ImageCollection",
+    "ImageCollection.mode": "Image",
+    "Reducer.group": "Reducer",
+    "Reducer.repeat": "Reducer",
+    "Reducer.sum": "Reducer",
+}
+
+
+class FakeEarthEngine:
+    def __init__(self) -> None:
+        self.configure()
+
+    def configure(
+        self,
+        *,
+        bounds: tuple[float, float, float, float] = (-100.0, 18.0, -98.0, 20.0),
+        shape: tuple[int, int] = (128, 128),
+        codes: tuple[int, ...] = (10, 130, 140, 185, 190, 210),
+        persistence: float = 0.95,
+        latency: float = 0.0,
+        base_scale: float = 30.0,
+        seed: int = 0,
+    ) -> None:
+        self.bounds = bounds
+        self.shape = shape
+        self.codes = np.asarray(codes)
+        self.persistence = persistence
+        self.latency = latency
+        self.base_scale = base_scale
+        self.seed = seed
+
+        self.getinfo_calls = 0
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        self._geometry_masks: dict[str, np.ndarray] = {}
+
+        height, width = shape
+        xmin, ymin, xmax, ymax = bounds
+        self.xres = (xmax - xmin) / width
+        self.yres = (ymax - ymin) / height
+        self.xs = xmin + (np.arange(width) + 0.5) * self.xres
+        self.ys = ymax - (np.arange(height) + 0.5) * self.yres
+
+    def evaluate(self, node: "ComputedObject") -> Any:
+        key = node.key
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        func = getattr(self, "_eval_" + node.func.replace(".", "_"))
+        args = {
+            name: self.evaluate(value) if isinstance(value, ComputedObject) else value
+            for name, value in node.args.items()
+        }
+        out = func(**args)
+
+        self._cache[key] = out
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return out
+
+    def get_info(self, node: "ComputedObject") -> Any:
+        self.getinfo_calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        out = self.evaluate(node)
+        if isinstance(out, FakeImage):
+            return {"type": "Image", "bands": [{"id": name} for name in out.names]}
+        if isinstance(out, shapely.Geometry):
+            return json.loads(shapely.to_geojson(out))
+        return out
+
+    # Rasters
+    def _full(self, value: float) -> np.ndarray:
+        return np.full(self.shape, value, dtype=np.float64)
+
+    def _geometry_mask(self, geometry: shapely.Geometry) -> np.ndarray:
+        key = geometry.wkb_hex
+        if key not in self._geometry_masks:
+            xx, yy = np.meshgrid(self.xs, self.ys)
+            self._geometry_masks[key] = shapely.contains_xy(geometry, xx, yy)
+        return self._geometry_masks[key]
+
+    def _glc30(self) -> "FakeImage":
+        rng = np.random.default_rng(self.seed)
+        current = rng.choice(self.codes, size=self.shape).astype(np.float64)
+
+        bands = []
+        for _ in range(GLC30_BAND_COUNT):
+            changed = rng.random(self.shape) > self.persistence
+            current = np.where(
+                changed,
+                rng.choice(self.codes, size=self.shape),
+                current,
+            )
+            bands.append(current)
+
+        return FakeImage(
+            [f"b{i}" for i in range(1, GLC30_BAND_COUNT + 1)],
+            bands,
+            [np.ones(self.shape, dtype=bool)] * GLC30_BAND_COUNT,
+        )
+
+    def _forests(self) -> "FakeImage":
+        rng = np.random.default_rng(self.seed + 1)
+        data = rng.integers(1, 3, size=self.shape).astype(np.float64)
+        return FakeImage(["b1"], [data], [np.ones(self.shape, dtype=bool)])
+
+    # Evaluation of each supported function
+    def _eval_GeometryConstructors_Polygon(
+        self,
+        coordinates: list,
+    ) -> shapely.Polygon:
+        return shapely.Polygon(coordinates)
+
+    def _eval_GeometryConstructors_Rectangle(
+        self,
+        coordinates: list[float],
+        **_: Any,
+    ) -> shapely.Polygon:
+        return shapely.box(*coordinates)
+
+    def _eval_GeometryConstructors_GeoJSON(self, geoJson: dict) -> shapely.Geometry:
+        return shapely.geometry.shape(geoJson)
+
+    def _eval_Feature(self, geometry: shapely.Geometry, metadata: dict) -> dict:
+        return {
+            "type": "Feature",
+            "geometry": json.loads(shapely.to_geojson(geometry)),
+            "properties": metadata,
+        }
+
+    def _eval_Collection(self, features: list[dict]) -> dict:
+        return {"type": "FeatureCollection", "features": features}
+
+    def _eval_Collection_select(
+        self,
+        input: dict,
+        propertySelectors: list[str],
+    ) -> dict:
+        # Geometries are dropped unless asked for, as in ee
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {
+                        name: value
+                        for name, value in feature["properties"].items()
+                        if name in propertySelectors
+                    },
+                }
+                for feature in input["features"]
+            ],
+        }
+
+    def _eval_ImageCollection_load(self, id: str) -> str:
+        return id
+
+    def _eval_Collection_filter(self, collection: str, **_: Any) -> str:
+        return collection
+
+    def _eval_ImageCollection_mode(self, collection: str) -> "FakeImage":
+        if collection == GLC30_COLLECTION:
+            return self._glc30()
+        return self._forests()
+
+    def _eval_Collection_first(self, collection: str) -> "FakeImage":
+        image = self._eval_ImageCollection_mode(collection)
+        image.native = True
+        return image
+
+    def _eval_Image_constant(
+        self,
+        value: float | list[float],
+    ) -> "FakeImage":
+        if isinstance(value, list):
+            names = [f"constant_{i}" for i in range(len(value))]
+            return FakeImage(
+                names,
+                [self._full(elem) for elem in value],
+                [np.ones(self.shape, dtype=bool)] * len(value),
+            )
+        return FakeImage(
+            ["constant"],
+            [self._full(value)],
+            [np.ones(self.shape, dtype=bool)],
+        )
+
+    def _eval_Image_random(self, seed: int, **_: Any) -> "FakeImage":
+        data = np.random.default_rng(seed).random(self.shape)
+        return FakeImage(["random"], [data], [np.ones(self.shape, dtype=bool)])
+
+    def _eval_Image_pixelArea(self) -> "FakeImage":
+        lat_top = np.radians(self.ys + self.yres / 2)
+        lat_bottom = np.radians(self.ys - self.yres / 2)
+        row_area = (
+            EARTH_RADIUS**2
+            * np.radians(self.xres)
+            * (np.sin(lat_top) - np.sin(lat_bottom))
+        )
+        data = np.repeat(row_area[:, None], self.shape[1], axis=1)
+        return FakeImage(["area"], [data], [np.ones(self.shape, dtype=bool)])
+
+    def _eval_Image_select(
+        self,
+        input: "FakeImage",
+        bandSelectors: list[str],
+    ) -> "FakeImage":
+        indices = [input.names.index(name) for name in bandSelectors]
+        return FakeImage(
+            [input.names[i] for i in indices],
+            [input.data[i] for i in indices],
+            [input.masks[i] for i in indices],
+        )
+
+    def _eval_Image_rename(
+        self,
+        input: "FakeImage",
+        names: list[str],
+    ) -> "FakeImage":
+        return FakeImage(names, input.data, input.masks)
+
+    def _eval_Image_clip(
+        self,
+        input: "FakeImage",
+        geometry: shapely.Geometry,
+    ) -> "FakeImage":
+        inside = self._geometry_mask(geometry)
+        return FakeImage(input.names, input.data, [m & inside for m in input.masks])
+
+    def _binary(
+        self,
+        a: "FakeImage",
+        b: "FakeImage",
+        op: Any,
+    ) -> "FakeImage":
+        count = max(len(a.names), len(b.names))
+        a_index = [0] * count if len(a.names) == 1 else range(count)
+        b_index = [0] * count if len(b.names) == 1 else range(count)
+        names = a.names if len(a.names) == count else b.names
+        return FakeImage(
+            names,
+            [op(a.data[i], b.data[j]) for i, j in zip(a_index, b_index, strict=True)],
+            [a.masks[i] & b.masks[j] for i, j in zip(a_index, b_index, strict=True)],
+        )
+
+    def _eval_Image_and(
+        self,
+        image1: "FakeImage",
+        image2: "FakeImage",
+    ) -> "FakeImage":
+        return self._binary(image1, image2, lambda a, b: ((a != 0) & (b != 0)) * 1.0)
+
+    def _eval_Image_or(
+        self,
+        image1: "FakeImage",
+        image2: "FakeImage",
+    ) -> "FakeImage":
+        return self._binary(image1, image2, lambda a, b: ((a != 0) | (b != 0)) * 1.0)
+
+    def _eval_Image_multiply(
+        self,
+        image1: "FakeImage",
+        image2: "FakeImage",
+    ) -> "FakeImage":
+        return self._binary(image1, image2, np.multiply)
+
+    def _eval_Image_add(
+        self,
+        image1: "FakeImage",
+        image2: "FakeImage",
+    ) -> "FakeImage":
+        return self._binary(image1, image2, np.add)
+
+    def _compare(
+        self,
+        image: "FakeImage",
+        value: float,
+        op: Any,
+    ) -> "FakeImage":
+        return FakeImage(
+            image.names,
+            [op(data, value) * 1.0 for data in image.data],
+            image.masks,
+        )
+
+    def _eval_Image_eq(
+        self,
+        image1: "FakeImage",
+        image2: float,
+    ) -> "FakeImage":
+        return self._compare(image1, image2, np.equal)
+
+    def _eval_Image_gt(
+        self,
+        image1: "FakeImage",
+        image2: float,
+    ) -> "FakeImage":
+        return self._compare(image1, image2, np.greater)
+
+    def _eval_Image_gte(
+        self,
+        image1: "FakeImage",
+        image2: float,
+    ) -> "FakeImage":
+        return self._compare(image1, image2, np.greater_equal)
+
+    def _eval_Image_lte(
+        self,
+        image1: "FakeImage",
+        image2: float,
+    ) -> "FakeImage":
+        return self._compare(image1, image2, np.less_equal)
+
+    def _eval_Image_not(self, value: "FakeImage") -> "FakeImage":
+        return FakeImage(
+            value.names,
+            [(data == 0) * 1.0 for data in value.data],
+            value.masks,
+        )
+
+    def _eval_Image_where(
+        self,
+        input: "FakeImage",
+        test: "FakeImage",
+        value: float,
+    ) -> "FakeImage":
+        return self._binary(
+            input,
+            test,
+            lambda a, b: np.where(b != 0, value, a),
+        )
+
+    def _eval_Image_toUint8(self, value: "FakeImage") -> "FakeImage":
+        return FakeImage(
+            value.names,
+            [np.clip(np.floor(data), 0, 255) for data in value.data],
+            value.masks,
+        )
+
+    def _eval_Image_addBands(
+        self,
+        dstImg: "FakeImage",
+        srcImg: "FakeImage",
+    ) -> "FakeImage":
+        return FakeImage(
+            dstImg.names + srcImg.names,
+            dstImg.data + srcImg.data,
+            dstImg.masks + srcImg.masks,
+        )
+
+    def _eval_Image_unmask(
+        self,
+        input: "FakeImage",
+        value: float,
+    ) -> "FakeImage":
+        return FakeImage(
+            input.names,
+            [
+                np.where(m, d, value)
+                for d, m in zip(input.data, input.masks, strict=True)
+            ],
+            [np.ones(self.shape, dtype=bool)] * len(input.names),
+        )
+
+    def _eval_Image_updateMask(
+        self,
+        image: "FakeImage",
+        mask: "FakeImage",
+    ) -> "FakeImage":
+        keep = (mask.data[0] != 0) & mask.masks[0]
+        return FakeImage(image.names, image.data, [m & keep for m in image.masks])
+
+    def _eval_Image_paint(
+        self,
+        image: "FakeImage",
+        featureCollection: dict,
+        color: float,
+    ) -> "FakeImage":
+        inside = np.zeros(self.shape, dtype=bool)
+        for feature in featureCollection["features"]:
+            inside |= self._geometry_mask(shapely.geometry.shape(feature["geometry"]))
+        return FakeImage(
+            image.names,
+            [np.where(inside, color, data) for data in image.data],
+            image.masks,
+        )
+
+    def _eval_Image_reproject(
+        self,
+        image: "FakeImage",
+        **_: Any,
+    ) -> "FakeImage":
+        return image
+
+    def _eval_Image_bandNames(self, image: "FakeImage") -> list[str]:
+        return list(image.names)
+
+    def _eval_Image_projection(self, image: "FakeImage") -> dict:
+        # Composites take the default projection of Earth Engine, only images
+        # of a collection keep its grid
+        if not image.native:
+            return {
+                "type": "Projection",
+                "crs": "EPSG:4326",
+                "transform": [1, 0, 0, 0, 1, 0],
+            }
+        xmin, _, _, ymax = self.bounds
+        return {
+            "type": "Projection",
+            "crs": "EPSG:4326",
+            "transform": [self.xres, 0, xmin, 0, -self.yres, ymax],
+        }
+
+    def _eval_Reducer_sum(self) -> dict:
+        return {"type": "sum"}
+
+    def _eval_Reducer_repeat(self, reducer: dict, count: int) -> dict:
+        return {"type": "repeat", "reducer": reducer, "count": count}
+
+    def _eval_Reducer_group(
+        self,
+        reducer: dict,
+        groupField: int,
+        groupName: str,
+    ) -> dict:
+        return {
+            "type": "group",
+            "reducer": reducer,
+            "field": groupField,
+            "name": groupName,
+        }
+
+    def _eval_Image_reduceRegion(
+        self,
+        image: "FakeImage",
+        reducer: dict,
+        geometry: shapely.Geometry,
+        scale: float,
+        **_: Any,
+    ) -> dict:
+        # Coarser scales are emulated by striding over the base grid
+        stride = max(1, round(scale / self.base_scale))
+        inside = self._geometry_mask(geometry)[::stride, ::stride]
+        weight = stride**2
+
+        def _sample(i: int) -> tuple[np.ndarray, np.ndarray]:
+            data = image.data[i][::stride, ::stride]
+            mask = image.masks[i][::stride, ::stride] & inside
+            return data, mask
+
+        if reducer["type"] == "sum":
+            out = {}
+            for i, name in enumerate(image.names):
+                data, mask = _sample(i)
+                out[name] = float(data[mask].sum() * weight)
+            return out
+
+        # Every band but the group field is summed, repeated reducers give lists
+        groups, mask = _sample(reducer["field"])
+        samples = [_sample(i) for i in range(len(image.names)) if i != reducer["field"]]
+        for _, value_mask in samples:
+            mask = mask & value_mask
+
+        keys, inverse = np.unique(groups[mask], return_inverse=True)
+        sums = [
+            np.bincount(inverse, weights=values[mask], minlength=len(keys)) * weight
+            for values, _ in samples
+        ]
+        repeated = reducer["reducer"]["type"] == "repeat"
+        return {
+            "groups": [
+                {
+                    reducer["name"]: int(key),
+                    "sum": (
+                        [float(elem[i]) for elem in sums]
+                        if repeated
+                        else float(sums[0][i])
+                    ),
+                }
+                for i, key in enumerate(keys)
+            ],
+        }
+
+    def _eval_Image_reduceRegions(
+        self,
+        image: "FakeImage",
+        collection: dict,
+        reducer: dict,
+        scale: float,
+    ) -> dict:
+        features = []
+        for feature in collection["features"]:
+            reduced = self._eval_Image_reduceRegion(
+                image,
+                reducer,
+                shapely.geometry.shape(feature["geometry"]),
+                scale,
+            )
+            # Single band images are reduced into a property named after the reducer
+            if len(image.names) == 1:
+                reduced = {reducer["type"]: reduced[image.names[0]]}
+            features.append(
+                {**feature, "properties": {**feature["properties"], **reduced}},
+            )
+        return {"type": "FeatureCollection", "features": features}
+
+    def _eval_Image_stratifiedSample(
+        self,
+        image: "FakeImage",
+        numPoints: int,
+        classBand: str,
+        region: shapely.Geometry,
+        scale: float,
+        seed: int,
+        **_: Any,
+    ) -> dict:
+        stride = max(1, round(scale / self.base_scale))
+        valid = self._geometry_mask(region)[::stride, ::stride]
+        for mask in image.masks:
+            valid = valid & mask[::stride, ::stride]
+        data = [d[::stride, ::stride][valid] for d in image.data]
+        classes = data[image.names.index(classBand)]
+
+        # Every class keeps up to numPoints pixels drawn without replacement
+        rng = np.random.default_rng(seed)
+        indices = [
+            rng.permutation(np.flatnonzero(classes == value))[:numPoints]
+            for value in np.unique(classes)
+        ]
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {
+                        name: float(values[i])
+                        for name, values in zip(image.names, data, strict=True)
+                    },
+                }
+                for i in np.concatenate([np.empty(0, dtype=int), *indices])
+            ],
+        }
+
+
+class FakeImage:
+    def __init__(
+        self,
+        names: list[str],
+        data: list[np.ndarray],
+        masks: list[np.ndarray],
+        *,
+        native: bool = False,
+    ) -> None:
+        self.names = list(names)
+        self.data = list(data)
+        self.masks = list(masks)
+        self.native = native
+
+
+engine = FakeEarthEngine()
+
+
+# Client-side objects
+def _encode_arg(value: Any) -> Any:
+    if isinstance(value, ComputedObject):
+        return value.key
+    return value
+
+
+def _promote(value: Any) -> Any:
+    # Numbers passed to image arithmetic become constant images, as in ee
+    if isinstance(value, (int, float)):
+        return Image.constant(value)
+    return value
+
+
+class ComputedObject:
+    def __init__(self, func: str, args: dict[str, Any]) -> None:
+        self.func = func
+        self.args = args
+        payload = json.dumps(
+            [func, {name: _encode_arg(value) for name, value in args.items()}],
+            sort_keys=True,
+        )
+        self.key = hashlib.sha1(payload.encode()).hexdigest()
+
+    def getInfo(self) -> Any:
+        return engine.get_info(self)
+
+    def serialize(self) -> str:
+        values: dict[str, dict] = {}
+        ids: dict[str, str] = {}
+
+        def _encode(node: ComputedObject) -> str:
+            if node.key in ids:
+                return ids[node.key]
+
+            arguments = {}
+            for name, value in node.args.items():
+                if isinstance(value, ComputedObject):
+                    arguments[name] = {"valueReference": _encode(value)}
+                else:
+                    arguments[name] = {"constantValue": value}
+
+            ref = str(len(values))
+            ids[node.key] = ref
+            values[ref] = {
+                "functionInvocationValue": {
+                    "functionName": node.func,
+                    "arguments": arguments,
+                },
+            }
+            return ref
+
+        result = _encode(self)
+        return json.dumps({"result": result, "values": values})
+
+
+class Image(ComputedObject):
+    @staticmethod
+    def constant(value: float | list[float]) -> "Image":
+        return Image("Image.constant", {"value": value})
+
+    @staticmethod
+    def random(seed: int = 0) -> "Image":
+        return Image("Image.random", {"seed": seed})
+
+    @staticmethod
+    def pixelArea() -> "Image":
+        return Image("Image.pixelArea", {})
+
+    @staticmethod
+    def cat(*images: "Image") -> "Image":
+        # As in the client library, concatenation is a chain of addBands calls
+        out = images[0]
+        for image in images[1:]:
+            out = out.addBands(image)
+        return out
+
+    def select(self, bands: str | list[str]) -> "Image":
+        if isinstance(bands, str):
+            bands = [bands]
+        return Image("Image.select", {"input": self, "bandSelectors": bands})
+
+    def rename(self, names: str | list[str]) -> "Image":
+        if isinstance(names, str):
+            names = [names]
+        return Image("Image.rename", {"input": self, "names": names})
+
+    def clip(self, geometry: "Geometry") -> "Image":
+        return Image("Image.clip", {"input": self, "geometry": geometry})
+
+    def And(self, other: "Image") -> "Image":
+        return Image("Image.and", {"image1": self, "image2": other})
+
+    def Or(self, other: "Image") -> "Image":
+        return Image("Image.or", {"image1": self, "image2": other})
+
+    def Not(self) -> "Image":
+        return Image("Image.not", {"value": self})
+
+    def eq(self, value: float) -> "Image":
+        return Image("Image.eq", {"image1": self, "image2": value})
+
+    def gt(self, value: float) -> "Image":
+        return Image("Image.gt", {"image1": self, "image2": value})
+
+    def gte(self, value: float) -> "Image":
+        return Image("Image.gte", {"image1": self, "image2": value})
+
+    def lte(self, value: float) -> "Image":
+        return Image("Image.lte", {"image1": self, "image2": value})
+
+    def multiply(self, other: "Image | float") -> "Image":
+        return Image("Image.multiply", {"image1": self, "image2": _promote(other)})
+
+    def add(self, other: "Image | float") -> "Image":
+        return Image("Image.add", {"image1": self, "image2": _promote(other)})
+
+    def where(self, test: "Image", value: float) -> "Image":
+        return Image("Image.where", {"input": self, "test": test, "value": value})
+
+    def uint8(self) -> "Image":
+        return Image("Image.toUint8", {"value": self})
+
+    def addBands(self, other: "Image") -> "Image":
+        return Image("Image.addBands", {"dstImg": self, "srcImg": other})
+
+    def unmask(self, value: float = 0) -> "Image":
+        return Image("Image.unmask", {"input": self, "value": value})
+
+    def updateMask(self, mask: "Image") -> "Image":
+        return Image("Image.updateMask", {"image": self, "mask": mask})
+
+    def paint(self, featureCollection: "FeatureCollection", color: float) -> "Image":
+        return Image(
+            "Image.paint",
+            {"image": self, "featureCollection": featureCollection, "color": color},
+        )
+
+    def reproject(
+        self,
+        crs: str,
+        crsTransform: list | None = None,
+    ) -> "Image":
+        return Image(
+            "Image.reproject",
+            {"image": self, "crs": crs, "crsTransform": crsTransform},
+        )
+
+    def bandNames(self) -> ComputedObject:
+        return ComputedObject("Image.bandNames", {"image": self})
+
+    def projection(self) -> ComputedObject:
+        return ComputedObject("Image.projection", {"image": self})
+
+    def reduceRegions(
+        self,
+        collection: "FeatureCollection",
+        reducer: "Reducer",
+        scale: float,
+    ) -> "FeatureCollection":
+        return FeatureCollection(
+            "Image.reduceRegions",
+            {
+                "image": self,
+                "collection": collection,
+                "reducer": reducer,
+                "scale": scale,
+            },
+        )
+
+    def stratifiedSample(
+        self,
+        numPoints: int,
+        classBand: str,
+        region: "Geometry",
+        scale: float,
+        seed: int = 0,
+        *,
+        geometries: bool = False,
+    ) -> "FeatureCollection":
+        return FeatureCollection(
+            "Image.stratifiedSample",
+            {
+                "image": self,
+                "numPoints": numPoints,
+                "classBand": classBand,
+                "region": region,
+                "scale": scale,
+                "seed": seed,
+                "geometries": geometries,
+            },
+        )
+
+    def reduceRegion(
+        self,
+        reducer: "Reducer",
+        geometry: "Geometry",
+        scale: float,
+        maxPixels: float = 1e7,
+    ) -> ComputedObject:
+        return ComputedObject(
+            "Image.reduceRegion",
+            {
+                "image": self,
+                "reducer": reducer,
+                "geometry": geometry,
+                "scale": scale,
+                "maxPixels": maxPixels,
+            },
+        )
+
+
+class ImageCollection(ComputedObject):
+    def __init__(self, func: str, args: dict[str, Any] | None = None) -> None:
+        if args is None:
+            func, args = "ImageCollection.load", {"id": func}
+        super().__init__(func, args)
+
+    def filterBounds(self, geometry: "Geometry") -> "ImageCollection":
+        return ImageCollection(
+            "Collection.filter",
+            {"collection": self, "geometry": geometry},
+        )
+
+    def first(self) -> Image:
+        return Image("Collection.first", {"collection": self})
+
+    def mode(self) -> Image:
+        return Image("ImageCollection.mode", {"collection": self})
+
+
+class Geometry(ComputedObject):
+    def __init__(self, func: str | dict, args: dict[str, Any] | None = None) -> None:
+        if args is None:
+            func, args = "GeometryConstructors.GeoJSON", {"geoJson": func}
+        super().__init__(func, args)
+
+    @staticmethod
+    def Polygon(coords: list) -> "Geometry":
+        coords = [list(map(float, coord)) for coord in coords]
+        return Geometry("GeometryConstructors.Polygon", {"coordinates": coords})
+
+    @staticmethod
+    def Rectangle(
+        coords: list,
+        proj: str | None = None,
+        *,
+        geodesic: bool | None = None,
+    ) -> "Geometry":
+        return Geometry(
+            "GeometryConstructors.Rectangle",
+            {
+                "coordinates": list(map(float, coords)),
+                "crs": proj,
+                "geodesic": geodesic,
+            },
+        )
+
+
+class Feature(ComputedObject):
+    def __init__(
+        self,
+        func: "str | Geometry",
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        if not isinstance(func, str):
+            func, args = "Feature", {"geometry": func, "metadata": args or {}}
+        super().__init__(func, args)
+
+
+class FeatureCollection(ComputedObject):
+    def __init__(
+        self,
+        func: str | list[Feature],
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        # Features are embedded as constants, the fake only needs their GeoJSON
+        if not isinstance(func, str):
+            func, args = "Collection", {"features": [engine.evaluate(f) for f in func]}
+        super().__init__(func, args)
+
+    def select(self, propertySelectors: list[str]) -> "FeatureCollection":
+        return FeatureCollection(
+            "Collection.select",
+            {"input": self, "propertySelectors": propertySelectors},
+        )
+
+
+class Reducer(ComputedObject):
+    @staticmethod
+    def sum() -> "Reducer":
+        return Reducer("Reducer.sum", {})
+
+    def repeat(self, count: int) -> "Reducer":
+        return Reducer("Reducer.repeat", {"reducer": self, "count": count})
+
+    def group(
+        self,
+        groupField: int = 0,
+        groupName: str = "group",
+    ) -> "Reducer":
+        return Reducer(
+            "Reducer.group",
+            {"reducer": self, "groupField": groupField, "groupName": groupName},
+        )
+
+
+TYPES = {
+    "Dictionary": ComputedObject,
+    "Feature": Feature,
+    "FeatureCollection": FeatureCollection,
+    "Geometry": Geometry,
+    "Image": Image,
+    "ImageCollection": ImageCollection,
+    "List": ComputedObject,
+    "Projection": ComputedObject,
+    "Reducer": Reducer,
+}
+
+
+def decode(serialized: dict) -> ComputedObject:
+    values = serialized["values"]
+    decoded: dict[str, ComputedObject] = {}
+
+    def _decode(ref: str) -> ComputedObject:
+        if ref in decoded:
+            return decoded[ref]
+
+        invocation = values[ref]["functionInvocationValue"]
+        args = {}
+        for name, value in invocation["arguments"].items():
+            if "valueReference" in value:
+                args[name] = _decode(value["valueReference"])
+            else:
+                args[name] = value["constantValue"]
+
+        func = invocation["functionName"]
+        decoded[ref] = TYPES[FUNCTION_TYPES[func]](func, args)
+        return decoded[ref]
+
+    return _decode(serialized["result"])
+
+
+def Initialize(*_: Any, **__: Any) -> None:
+    return None
+
+
+def computePixels(params: dict) -> np.ndarray:
+    # Pixels of the requested grid take the value of the fake pixel under their
+    # center, masked pixels and pixels outside the fake raster are 0
+    engine.getinfo_calls += 1
+    if engine.latency > 0:
+        time.sleep(engine.latency)
+
+    image = engine.evaluate(params["expression"])
+    grid = params["grid"]
+    transform = grid["affineTransform"]
+    width, height = grid["dimensions"]["width"], grid["dimensions"]["height"]
+    xs = transform["translateX"] + (np.arange(width) + 0.5) * transform["scaleX"]
+    ys = transform["translateY"] + (np.arange(height) + 0.5) * transform["scaleY"]
+
+    xmin, _, _, ymax = engine.bounds
+    cols = np.floor((xs - xmin) / engine.xres).astype(int)
+    rows = np.floor((ymax - ys) / engine.yres).astype(int)
+    valid = ((rows >= 0) & (rows < engine.shape[0]))[:, None] & (
+        (cols >= 0) & (cols < engine.shape[1])
+    )[None, :]
+    rows, cols = rows.clip(0, engine.shape[0] - 1), cols.clip(0, engine.shape[1] - 1)
+
+    out = np.zeros((height, width), dtype=[(name, np.float64) for name in image.names])
+    for name, data, mask in zip(image.names, image.data, image.masks, strict=True):
+        window = np.ix_(rows, cols)
+        out[name] = np.where(valid & mask[window], data[window], 0)
+    return out
+
+
+def install() -> None:
+    modules = {
+        "ee": {
+            "Initialize": Initialize,
+            "Image": Image,
+            "ImageCollection": ImageCollection,
+            "Feature": Feature,
+            "FeatureCollection": FeatureCollection,
+            "Geometry": Geometry,
+            "Reducer": Reducer,
+        },
+        "ee.computedobject": {"ComputedObject": ComputedObject},
+        "ee.data": {"computePixels": computePixels},
+        "ee.deserializer": {"decode": decode},
+        "ee.feature": {"Feature": Feature},
+        "ee.featurecollection": {"FeatureCollection": FeatureCollection},
+        "ee.geometry": {"Geometry": Geometry},
+        "ee.image": {"Image": Image},
+        "ee.imagecollection": {"ImageCollection": ImageCollection},
+        "ee.reducer": {"Reducer": Reducer},
+    }
+
+    root = types.ModuleType("ee")
+    root.__path__ = []
+    sys.modules["ee"] = root
+    for name, attrs in modules.items():
+        module = root if name == "ee" else types.ModuleType(name)
+        for attr, value in attrs.items():
+            setattr(module, attr, value)
+        if name != "ee":
+            sys.modules[name] = module
+            setattr(root, name.split(".")[1], module)